@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+"""
+Benchmark suite for the Game of Life engines.
+
+Every case runs one engine on one bundled seed in one world size, in a fresh process so that memory
+measurements of different cases do not mix. The small bundled seeds are scaled up by tiling their
+inner area over the whole world: the gliders, pulsar and penta patterns in the world sizes of their
+seed files, and the seed_random1-3.json files as they are. A case measures:
+
+    startup_seconds             Building the seed grid and creating the engine world.
+    generations_per_second      The best of --repeat timed runs of -g generations, without logging.
+    cells_per_second            Generations per second times the number of inner cells.
+    tracemalloc_peak_bytes      Peak of Python allocations while starting and ticking, from tracemalloc.
+    max_rss_bytes               Peak resident set size of the case process, where the OS reports it.
+
+Besides the cases, gol.update_world(), gol.count_alive_neighbours() and gol.load_seed_from_file()
+are timed on seed_random1.json. Results are written to JSON and compared with a stored baseline,
+and any metric that is worse than the baseline by more than --threshold is reported as a
+regression, which makes the script exit with status 1. Run it as a module:
+    python -m Project.benchmark -e compact bitboard -ws 80x40 1000x1000
+    python -m Project.benchmark --save-baseline
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import queue
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - depends on platform
+    resource = None
+
+import Project.gol as gol
+import Project.grid as grid
+
+SEEDS = ('gliders', 'pulsar', 'penta', 'seed_random1', 'seed_random2', 'seed_random3')
+PATTERN_TILE_SIZES = {'gliders': (30, 30), 'pulsar': (50, 25), 'penta': (40, 30)}
+DEFAULT_SIZES = ('80x40', '400x200', '1000x1000')
+CELL_LIMITS = {'dict': 100_000}
+FUNCTION_SEED = 'seed_random1.json'
+
+HIGHER_IS_BETTER = ('generations_per_second', 'cells_per_second')
+LOWER_IS_BETTER = ('startup_seconds', 'tracemalloc_peak_bytes', 'max_rss_bytes', 'seconds')
+RESULT_POLL_SECONDS = 1.0
+
+
+def tile_grid(_tile: tuple, _tile_size: tuple, _world_size: tuple) -> tuple:
+    """ Fill the inner area of a world with copies of the inner area of _tile. Returns tuple: grid and world_size. """
+
+    #  Every distinct row of the result is built once by repeating a tile row and cutting it to the inner width,
+    #  then the rows are joined between rim rows. Ages start at 0.
+
+    tile_states = bytes(_tile[0])
+    tile_width, tile_height = _tile_size
+    width, height = _world_size
+    inner_width, inner_height = max(width - 2, 0), max(height - 2, 0)
+    rim = bytes((grid.CODE_RIM,))
+
+    tile_rows = [tile_states[y * tile_width + 1:(y + 1) * tile_width - 1] for y in range(1, tile_height - 1)]
+    rows = [rim + (row * (inner_width // len(row) + 1))[:inner_width] + rim for row in tile_rows]
+
+    states = bytearray(rim * width)
+    for y in range(inner_height):
+        states += rows[y % len(rows)]
+    states += rim * width
+
+    return (states, memoryview(bytearray(4 * width * height)).cast('I')), _world_size
+
+
+def build_seed(_seed: str, _world_size: tuple) -> tuple:
+    """ Build the grid of a bundled seed scaled up to _world_size. Returns tuple: grid and world_size. """
+
+    if _seed in PATTERN_TILE_SIZES:
+        tile_size = PATTERN_TILE_SIZES[_seed]
+        tile = gol.populate_grid(tile_size, _seed)
+    else:
+        population, tile_size = gol.load_seed_from_file(f'{_seed}.json')
+        tile = grid.as_grid(population, tile_size)
+
+    return tile_grid(tile, tile_size, _world_size)
+
+
+def get_max_rss() -> int:
+    """ Return the peak resident set size of this process in bytes, or None where it is not available. """
+
+    #  Some platforms have getrusage() but always report 0, which is not compared with the baseline either.
+
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if not max_rss:
+        return None
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def time_generations(_engine_name: str, _grid: tuple, _world_size: tuple, _generations: int) -> float:
+    """ Create a world and time _generations of it. Returns the seconds taken by the ticks. """
+
+    engine = gol.get_engine(_engine_name)
+    world = gol.create_engine_world(engine, _grid, _world_size)
+    step = gol.run_simulation.__wrapped__
+    gen = 0
+
+    try:
+        start_time = perf_counter()
+        while gen < _generations:
+            world, ticks, _ = step(_generations - gen, world, _world_size, _engine_name)
+            gen += ticks
+        return perf_counter() - start_time
+    finally:
+        if hasattr(engine, 'close_world'):
+            engine.close_world(world)
+
+
+def run_case(_engine_name: str, _seed: str, _world_size: tuple, _generations: int, _repeat: int) -> dict:
+    """ Measure one engine on one seed and world size. Returns dict of metrics. """
+
+    #  The timed runs are made without tracemalloc, which slows down every allocation. A last run with
+    #  tracemalloc started repeats the startup and a few generations to find the peak of Python allocations.
+
+    width, height = _world_size
+
+    start_time = perf_counter()
+    seed_grid, _ = build_seed(_seed, _world_size)
+    engine = gol.get_engine(_engine_name)
+    world = gol.create_engine_world(engine, seed_grid, _world_size)
+    startup_seconds = perf_counter() - start_time
+    if hasattr(engine, 'close_world'):
+        engine.close_world(world)
+
+    seconds = min(time_generations(_engine_name, seed_grid, _world_size, _generations) for _ in range(_repeat))
+    generations_per_second = _generations / seconds if seconds else float('inf')
+
+    del seed_grid, world
+    tracemalloc.start()
+    seed_grid, _ = build_seed(_seed, _world_size)
+    time_generations(_engine_name, seed_grid, _world_size, min(_generations, 3))
+    tracemalloc_peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'startup_seconds': startup_seconds, 'generations_per_second': generations_per_second,
+            'cells_per_second': generations_per_second * max(width - 2, 0) * max(height - 2, 0),
+            'tracemalloc_peak_bytes': tracemalloc_peak_bytes, 'max_rss_bytes': get_max_rss()}
+
+
+def run_case_process(_result_queue, *_args):
+    """ Run a case and put its metrics, or the error it raised, on _result_queue. """
+
+    try:
+        _result_queue.put(run_case(*_args))
+    except Exception as error:  # pylint: disable=broad-except - reported in the results instead
+        _result_queue.put({'error': f'{type(error).__name__}: {error}'})
+
+
+def run_isolated(_args: tuple) -> dict:
+    """ Run a case in a new process. Returns dict of metrics. """
+
+    #  Each case gets a freshly spawned interpreter, so the peak RSS is that of the case alone. The process is not a
+    #  daemon, which lets the parallel engine start its own worker processes. The result is polled for while the
+    #  process runs, so a case that crashes or is killed before it puts its result fails instead of hanging the suite.
+
+    context = multiprocessing.get_context('spawn')
+    result_queue = context.Queue()
+    process = context.Process(target=run_case_process, args=(result_queue, *_args))
+    process.start()
+
+    result = None
+    while result is None:
+        try:
+            result = result_queue.get(timeout=RESULT_POLL_SECONDS)
+        except queue.Empty:
+            if not process.is_alive():
+                try:
+                    result = result_queue.get(timeout=RESULT_POLL_SECONDS)
+                except queue.Empty:
+                    result = {'error': f'Case process died with exit code {process.exitcode}'}
+    process.join()
+
+    return result
+
+
+def time_functions(_repeat: int) -> dict:
+    """ Time the functions of the dict engine on FUNCTION_SEED. Returns dict of name: best seconds per call. """
+
+    population, world_size = gol.load_seed_from_file(FUNCTION_SEED)
+    population = gol.create_world(population, world_size)
+    cells = [cell for cell in population.values() if cell is not None]
+
+    def count_all_neighbours():
+        for cell in cells:
+            gol.count_alive_neighbours(cell['neighbours'], population)
+
+    timers = {
+        'update_world': lambda: gol.update_world(population, world_size),
+        'count_alive_neighbours': count_all_neighbours,
+        'load_seed_from_file': lambda: gol.load_seed_from_file(FUNCTION_SEED)
+    }
+
+    return {name: {'seconds': min(timeit.repeat(timer, number=1, repeat=max(_repeat, 3)))}
+            for name, timer in timers.items()}
+
+
+def compare_results(_results: dict, _baseline: dict, _threshold: float) -> list:
+    """ Compare results with a baseline. Returns list of regression messages. """
+
+    #  Metrics in HIGHER_IS_BETTER regress when they drop below (1 - _threshold) of the baseline, metrics in
+    #  LOWER_IS_BETTER when they rise above (1 + _threshold) of it. Cases and functions missing from either side,
+    #  and cases that failed, are not compared.
+
+    regressions = []
+
+    for section in ('cases', 'functions'):
+        baseline_section = _baseline.get(section, {})
+        for name, metrics in _results.get(section, {}).items():
+            baseline_metrics = baseline_section.get(name)
+            if not baseline_metrics or 'error' in metrics or 'error' in baseline_metrics:
+                continue
+
+            for metric, value in metrics.items():
+                base = baseline_metrics.get(metric)
+                if value is None or not base:
+                    continue
+                if metric in HIGHER_IS_BETTER and value < base * (1 - _threshold) \
+                        or metric in LOWER_IS_BETTER and value > base * (1 + _threshold):
+                    regressions.append(f'{section}/{name} {metric}: {value:.6g} vs baseline {base:.6g} '
+                                       f'({value / base - 1:+.1%})')
+
+    return regressions
+
+
+def main():
+    """ Run the benchmarks described by the command line arguments. """
+
+    parser = argparse.ArgumentParser(description='Benchmark the Game of Life engines.')
+    parser.add_argument('-e', '--engines', dest='engines', type=str, nargs='+', default=list(gol.ENGINES),
+                        choices=gol.ENGINES, help='Engines to benchmark. Defaults to all.')
+    parser.add_argument('-s', '--seeds', dest='seeds', type=str, nargs='+', default=list(SEEDS), choices=SEEDS,
+                        help='Bundled seeds to scale up. Defaults to all.')
+    parser.add_argument('-ws', '--worldsizes', dest='worldsizes', type=str, nargs='+', default=list(DEFAULT_SIZES),
+                        help=f"World sizes as WIDTHxHEIGHT. Defaults to {' '.join(DEFAULT_SIZES)}.")
+    parser.add_argument('-g', '--generations', dest='generations', type=int, default=10,
+                        help='Generations per timed run. Defaults to 10.')
+    parser.add_argument('--repeat', dest='repeat', type=int, default=3,
+                        help='Timed runs per case, the best one counts. Defaults to 3.')
+    parser.add_argument('--no-limits', dest='limits', action='store_false',
+                        help='Also run engines on worlds larger than their limit in CELL_LIMITS.')
+    parser.add_argument('-o', '--output', dest='output', type=str,
+                        default=str(gol.RESOURCES / 'benchmark_results.json'),
+                        help='Results file. Defaults to _Resources/benchmark_results.json.')
+    parser.add_argument('--baseline', dest='baseline', type=str,
+                        default=str(gol.RESOURCES / 'benchmark_baseline.json'),
+                        help='Baseline to compare with. Defaults to _Resources/benchmark_baseline.json.')
+    parser.add_argument('--save-baseline', dest='save_baseline', action='store_true',
+                        help='Also write the results as the new baseline.')
+    parser.add_argument('--threshold', dest='threshold', type=float, default=0.1,
+                        help='Relative change that counts as a regression. Defaults to 0.1.')
+    args = parser.parse_args()
+
+    if args.generations < 1 or args.repeat < 1:
+        parser.error('-g and --repeat need to be at least 1')
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'generations': args.generations,
+        'cases': {},
+        'functions': time_functions(args.repeat)
+    }
+
+    for size in args.worldsizes:
+        world_size = gol.parse_world_size_arg(size)
+        for engine_name in args.engines:
+            limit = CELL_LIMITS.get(engine_name)
+            if args.limits and limit and world_size[0] * world_size[1] > limit:
+                continue
+            for seed in args.seeds:
+                name = f'{engine_name}/{seed}/{world_size[0]}x{world_size[1]}'
+                metrics = run_isolated((engine_name, seed, world_size, args.generations, args.repeat))
+                results['cases'][name] = metrics
+                if 'error' in metrics:
+                    print(f"{name:<40} {metrics['error']}")
+                else:
+                    print(f"{name:<40} {metrics['generations_per_second']:>12.1f} gen/s "
+                          f"{metrics['cells_per_second']:>14.0f} cells/s {metrics['startup_seconds']:>8.3f} s startup "
+                          f"{metrics['tracemalloc_peak_bytes'] / 2 ** 20:>8.1f} MiB peak")
+
+    for name, metrics in results['functions'].items():
+        print(f"{name:<40} {metrics['seconds'] * 1000:>12.3f} ms")
+
+    output = Path(args.output)
+    output.write_text(json.dumps(results, indent=2), encoding='UTF-8')
+    print(f'Results written to {output}')
+
+    baseline_path = Path(args.baseline)
+    regressions = []
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding='UTF-8'))
+        regressions = compare_results(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        print(f'{len(regressions)} regressions against {baseline_path} at a threshold of {args.threshold:.0%}')
+
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2), encoding='UTF-8')
+        print(f'Baseline written to {baseline_path}')
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
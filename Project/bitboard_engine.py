@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+"""
+Bit-parallel tick engine for the Game of Life, selected with '-e bitboard'.
+
+Every row of the world is packed into a Python int, where bit x is the cell in column x. The next
+generation of a whole row is computed with bitwise operations: the eight neighbours from the row
+above, the row itself and the row below are added up with full-adder logic, so one operation works
+on every cell of the row at once.
+
+Elders and prime elders are kept in two extra bit-planes. Ages are kept exactly as a binary counter
+spread over as many bit-planes as needed, where plane b holds bit b of every cell's age.
+"""
+
+import re
+from array import array
+
+import Project.code_base as cb
+import Project.grid as grid
+
+TRACKS_AGES = True
+LIVING_PATTERN = re.compile(b'[\x01-\x03]')
+LIVING_BITS = bytes.maketrans(b'\x00\x01\x02\x03\x04', b'01110')
+ELDER_BITS = bytes.maketrans(b'\x00\x01\x02\x03\x04', b'00100')
+PRIME_ELDER_BITS = bytes.maketrans(b'\x00\x01\x02\x03\x04', b'00010')
+BIT_BYTES = bytes.maketrans(b'01', b'\x00\x01')
+
+
+def pack_row(_row: bytes, _table: bytes) -> int:
+    """ Pack a row of state codes into an int, setting the bits that _table maps to '1'. """
+
+    #  The row is translated to a string of '0' and '1' and reversed, so that column 0 ends up as the lowest bit.
+
+    return int(_row.translate(_table)[::-1], 2)
+
+
+def unpack_row(_bits: int, _width: int) -> bytes:
+    """ Unpack an int into a row of one byte per column, 1 where the bit is set and 0 elsewhere. """
+
+    return format(_bits, f'0{_width}b')[::-1].encode().translate(BIT_BYTES)
+
+
+def create_world(_population, _world_size: tuple) -> dict:
+    """ Create the bitboard world from a population dictionary or grid. """
+
+    #  The world is a dictionary with one list of row ints for the living, elder and prime elder planes,
+    #  a list of age planes and a mask of the inner columns, which excludes the rim columns.
+
+    width, height = _world_size
+    states, ages = grid.as_grid(_population, _world_size)
+    rows = [bytes(states[y * width:(y + 1) * width]) for y in range(height)]
+
+    world = {
+        'living': [pack_row(row, LIVING_BITS) for row in rows],
+        'elder': [pack_row(row, ELDER_BITS) for row in rows],
+        'prime_elder': [pack_row(row, PRIME_ELDER_BITS) for row in rows],
+        'ages': [],
+        'inner': ((1 << width) - 1) & ~1 & ~(1 << (width - 1))
+    }
+
+    for match in LIVING_PATTERN.finditer(states if ages is not None and any(ages) else b''):
+        y, x = divmod(match.start(), width)
+        age = ages[match.start()]
+        while len(world['ages']) < age.bit_length():
+            world['ages'].append([0] * height)
+        for plane in range(age.bit_length()):
+            if age >> plane & 1:
+                world['ages'][plane][y] |= 1 << x
+
+    return world
+
+
+def count_alive_neighbours(_above: int, _row: int, _below: int) -> tuple:
+    """ Add up the living neighbours of every cell in _row. Returns tuple of bit-planes: ones, twos, four or more. """
+
+    #  Each of the eight shifted neighbour rows is added to a bitwise counter with a half adder per bit.
+    #  The third bit saturates, so counts of 4 to 8 all set it and can never be mistaken for 2 or 3.
+
+    ones = twos = fours = 0
+    for neighbours in (_above << 1, _above, _above >> 1, _row << 1, _row >> 1, _below << 1, _below, _below >> 1):
+        carry = ones & neighbours
+        ones ^= neighbours
+        fours |= twos & carry
+        twos ^= carry
+
+    return ones, twos, fours
+
+
+def get_age_mask(_age_planes: list, _y: int, _age: int) -> int:
+    """ Return the bits of row _y whose age is exactly _age. """
+
+    if _age.bit_length() > len(_age_planes):
+        return 0
+
+    mask = -1
+    for plane, rows in enumerate(_age_planes):
+        mask &= rows[_y] if _age >> plane & 1 else ~rows[_y]
+
+    return mask
+
+
+def count_bits(_bits: int) -> int:
+    """ Return the number of set bits of a row. """
+
+    return bin(_bits).count('1')
+
+
+if hasattr(int, 'bit_count'):
+    count_bits = int.bit_count  # noqa: F811 - Python 3.10 and later count bits in C
+
+
+def update_world(_cur_gen: dict, _world_size: tuple) -> dict:
+    """ Represents a tick in the simulation. """
+
+    return step_world(_cur_gen, _world_size)[0]
+
+
+def step_world(_cur_gen: dict, _world_size: tuple) -> tuple:
+    """ Represents a tick in the simulation. Returns tuple: world and changes in the order of stats.CHANGE_FIELDS. """
+
+    #  For every inner row the neighbour counts are computed as bit-planes. A living cell survives with 2 or 3
+    #  living neighbours and a dead inner cell is born with exactly 3, the same rules as gol.update_world().
+    #
+    #  Alive cells that survive with age 5 become elders, and elders that survive with age 10 become prime elders.
+    #  Every other bit in the elder planes is cleared for cells that die.
+    #
+    #  Ages of surviving cells are incremented with a ripple carry through the age planes, and every other cell
+    #  gets age 0. If a carry is left after the last plane a new plane is added.
+    #
+    #  The changes are counted from the same row masks, skipping the masks that are empty.
+
+    height = _world_size[1]
+    living, elder, prime_elder = _cur_gen['living'], _cur_gen['elder'], _cur_gen['prime_elder']
+    age_planes = _cur_gen['ages']
+    inner = _cur_gen['inner']
+
+    next_living, next_elder, next_prime_elder = [0] * height, [0] * height, [0] * height
+    next_ages = [[0] * height for _ in age_planes]
+    overflow = [0] * height
+    changes = [0] * 6
+
+    for y in range(1, height - 1):
+        ones, twos, fours = count_alive_neighbours(living[y - 1], living[y], living[y + 1])
+        two_or_three = twos & ~fours
+        survives = living[y] & two_or_three
+        born = ~living[y] & two_or_three & ones & inner
+
+        age_5 = get_age_mask(age_planes, y, 5)
+        age_10 = get_age_mask(age_planes, y, 10)
+        alive = living[y] & ~elder[y] & ~prime_elder[y]
+
+        to_elder = alive & age_5 & survives
+        to_prime_elder = elder[y] & age_10 & survives
+        next_living[y] = survives | born
+        next_elder[y] = elder[y] & ~age_10 & survives | to_elder
+        next_prime_elder[y] = prime_elder[y] & survives | to_prime_elder
+
+        dies = living[y] & ~survives
+        if born:
+            changes[0] += count_bits(born)
+        if dies:
+            changes[1] += count_bits(dies & ~elder[y] & ~prime_elder[y])
+            if (elder[y] | prime_elder[y]) & dies:
+                changes[2] += count_bits(elder[y] & dies)
+                changes[3] += count_bits(prime_elder[y] & dies)
+        if to_elder:
+            changes[4] += count_bits(to_elder)
+        if to_prime_elder:
+            changes[5] += count_bits(to_prime_elder)
+
+        carry = survives
+        for plane, rows in enumerate(age_planes):
+            next_ages[plane][y] = (rows[y] ^ carry) & survives
+            carry &= rows[y]
+        overflow[y] = carry
+
+    if any(overflow):
+        next_ages.append(overflow)
+
+    world = {'living': next_living, 'elder': next_elder, 'prime_elder': next_prime_elder,
+             'ages': next_ages, 'inner': inner}
+
+    return world, tuple(changes)
+
+
+def count_states(_world: dict, _world_size: tuple) -> dict:
+    """ Count the cells of each state. Returns dict of state: count, rim cells excluded. """
+
+    width, height = _world_size
+    living = sum(count_bits(row) for row in _world['living'])
+    elders = sum(count_bits(row) for row in _world['elder'])
+    prime_elders = sum(count_bits(row) for row in _world['prime_elder'])
+
+    return {cb.STATE_DEAD: max(width - 2, 0) * max(height - 2, 0) - living,
+            cb.STATE_ALIVE: living - elders - prime_elders,
+            cb.STATE_ELDER: elders, cb.STATE_PRIME_ELDER: prime_elders}
+
+
+def get_states(_world: dict, _world_size: tuple) -> bytearray:
+    """ Return the state codes of the world as flat bytes. """
+
+    #  The state code of a cell is living + elder + 2 * prime_elder, which gives 1 for alive, 2 for elders and 3 for
+    #  prime elders. Each plane is unpacked to one byte per cell and, since no byte can exceed 3, the planes are
+    #  added as big integers. The rim is then written with slice assignment.
+
+    width, height = _world_size
+    states = bytearray()
+
+    for y in range(height):
+        living = int.from_bytes(unpack_row(_world['living'][y], width), 'big')
+        elder = int.from_bytes(unpack_row(_world['elder'][y], width), 'big')
+        prime_elder = int.from_bytes(unpack_row(_world['prime_elder'][y], width), 'big')
+        states += (living + elder + 2 * prime_elder).to_bytes(width, 'big')
+
+    states[:width] = states[-width:] = bytes((grid.CODE_RIM,)) * width
+    states[::width] = states[width - 1::width] = bytes((grid.CODE_RIM,)) * height
+
+    return states
+
+
+def get_grid(_world: dict, _world_size: tuple) -> tuple:
+    """ Return the world as a flat (states, ages) grid. """
+
+    width, height = _world_size
+    states = get_states(_world, _world_size)
+
+    ages = array('I', bytes(4 * width * height))
+    for match in LIVING_PATTERN.finditer(states):
+        y, x = divmod(match.start(), width)
+        ages[match.start()] = sum(1 << plane for plane, rows in enumerate(_world['ages']) if rows[y] >> x & 1)
+
+    return states, ages
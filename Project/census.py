@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+"""
+Object census of a Game of Life world, enabled with '--census N'.
+
+Every N generations the living cells are grouped into objects and the objects are classified by
+their shape, in any phase, rotation and mirror image, as one of the patterns of CENSUS_PATTERNS or
+as unknown. The counts are logged with the statistics of the generation, per pattern and per kind:
+
+    still_lifes     Patterns that never change, like blocks and beehives.
+    oscillators     Patterns that return to their shape in place, like blinkers and pulsars.
+    spaceships      Patterns that return to their shape somewhere else, like gliders.
+    unknown         Any other group of cells, such as a reaction or objects close together.
+
+Two living cells belong to the same object when they are at most two cells apart in both directions,
+since a dead cell between them can be born from both. This also keeps the quarters of a pulsar
+together. The shapes of every pattern are found once, by running it on its own until it repeats,
+and looked up from a dictionary of normalized cell sets. Phases that fall apart into separate parts
+even so, like two phases of the penta-decathlon, are recognized when all their parts are found in
+place next to each other.
+
+The census is incremental: the objects of the previous census are kept with their labels, and only
+the objects within two cells of a cell that was born or died since then are dissolved. Their
+living cells and the born cells are grouped again with union-find, so still lifes and empty areas
+cost nothing. The census runs in a stage of Project.pipeline, between the tick loop and the log
+stage, and adds its counts to the records on their way to the log.
+"""
+
+import re
+from functools import lru_cache
+
+import Project.patterns as patterns
+import Project.pipeline as pipeline
+import Project.profiling as profiling
+
+CENSUS_PATTERNS = ('block', 'beehive', 'loaf', 'boat', 'tub', 'blinker', 'toad', 'beacon', 'pulsar', 'penta',
+                   'glider')
+KINDS = ('still_lifes', 'oscillators', 'spaceships', 'unknown')
+UNKNOWN = 'unknown'
+MAX_PERIOD = 64
+OBJECT_DISTANCE = 2
+LIVING_MASK = bytes.maketrans(b'\x01\x02\x03\x04', b'\x01\x01\x01\x00')
+NONZERO_BYTE = re.compile(b'[^\x00]')
+
+
+def step_cells(_cells: set) -> set:
+    """ Return the living cells of the next generation of a set of (y, x) cells on an unbounded plane. """
+
+    counts = {}
+    for y, x in _cells:
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if dy or dx:
+                    counts[y + dy, x + dx] = counts.get((y + dy, x + dx), 0) + 1
+
+    return {cell for cell, count in counts.items() if count == 3 or count == 2 and cell in _cells}
+
+
+def find_period(_cells) -> tuple:
+    """ Run a pattern until its shape repeats. Returns tuple: period, whether it moved and the list of phases. """
+
+    cells = set(_cells)
+    start = patterns.orient_cells(cells)
+    origin = min(cells)
+    phases = [start]
+
+    for period in range(1, MAX_PERIOD + 1):
+        cells = step_cells(cells)
+        if patterns.orient_cells(cells) == start:
+            return period, min(cells) != origin, phases
+        phases.append(patterns.orient_cells(cells))
+
+    raise ValueError(f'No period up to {MAX_PERIOD} found for a pattern of {len(start)} cells')
+
+
+def split_cells(_cells) -> list:
+    """ Split (y, x) cells into the groups that are within OBJECT_DISTANCE of each other. Returns list of sets. """
+
+    remaining = set(_cells)
+    groups = []
+
+    while remaining:
+        group = set()
+        pending = [remaining.pop()]
+        while pending:
+            y, x = pending.pop()
+            group.add((y, x))
+            near = {(y + dy, x + dx) for dy in range(-OBJECT_DISTANCE, OBJECT_DISTANCE + 1)
+                    for dx in range(-OBJECT_DISTANCE, OBJECT_DISTANCE + 1)} & remaining
+            remaining -= near
+            pending.extend(near)
+        groups.append(group)
+
+    return groups
+
+
+@lru_cache(maxsize=None)
+def get_shapes() -> tuple:
+    """ Return the shapes of every census pattern. Returns tuple: dict of shape: pattern, dict of pattern: kind and
+    dict of part shape: list of (pattern, whole shape, (y, x) of the part in the whole). """
+
+    shapes, kinds, parts = {}, {}, {}
+
+    for name in CENSUS_PATTERNS:
+        period, moved, phases = find_period(patterns.get_pattern(name))
+        kinds[name] = 'spaceships' if moved else 'still_lifes' if period == 1 else 'oscillators'
+        for phase in phases:
+            for rotation in range(patterns.ROTATIONS):
+                for flip in (False, True):
+                    whole = patterns.orient_cells(phase, rotation, flip)
+                    split = split_cells(whole)
+                    if len(split) == 1:
+                        shapes.setdefault(whole, name)
+                        continue
+                    for part in split:
+                        offset = min(y for y, _ in part), min(x for _, x in part)
+                        parts.setdefault(patterns.orient_cells(part), []).append((name, whole, offset))
+
+    return shapes, kinds, parts
+
+
+def create_census(_world_size: tuple) -> dict:
+    """ Create the census state of a world of _world_size. """
+
+    width = _world_size[0]
+    near = [dy * width + dx for dy in range(-OBJECT_DISTANCE, OBJECT_DISTANCE + 1)
+            for dx in range(-OBJECT_DISTANCE, OBJECT_DISTANCE + 1)]
+
+    return {'world_size': _world_size, 'mask': None, 'labels': {}, 'objects': {}, 'next_label': 0, 'counts': {},
+            'near': near, 'forward': [offset for offset in near if offset > 0],
+            'max_cells': max(len(shape) for shape in get_shapes()[0])}
+
+
+def get_shape(_census: dict, _cells: list) -> frozenset:
+    """ Return the normalized shape of a group of flat cell indexes, or None when it is larger than any pattern. """
+
+    if len(_cells) > _census['max_cells']:
+        return None
+
+    return patterns.orient_cells(divmod(cell, _census['world_size'][0]) for cell in _cells)
+
+
+def classify_groups(_census: dict, _groups: list) -> list:
+    """ Classify groups of flat cell indexes, joining the parts of split phases. Returns list of (pattern, cells). """
+
+    #  A group shaped like a part of a split phase is joined with the other groups when the cells of the whole phase,
+    #  placed where the part is, belong to new groups that have no other cells.
+
+    shapes, _, parts = get_shapes()
+    width = _census['world_size'][0]
+    owners = {cell: index for index, group in enumerate(_groups) for cell in group}
+    joined = set()
+    objects = []
+
+    for index, group in enumerate(_groups):
+        if index in joined:
+            continue
+        shape = get_shape(_census, group)
+        name = shapes.get(shape, UNKNOWN)
+        members = {index}
+
+        for whole_name, whole, (part_y, part_x) in parts.get(shape, ()) if name == UNKNOWN else ():
+            top, left = divmod(min(group), width)[0] - part_y, min(cell % width for cell in group) - part_x
+            candidates = {owners.get((top + y) * width + left + x) for y, x in whole}
+            if None not in candidates and not candidates & joined and \
+                    sum(len(_groups[candidate]) for candidate in candidates) == len(whole):
+                name, members = whole_name, candidates
+                break
+
+        joined |= members
+        objects.append((name, [cell for member in members for cell in _groups[member]]))
+
+    return objects
+
+
+def group_cells(_census: dict, _cells: set) -> list:
+    """ Group cells into objects with union-find. Returns list of lists of flat cell indexes. """
+
+    #  Every cell is joined with the cells of _cells within OBJECT_DISTANCE after it in row order, which covers every
+    #  pair once. Roots are found with path halving. Cells on the rim are never alive, so offsets that wrap around a
+    #  row end up on rim cells and join nothing.
+
+    parent = {cell: cell for cell in _cells}
+
+    def find(_cell: int) -> int:
+        while parent[_cell] != _cell:
+            parent[_cell] = parent[parent[_cell]]
+            _cell = parent[_cell]
+        return _cell
+
+    for cell in _cells:
+        for offset in _census['forward']:
+            if cell + offset in parent:
+                root, other = find(cell), find(cell + offset)
+                if root != other:
+                    parent[other] = root
+
+    groups = {}
+    for cell in _cells:
+        groups.setdefault(find(cell), []).append(cell)
+
+    return list(groups.values())
+
+
+def update_census(_census: dict, _states) -> dict:
+    """ Bring the census up to date with the state codes of a generation. Returns dict: counts, see get_counts(). """
+
+    #  The cells that changed are found by XORing the living cells with those of the previous census as big integers,
+    #  and looking for the bytes that are not zero. At the first census every living cell counts as changed.
+
+    mask = bytes(_states).translate(LIVING_MASK)
+    previous = _census['mask']
+    if previous is None:
+        changed = [match.start() for match in NONZERO_BYTE.finditer(mask)]
+    else:
+        difference = (int.from_bytes(mask, 'big') ^ int.from_bytes(previous, 'big')).to_bytes(len(mask), 'big')
+        changed = [match.start() for match in NONZERO_BYTE.finditer(difference)]
+    _census['mask'] = mask
+
+    labels, objects, counts = _census['labels'], _census['objects'], _census['counts']
+    dissolved = {labels[cell + offset] for cell in changed for offset in _census['near'] if cell + offset in labels}
+    cells = {cell for cell in changed if mask[cell]}
+
+    for label in dissolved:
+        name, object_cells = objects.pop(label)
+        counts[name] -= 1
+        for cell in object_cells:
+            del labels[cell]
+            if mask[cell]:
+                cells.add(cell)
+
+    for name, group in classify_groups(_census, group_cells(_census, cells)):
+        label = _census['next_label']
+        _census['next_label'] += 1
+        objects[label] = (name, group)
+        counts[name] = counts.get(name, 0) + 1
+        for cell in group:
+            labels[cell] = label
+
+    return get_counts(_census)
+
+
+def get_counts(_census: dict) -> dict:
+    """ Return the number of objects of every kind, followed by the census patterns that were found. """
+
+    kinds = get_shapes()[1]
+    counts = dict.fromkeys(KINDS, 0)
+
+    for name, count in _census['counts'].items():
+        counts[kinds.get(name, UNKNOWN)] += count
+    counts.update((name, _census['counts'][name]) for name in CENSUS_PATTERNS if _census['counts'].get(name))
+
+    return counts
+
+
+def create_census_handler(_census: dict, _log_stage: dict, _profiler: dict = None):
+    """ Return the handler of the census stage. """
+
+    #  Items are ('record', record, states) and ('message', text). Records with states get the counts of the census
+    #  as 'objects', the others get None, and every item is passed on to the log stage in order.
+
+    def handle(_batch: list):
+        for item in _batch:
+            if item[0] == 'record':
+                _, record, states = item
+                objects = None if states is None else \
+                    profiling.time_call(_profiler, 'census', update_census, _census, states)
+                item = ('record', dict(record, objects=objects))
+            pipeline.put(_log_stage, item)
+
+    return handle
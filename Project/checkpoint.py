@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""
+Periodic checkpoints of a running Game of Life simulation, enabled with '--checkpoint-every N'.
+
+A checkpoint file starts with a 24 byte header: the magic bytes b'GOLC', a format version and a
+reserved field as unsigned shorts, the world width and height as unsigned ints and the generation
+as an unsigned long long, all little-endian. The header is followed by the state code bytes and the
+little-endian unsigned int ages of the world, both in the row order of Project.grid, compressed
+together with zlib.
+
+The tick loop only copies the grid out of the engine. Compressing and writing are done by a
+background thread, and zlib releases the GIL while it compresses, so the next generations are
+computed in the meantime. Files are written under a temporary name and renamed when complete, so a
+crash during a write never leaves a broken checkpoint behind. Continue from the latest checkpoint
+with '--resume'. A new run removes the checkpoints of earlier runs when it starts, so --resume
+always continues the run that wrote the checkpoints, and the world size in the header is checked
+against -ws when it is given.
+"""
+
+import logging
+import os
+import queue
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from pathlib import Path
+
+import Project.grid as grid
+
+CHECKPOINT_SUFFIX = '.ckpt'
+CHECKPOINT_MAGIC = b'GOLC'
+CHECKPOINT_VERSION = 1
+CHECKPOINTS_KEPT = 2
+COMPRESSION_LEVEL = 1
+HEADER = struct.Struct('<4sHHIIQ')
+
+
+def get_checkpoint_path(_directory: Path, _generation: int) -> Path:
+    """ Return the path of the checkpoint of _generation, named so that names sort by generation. """
+
+    return _directory / f'checkpoint_{_generation:012d}{CHECKPOINT_SUFFIX}'
+
+
+def get_checkpoints(_directory: Path) -> list:
+    """ Return the paths of all checkpoints in _directory, oldest generation first. """
+
+    if not _directory.exists():
+        return []
+
+    return sorted(_directory.glob(f'checkpoint_*{CHECKPOINT_SUFFIX}'))
+
+
+def clear_checkpoints(_directory: Path):
+    """ Remove all checkpoints in _directory, and the temporary files of unfinished writes. """
+
+    for path in get_checkpoints(_directory) + sorted(_directory.glob('checkpoint_*.tmp')):
+        path.unlink()
+
+
+def save_checkpoint(_path: Path, _grid: tuple, _world_size: tuple, _generation: int):
+    """ Save a (states, ages) grid and its generation to a compressed checkpoint file. """
+
+    width, height = _world_size
+    states, ages = _grid
+    if sys.byteorder == 'big':
+        ages = grid.copy_ages(ages)
+        ages.byteswap()
+
+    compressor = zlib.compressobj(COMPRESSION_LEVEL)
+    temporary_path = _path.with_suffix('.tmp')
+
+    with Path.open(temporary_path, 'wb') as f_hand:
+        f_hand.write(HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, 0, width, height, _generation))
+        f_hand.write(compressor.compress(memoryview(states).cast('B')))
+        f_hand.write(compressor.compress(memoryview(ages).cast('B')))
+        f_hand.write(compressor.flush())
+
+    os.replace(temporary_path, _path)
+
+
+def load_checkpoint(_path: Path) -> tuple:
+    """ Load a checkpoint file. Returns tuple: grid (states, ages), world_size (tuple) and generation (int). """
+
+    with Path.open(_path, 'rb') as f_hand:
+        data = f_hand.read()
+
+    if len(data) < HEADER.size:
+        raise ValueError(f'{_path} is not a version {CHECKPOINT_VERSION} checkpoint file')
+    magic, version, _, width, height, generation = HEADER.unpack_from(data)
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+        raise ValueError(f'{_path} is not a version {CHECKPOINT_VERSION} checkpoint file')
+
+    size = width * height
+    cells = zlib.decompress(memoryview(data)[HEADER.size:])
+    if len(cells) != 5 * size:
+        raise ValueError(f'{_path} is truncated')
+
+    ages = array('I')
+    ages.frombytes(cells[size:])
+    if sys.byteorder == 'big':
+        ages.byteswap()
+
+    return (bytearray(cells[:size]), ages), (width, height), generation
+
+
+def load_latest_checkpoint(_directory: Path) -> tuple:
+    """ Load the checkpoint with the highest generation in _directory. Returns tuple like load_checkpoint(). """
+
+    checkpoints = get_checkpoints(_directory)
+    if not checkpoints:
+        raise FileNotFoundError(f'No checkpoints in {_directory}')
+
+    return load_checkpoint(checkpoints[-1])
+
+
+def run_writer(_directory: Path, _jobs: queue.Queue):
+    """ Write every (grid, world_size, generation) job from _jobs, until None arrives. """
+
+    #  After each write the checkpoints written before the newest CHECKPOINTS_KEPT are removed, in the order they were
+    #  written, starting with those already in _directory. A failed write is logged and the simulation goes on, the
+    #  previous checkpoints are still there to resume from.
+
+    logger = logging.getLogger('gol_logger')
+    written = get_checkpoints(_directory)
+
+    while True:
+        job = _jobs.get()
+        if job is None:
+            break
+
+        _grid, world_size, generation = job
+        path = get_checkpoint_path(_directory, generation)
+        try:
+            save_checkpoint(path, _grid, world_size, generation)
+            if path in written:
+                written.remove(path)
+            written.append(path)
+            while len(written) > CHECKPOINTS_KEPT:
+                written.pop(0).unlink()
+        except OSError as error:
+            logger.error(f'Checkpoint of generation {generation} failed: {error}')
+            continue
+
+        logger.info(f'Checkpoint of generation {generation} written')
+
+
+def start_writer(_directory: Path, _resume: bool = False) -> dict:
+    """ Start the background thread that writes checkpoints to _directory, after clearing it unless _resume. """
+
+    #  The job queue holds a single grid. If a checkpoint is still being written when the next one is due, the tick
+    #  loop waits for it, so the writer never holds more than two copies of the grid.
+
+    if not _directory.exists():
+        _directory.mkdir(parents=True)
+    if not _resume:
+        clear_checkpoints(_directory)
+
+    jobs = queue.Queue(maxsize=1)
+    thread = threading.Thread(target=run_writer, args=(_directory, jobs), daemon=True)
+    thread.start()
+
+    return {'thread': thread, 'jobs': jobs}
+
+
+def write_checkpoint(_writer: dict, _grid: tuple, _world_size: tuple, _generation: int):
+    """ Hand a (states, ages) grid copied from the engine to the writer thread. """
+
+    _writer['jobs'].put((_grid, _world_size, _generation))
+
+
+def stop_writer(_writer: dict):
+    """ Wait for the checkpoints that are still queued to be written, then stop the writer thread. """
+
+    _writer['jobs'].put(None)
+    _writer['thread'].join()
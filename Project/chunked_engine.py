@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+"""
+Unbounded chunked tick engine for the Game of Life, selected with '-e chunked'.
+
+The world has no rim: it is an unbounded plane of CHUNK_SIZE x CHUNK_SIZE chunks, kept in a
+dictionary by (chunk_y, chunk_x) and allocated when a cell is born in them, so gliders travel on
+indefinitely. Inside a chunk every row is packed into an int the same way as the bitboard engine,
+with bit-planes for living cells, elders, prime elders and ages.
+
+A tick only evaluates the active chunks. A chunk is active when it or one of its eight neighbours
+changed state in the previous tick, or when it holds alive or elder cells, whose ages lead to
+promotions. Any other chunk would come out of the tick unchanged, so it is skipped. Chunks that die
+out are freed. Memory and tick time follow the activity of the world instead of its area.
+
+Skipped chunks only hold prime elders, whose ages grow by one every tick without effect. Instead of
+updating them, a chunk remembers the generation its ages refer to, and the ages are brought up to
+date when the chunk becomes active again or when the grid is read.
+
+The world size passed with -ws is the viewport: the cells from (1, 1) to (width - 2, height - 2)
+are drawn, counted, logged and saved, with a rim around them. Cells outside the viewport keep living,
+but are not part of the statistics.
+"""
+
+import re
+from array import array
+
+import Project.bitboard_engine as bitboard
+import Project.code_base as cb
+import Project.grid as grid
+
+TRACKS_AGES = True
+UNBOUNDED = True
+LIVING_CELLS = True
+CHUNK_SIZE = 64
+CHUNK_MASK = (1 << CHUNK_SIZE) - 1
+EMPTY_ROWS = (0,) * CHUNK_SIZE
+LIVING_PATTERN = re.compile(b'[\x01-\x03]')
+NEIGHBOUR_CHUNKS = tuple((dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1))
+
+
+def create_chunk(_generation: int) -> dict:
+    """ Create an empty chunk whose ages refer to _generation. """
+
+    return {'living': [0] * CHUNK_SIZE, 'elder': [0] * CHUNK_SIZE, 'prime_elder': [0] * CHUNK_SIZE,
+            'ages': [], 'generation': _generation}
+
+
+def create_world(_population, _world_size: tuple) -> dict:
+    """ Create the chunked world from a population dictionary or grid, placed at the viewport. """
+
+    #  Every living cell sets its bits in the chunk that holds it, which is created on first use. The living cells of
+    #  a population dictionary are read from it directly, without building a grid of the whole viewport. All chunks
+    #  start active, so the first tick evaluates everything once.
+
+    width = _world_size[0]
+    if isinstance(_population, dict):
+        cells = ((y, x, grid.STATE_CODES[cell['state']], cell['age']) for (y, x), cell in _population.items()
+                 if cell is not None and cell['state'] != cb.STATE_DEAD)
+    else:
+        states, ages = _population
+        cells = (divmod(match.start(), width) + (states[match.start()], 0 if ages is None else ages[match.start()])
+                 for match in LIVING_PATTERN.finditer(states))
+    chunks = {}
+
+    for y, x, code, age in cells:
+        (chunk_y, row), (chunk_x, column) = divmod(y, CHUNK_SIZE), divmod(x, CHUNK_SIZE)
+        chunk = chunks.get((chunk_y, chunk_x))
+        if chunk is None:
+            chunk = chunks[chunk_y, chunk_x] = create_chunk(0)
+
+        bit = 1 << column
+        chunk['living'][row] |= bit
+        if code == grid.CODE_ELDER:
+            chunk['elder'][row] |= bit
+        elif code == grid.CODE_PRIME_ELDER:
+            chunk['prime_elder'][row] |= bit
+
+        while len(chunk['ages']) < age.bit_length():
+            chunk['ages'].append([0] * CHUNK_SIZE)
+        for plane in range(age.bit_length()):
+            if age >> plane & 1:
+                chunk['ages'][plane][row] |= bit
+
+    return {'chunks': chunks, 'active': set(chunks), 'generation': 0}
+
+
+def add_to_ages(_age_planes: list, _living: list, _amount: int) -> list:
+    """ Return age planes where every living cell is _amount older, with a ripple carry adder per row. """
+
+    planes = [list(rows) for rows in _age_planes]
+
+    for y, living in enumerate(_living):
+        if not living:
+            continue
+        carry = 0
+        plane = 0
+        while plane < len(planes) or _amount >> plane or carry:
+            if plane == len(planes):
+                planes.append([0] * CHUNK_SIZE)
+            bits = planes[plane][y]
+            added = living if _amount >> plane & 1 else 0
+            planes[plane][y] = bits ^ added ^ carry
+            carry = (bits & added | carry & (bits ^ added)) & living
+            plane += 1
+
+    return planes
+
+
+def get_ages(_chunk: dict, _generation: int) -> list:
+    """ Return the age planes of _chunk brought up to _generation. """
+
+    if _chunk['generation'] == _generation:
+        return _chunk['ages']
+    return add_to_ages(_chunk['ages'], _chunk['living'], _generation - _chunk['generation'])
+
+
+def get_extended_rows(_chunks: dict, _chunk_y: int, _chunk_x: int) -> list:
+    """ Return the living rows of a chunk, one row above and below, each with one column on either side. """
+
+    #  Bit 0 of an extended row is the last column of the chunk to the left, bits 1 to CHUNK_SIZE are the chunk itself
+    #  and bit CHUNK_SIZE + 1 is the first column of the chunk to the right.
+
+    rows = []
+
+    for dy, indexes in ((-1, (CHUNK_SIZE - 1,)), (0, range(CHUNK_SIZE)), (1, (0,))):
+        left, middle, right = (_chunks.get((_chunk_y + dy, _chunk_x + dx)) for dx in (-1, 0, 1))
+        left = left['living'] if left else EMPTY_ROWS
+        middle = middle['living'] if middle else EMPTY_ROWS
+        right = right['living'] if right else EMPTY_ROWS
+        for y in indexes:
+            rows.append(left[y] >> (CHUNK_SIZE - 1) | middle[y] << 1 | (right[y] & 1) << (CHUNK_SIZE + 1))
+
+    return rows
+
+
+def step_chunk(_chunk: dict, _extended: list, _generation: int) -> dict:
+    """ Compute the next generation of one chunk from its extended living rows. """
+
+    #  The rules and bit operations are those of bitboard_engine.step_world(), on extended rows so that the cells on
+    #  the chunk edges see their neighbours in the next chunks. A chunk that was not allocated is evaluated as empty.
+
+    chunk = _chunk or create_chunk(_generation)
+    living, elder, prime_elder = chunk['living'], chunk['elder'], chunk['prime_elder']
+    age_planes = get_ages(chunk, _generation)
+
+    next_chunk = create_chunk(_generation + 1)
+    next_living, next_elder, next_prime_elder = next_chunk['living'], next_chunk['elder'], next_chunk['prime_elder']
+    next_ages = [[0] * CHUNK_SIZE for _ in age_planes]
+    overflow = [0] * CHUNK_SIZE
+
+    for y in range(CHUNK_SIZE):
+        ones, twos, fours = bitboard.count_alive_neighbours(_extended[y], _extended[y + 1], _extended[y + 2])
+        two_or_three = (twos & ~fours) >> 1 & CHUNK_MASK
+        survives = living[y] & two_or_three
+        born = ~living[y] & two_or_three & ones >> 1
+
+        if not (survives or born or living[y]):
+            continue
+
+        age_5 = bitboard.get_age_mask(age_planes, y, 5)
+        age_10 = bitboard.get_age_mask(age_planes, y, 10)
+        alive = living[y] & ~elder[y] & ~prime_elder[y]
+
+        to_elder = alive & age_5 & survives
+        to_prime_elder = elder[y] & age_10 & survives
+        next_living[y] = survives | born
+        next_elder[y] = elder[y] & ~age_10 & survives | to_elder
+        next_prime_elder[y] = prime_elder[y] & survives | to_prime_elder
+
+        carry = survives
+        for plane, rows in enumerate(age_planes):
+            next_ages[plane][y] = (rows[y] ^ carry) & survives
+            carry &= rows[y]
+        overflow[y] = carry
+
+    if any(overflow):
+        next_ages.append(overflow)
+    next_chunk['ages'] = next_ages
+
+    return next_chunk
+
+
+def update_world(_cur_gen: dict, _world_size: tuple) -> dict:
+    """ Represents a tick in the simulation. """
+
+    #  The active chunks are evaluated into a new chunk dictionary that shares the skipped chunks with the current
+    #  generation. A chunk whose states changed makes itself and its neighbours active for the next tick, a chunk that
+    #  did not change stays active only while it holds alive or elder cells. Chunks left without living cells are
+    #  dropped, and unallocated chunks only get allocated when a cell is born in them.
+    #
+    #  There is no step_world(): the births and deaths of the whole plane do not add up to the state counts of the
+    #  viewport, which are counted from the grid every generation instead.
+
+    chunks = _cur_gen['chunks']
+    generation = _cur_gen['generation']
+    next_chunks = dict(chunks)
+    next_active = set()
+
+    for chunk_y, chunk_x in _cur_gen['active']:
+        extended = get_extended_rows(chunks, chunk_y, chunk_x)
+        chunk = chunks.get((chunk_y, chunk_x))
+        if chunk is None and not any(extended):
+            continue
+
+        next_chunk = step_chunk(chunk, extended, generation)
+        if chunk is None:
+            changed = any(next_chunk['living'])
+        else:
+            changed = next_chunk['living'] != chunk['living'] or next_chunk['elder'] != chunk['elder'] or \
+                next_chunk['prime_elder'] != chunk['prime_elder']
+
+        if any(next_chunk['living']):
+            next_chunks[chunk_y, chunk_x] = next_chunk
+        else:
+            next_chunks.pop((chunk_y, chunk_x), None)
+
+        if changed:
+            next_active.update((chunk_y + dy, chunk_x + dx) for dy, dx in NEIGHBOUR_CHUNKS)
+        elif any(living & ~prime_elder for living, prime_elder in zip(next_chunk['living'], next_chunk['prime_elder'])):
+            next_active.add((chunk_y, chunk_x))
+
+    return {'chunks': next_chunks, 'active': next_active, 'generation': generation + 1}
+
+
+def get_viewport_rows(_world: dict, _world_size: tuple, _plane: str) -> list:
+    """ Return one int per row of the viewport with the bits of _plane, column 0 as the lowest bit. """
+
+    width, height = _world_size
+    chunks = _world['chunks']
+    chunk_columns = range(-(-width // CHUNK_SIZE))
+    rows = []
+
+    for y in range(height):
+        chunk_y, row = divmod(y, CHUNK_SIZE)
+        bits = 0
+        for chunk_x in chunk_columns:
+            chunk = chunks.get((chunk_y, chunk_x))
+            if chunk is not None:
+                bits |= chunk[_plane][row] << (chunk_x * CHUNK_SIZE)
+        rows.append(bits & ((1 << width) - 1))
+
+    return rows
+
+
+def count_states(_world: dict, _world_size: tuple) -> dict:
+    """ Count the cells of each state in the viewport. Returns dict of state: count, rim cells excluded. """
+
+    return grid.count_grid_states(get_states(_world, _world_size))
+
+
+def get_states(_world: dict, _world_size: tuple) -> bytearray:
+    """ Return the state codes of the viewport as flat bytes, with a rim around it. """
+
+    #  The planes of the viewport are combined like in bitboard_engine.get_states(), which also writes the rim.
+
+    width, height = _world_size
+    planes = [get_viewport_rows(_world, _world_size, plane) for plane in ('living', 'elder', 'prime_elder')]
+    viewport = {'living': planes[0], 'elder': planes[1], 'prime_elder': planes[2]}
+
+    return bitboard.get_states(viewport, (width, height))
+
+
+def get_grid(_world: dict, _world_size: tuple) -> tuple:
+    """ Return the viewport as a flat (states, ages) grid, with the ages of skipped chunks brought up to date. """
+
+    width, height = _world_size
+    states = get_states(_world, _world_size)
+    chunks = _world['chunks']
+    generation = _world['generation']
+    current_ages = {}
+
+    ages = array('I', bytes(4 * width * height))
+    for match in LIVING_PATTERN.finditer(states):
+        y, x = divmod(match.start(), width)
+        (chunk_y, row), (chunk_x, column) = divmod(y, CHUNK_SIZE), divmod(x, CHUNK_SIZE)
+        age_planes = current_ages.get((chunk_y, chunk_x))
+        if age_planes is None:
+            age_planes = current_ages[chunk_y, chunk_x] = get_ages(chunks[chunk_y, chunk_x], generation)
+        ages[match.start()] = sum(1 << plane for plane, rows in enumerate(age_planes) if rows[row] >> column & 1)
+
+    return states, ages
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Compact tick engine for the Game of Life, selected with '-e compact'.
+
+Cells are stored as one byte of state code in a bytearray and one unsigned int of age in an array,
+both indexed by y * width + x, instead of one dictionary with a neighbour list per cell. Neighbours
+are found with a single table of eight index offsets shared by every cell of the world, and each
+tick writes into a second pair of buffers that is swapped with the first, so no per-cell objects
+are allocated while the simulation runs.
+"""
+
+import re
+from array import array
+from functools import lru_cache
+
+import Project.grid as grid
+
+TRACKS_AGES = True
+LIVING_PATTERN = re.compile(b'[\x01-\x03]')
+BIRTH_PATTERN = re.compile(b'\x03')
+
+
+@lru_cache(maxsize=None)
+def get_neighbour_offsets(_width: int) -> tuple:
+    """ Return the index offsets of the eight neighbours of a cell in a world of width _width. """
+
+    return (-_width - 1, -_width, -_width + 1, -1, 1, _width - 1, _width, _width + 1)
+
+
+def create_world(_population, _world_size: tuple) -> dict:
+    """ Create the compact world from a population dictionary or grid. """
+
+    #  The world is a dictionary of the current states and ages, a second pair of buffers for the next
+    #  generation, a buffer for neighbour counts and the shared neighbour offsets.
+
+    states, ages = grid.as_grid(_population, _world_size)
+    size = len(states)
+
+    return {
+        'states': bytearray(states),
+        'ages': grid.copy_ages(ages, size),
+        'next_states': bytearray(size),
+        'next_ages': array('I', bytes(4 * size)),
+        'neighbours_alive': bytearray(size),
+        'offsets': get_neighbour_offsets(_world_size[0])
+    }
+
+
+def count_alive_neighbours(_world: dict) -> list:
+    """ Fill the neighbour count buffer of the world. Returns list of indices of living cells. """
+
+    #  The living cells are found with a regular expression over the state bytes, then each of them adds one
+    #  to the count of its eight neighbours. Rim cells are never alive, and since every living cell is inside
+    #  the rim all neighbour indices are within the world.
+
+    neighbours_alive = _world['neighbours_alive']
+    neighbours_alive[:] = bytes(len(neighbours_alive))
+    offsets = _world['offsets']
+
+    living = [match.start() for match in LIVING_PATTERN.finditer(_world['states'])]
+    for index in living:
+        for offset in offsets:
+            neighbours_alive[index + offset] += 1
+
+    return living
+
+
+def update_world(_cur_gen: dict, _world_size: tuple) -> dict:
+    """ Represents a tick in the simulation. """
+
+    return step_world(_cur_gen, _world_size)[0]
+
+
+def step_world(_cur_gen: dict, _world_size: tuple) -> tuple:
+    """ Represents a tick in the simulation. Returns tuple: world and changes in the order of stats.CHANGE_FIELDS. """
+
+    #  Copies the current buffers into the next ones and then only changes the cells affected by the rules of
+    #  gol.update_world():
+    #
+    #  A living cell with 2 or 3 living neighbours survives and ages by 1. Alive cells that survive with age 5
+    #  become elders, and elders that survive with age 10 become prime elders. Any other living cell dies and
+    #  gets age 0. Deaths are counted per state code.
+    #
+    #  A dead cell with exactly 3 living neighbours is born as an alive cell with age 0.
+    #
+    #  Finally the current and next buffers are swapped, so the old buffers are reused on the next tick.
+
+    states, ages = _cur_gen['states'], _cur_gen['ages']
+    next_states, next_ages = _cur_gen['next_states'], _cur_gen['next_ages']
+    next_states[:] = states
+    next_ages[:] = ages
+
+    neighbours_alive = _cur_gen['neighbours_alive']
+    births = elder_promotions = prime_elder_promotions = 0
+    deaths = [0] * len(grid.CODE_STATES)
+
+    for index in count_alive_neighbours(_cur_gen):
+        if neighbours_alive[index] in (2, 3):
+            if states[index] == grid.CODE_ALIVE and ages[index] == 5:
+                next_states[index] = grid.CODE_ELDER
+                elder_promotions += 1
+            elif states[index] == grid.CODE_ELDER and ages[index] == 10:
+                next_states[index] = grid.CODE_PRIME_ELDER
+                prime_elder_promotions += 1
+            next_ages[index] += 1
+        else:
+            deaths[states[index]] += 1
+            next_states[index] = grid.CODE_DEAD
+            next_ages[index] = 0
+
+    for match in BIRTH_PATTERN.finditer(neighbours_alive):
+        index = match.start()
+        if states[index] == grid.CODE_DEAD:
+            next_states[index] = grid.CODE_ALIVE
+            next_ages[index] = 0
+            births += 1
+
+    _cur_gen['states'], _cur_gen['next_states'] = next_states, states
+    _cur_gen['ages'], _cur_gen['next_ages'] = next_ages, ages
+
+    return _cur_gen, (births, deaths[grid.CODE_ALIVE], deaths[grid.CODE_ELDER], deaths[grid.CODE_PRIME_ELDER],
+                      elder_promotions, prime_elder_promotions)
+
+
+def get_states(_world: dict, _world_size: tuple) -> bytearray:
+    """ Return the state codes of the world as flat bytes. """
+
+    return _world['states']
+
+
+def count_states(_world: dict, _world_size: tuple) -> dict:
+    """ Count the cells of each state. Returns dict of state: count, rim cells excluded. """
+
+    return grid.count_grid_states(_world['states'])
+
+
+def get_grid(_world: dict, _world_size: tuple) -> tuple:
+    """ Return the world as a flat (states, ages) grid. """
+
+    return bytearray(_world['states']), array('I', _world['ages'])
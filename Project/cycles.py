@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Still life and cycle detection for the Game of Life, enabled with '--detect-cycles'.
+
+Every generation the world is reduced to a 16 byte BLAKE2 digest, and the digests of the last
+CYCLE_WINDOW generations are kept with the generation they were seen in. When a digest comes back,
+the world has entered a cycle whose period is the distance between the two generations, a still
+life being a cycle of period 1. From then on every generation repeats one that has already been
+counted, so the simulation can stop computing and extrapolate the statistics of the rest of the run.
+Older digests and log records are forgotten, so memory stays the same however long a soup runs
+before it settles, and cycles with a period longer than the window are not detected.
+
+Two kinds of digest are made:
+
+    states      Only the state codes. Fast, but ignores ages, so a pattern whose cells are still
+                on their way to becoming elders can be taken for a cycle too early.
+    ages        The state codes and the ages that still matter. Alive and elder cells can be
+                promoted, so their ages are included, while prime elders never change state
+                again and their ever-growing ages are left out. A match is an exact cycle.
+"""
+
+import hashlib
+import re
+from array import array
+from collections import deque
+
+CYCLE_MODES = ('states', 'ages')
+CYCLE_WINDOW = 4096
+
+PRIME_ELDER_RUN = re.compile(b'\x03+')
+
+
+def create_detector(_mode: str) -> dict:
+    """ Create the detector state for the given mode. """
+
+    if _mode not in CYCLE_MODES:
+        raise ValueError(f"Unknown cycle detection mode '{_mode}', choose one of: {', '.join(CYCLE_MODES)}")
+
+    return {'mode': _mode, 'seen': {}, 'records': {}, 'order': deque()}
+
+
+def get_world_key(_grid: tuple, _mode: str) -> bytes:
+    """ Return the digest of a (states, ages) grid, with or without the ages that can still promote a cell. """
+
+    #  In 'states' mode the ages are not read, and may be None.
+
+    states, ages = _grid
+    digest = hashlib.blake2b(states, digest_size=16)
+
+    if _mode == 'ages':
+        ages = bytearray(memoryview(ages).cast('B'))
+        for match in PRIME_ELDER_RUN.finditer(states):
+            ages[4 * match.start():4 * match.end()] = bytes(4 * (match.end() - match.start()))
+        digest.update(ages)
+
+    return digest.digest()
+
+
+def find_cycle(_detector: dict, _grid: tuple, _generation: int, _record: dict):
+    """ Record the world and log record of _generation. Returns the earlier generation it repeats, or None. """
+
+    #  When a repeat is found, the record of the repeated generation is replaced with the one of _generation. Their
+    #  state counts are the same, but only the new one holds the changes of a tick inside the cycle. Generations that
+    #  fall out of the window of the last CYCLE_WINDOW are forgotten.
+
+    key = get_world_key(_grid, _detector['mode'])
+    first = _detector['seen'].get(key)
+    if first is not None:
+        _detector['records'][first] = _record
+        return first
+
+    _detector['seen'][key] = _generation
+    _detector['records'][_generation] = _record
+    _detector['order'].append((_generation, key))
+    if len(_detector['order']) > CYCLE_WINDOW:
+        generation, key = _detector['order'].popleft()
+        del _detector['seen'][key], _detector['records'][generation]
+    return None
+
+
+def reset_detector(_detector: dict):
+    """ Forget all recorded generations, for when the world has jumped ahead by more than one generation. """
+
+    _detector['seen'].clear()
+    _detector['records'].clear()
+    _detector['order'].clear()
+
+
+def extrapolate_ages(_grid: tuple, _grid_after: tuple, _periods: int):
+    """ Return the ages of _grid after _periods more periods, given the grid one period later, or None if unchanged. """
+
+    #  In a cycle found in 'ages' mode only prime elders can have ages that differ one period later. A prime elder that
+    #  lives through the whole period is exactly one period older, one that died and came back has the same age, so
+    #  each age grows by the same amount every period.
+
+    states, ages = _grid
+    ages_after = _grid_after[1]
+    extrapolated = None
+
+    for match in PRIME_ELDER_RUN.finditer(states):
+        for index in range(match.start(), match.end()):
+            growth = ages_after[index] - ages[index]
+            if growth > 0:
+                if extrapolated is None:
+                    extrapolated = array('I', ages)
+                extrapolated[index] += growth * _periods
+
+    return extrapolated
+
+
+def get_cycle_record(_detector: dict, _first: int, _period: int, _generation: int) -> dict:
+    """ Return the log record of _generation in a cycle of _period that started at generation _first. """
+
+    return dict(_detector['records'][_first + (_generation - _first) % _period], generation=_generation)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""
+Ensemble runner for the Game of Life, for the statistics of many random soups.
+
+Runs many independent simulations through a pool of worker processes, without rendering, delays or
+per-generation logging. Every combination of world size and generation count is run --runs times
+with a random soup of --density from populate_grid(). The seed of every run is drawn from one
+generator seeded with --rng-seed, so a sweep gives the same results every time, whatever the number
+of processes.
+
+Every run stops as soon as its world repeats an earlier generation, using the exact cycle detection
+of Project.cycles, and the state counts of the last generation are taken from the cycle. Each run
+gives one result with its final population, lifetime, period and elder counts, and all results are
+written to one file, as JSON lines or CSV depending on the suffix. Run it as a module:
+    python -m Project.ensemble --runs 1000 --rng-seed 42 -ws 80x40 160x80 -g 1000
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+from pathlib import Path
+from time import perf_counter
+
+import Project.code_base as cb
+import Project.cycles as cycles
+import Project.stats as stats
+from Project.gol import DEFAULT_DENSITY, ENGINES, RESOURCES, create_engine_world, get_engine, parse_world_size_arg, \
+    populate_grid, run_simulation
+
+RESULT_FIELDS = ('run', 'rng_seed', 'world_size', 'generations', 'engine', 'density', 'initial_alive',
+                 'final_alive', 'final_elders', 'final_prime_elders', 'final_dead', 'lifetime', 'period', 'seconds')
+RESULT_SUFFIXES = ('.jsonl', '.csv')
+
+
+def get_run_seeds(_rng_seed: int, _runs: int) -> list:
+    """ Return the random seed of every run, drawn from one generator seeded with _rng_seed. """
+
+    generator = random.Random(_rng_seed)
+    return [generator.getrandbits(64) for _ in range(_runs)]
+
+
+def run_soup(_task: tuple) -> dict:
+    """ Run one random soup to the end. Returns dict: the result with the fields of RESULT_FIELDS. """
+
+    #  The task is a tuple of run number, random seed, world size, generations, engine name and density.
+    #
+    #  The world is stepped with the undecorated run_simulation(), and the state counts are kept up to date with
+    #  the changes of every tick. When a cycle is found, lifetime is the generation the cycle started in and the
+    #  final counts are those of the cycle generation that matches the last generation. A soup still changing after
+    #  all generations has no lifetime or period.
+
+    run, run_seed, world_size, generations, engine_name, density = _task
+    start_time = perf_counter()
+
+    engine = get_engine(engine_name)
+    world = create_engine_world(engine, populate_grid(world_size, None, density, run_seed), world_size)
+    detector = cycles.create_detector('ages')
+    step = run_simulation.__wrapped__
+
+    state_counts = engine.count_states(world, world_size)
+    initial_counts = state_counts
+    changes = None
+    lifetime = period = None
+    gen = 0
+
+    try:
+        while True:
+            if changes is not None:
+                state_counts = stats.apply_changes(state_counts, changes)
+            record = stats.create_record(gen, state_counts, changes)
+
+            first = cycles.find_cycle(detector, engine.get_grid(world, world_size), gen, record)
+            if first is not None:
+                lifetime, period = first, gen - first
+                record = cycles.get_cycle_record(detector, first, period, generations)
+                break
+            if gen >= generations:
+                break
+
+            world, ticks, changes = step(generations - gen, world, world_size, engine_name)
+            gen += ticks
+            if ticks > 1:
+                cycles.reset_detector(detector)
+                changes = None
+                state_counts = engine.count_states(world, world_size)
+    finally:
+        if hasattr(engine, 'close_world'):
+            engine.close_world(world)
+
+    return {'run': run, 'rng_seed': run_seed, 'world_size': f'{world_size[0]}x{world_size[1]}',
+            'generations': generations, 'engine': engine_name, 'density': density,
+            'initial_alive': initial_counts[cb.STATE_ALIVE], 'final_alive': record['alive'],
+            'final_elders': record['elders'], 'final_prime_elders': record['prime_elders'],
+            'final_dead': record['dead'], 'lifetime': lifetime, 'period': period,
+            'seconds': round(perf_counter() - start_time, 6)}
+
+
+def write_results(_path: Path, _results) -> int:
+    """ Write results as they arrive, as JSON lines or CSV by the suffix of _path. Returns the number written. """
+
+    count = 0
+
+    with Path.open(_path, 'w', encoding='UTF-8', newline='') as f_hand:
+        if _path.suffix.lower() == '.csv':
+            writer = csv.DictWriter(f_hand, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            def write(_result):
+                f_hand.write(json.dumps(_result, separators=(',', ':')) + '\n')
+
+        for result in _results:
+            write(result)
+            count += 1
+
+    return count
+
+
+def main():
+    """ Run the ensemble described by the command line arguments. """
+
+    batch_engines = [name for name in ENGINES if get_engine(name).TRACKS_AGES
+                     and not getattr(get_engine(name), 'USES_WORKERS', False)
+                     and not getattr(get_engine(name), 'UNBOUNDED', False)]
+
+    parser = argparse.ArgumentParser(description='Run many random soups in parallel and collect their statistics.')
+    parser.add_argument('--runs', dest='runs', type=int, default=100,
+                        help='Number of random soups for every world size and generation count. Defaults to 100.')
+    parser.add_argument('--rng-seed', dest='rng_seed', type=int, default=0,
+                        help='Seed of the generator that draws the seed of every run. Defaults to 0.')
+    parser.add_argument('-ws', '--worldsize', dest='worldsizes', type=str, nargs='+', default=['80x40'],
+                        help='One or more world sizes, as WIDTHxHEIGHT. Defaults to 80x40.')
+    parser.add_argument('-g', '--generations', dest='generations', type=int, nargs='+', default=[1000],
+                        help='One or more generation counts. Defaults to 1000.')
+    parser.add_argument('--density', dest='density', type=float, default=DEFAULT_DENSITY,
+                        help='Share of living cells in every soup, from 0 to 1. Defaults to 4/21.')
+    parser.add_argument('-e', '--engine', dest='engine', type=str, default='compact', choices=batch_engines,
+                        help='Tick engine used for every run. Defaults to compact.')
+    parser.add_argument('-p', '--processes', dest='processes', type=int,
+                        help='Number of worker processes. Defaults to one per CPU core.')
+    parser.add_argument('-o', '--output', dest='output', type=str,
+                        default=str(RESOURCES / 'ensemble_results.jsonl'),
+                        help='Results file, .jsonl or .csv. Defaults to _Resources/ensemble_results.jsonl.')
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    if output.suffix.lower() not in RESULT_SUFFIXES:
+        parser.error(f"--output needs to end with one of: {', '.join(RESULT_SUFFIXES)}")
+    if not 0 <= args.density <= 1:
+        parser.error('--density needs to be between 0 and 1')
+    if args.runs < 1:
+        parser.error('--runs needs to be at least 1')
+    if args.processes is not None and args.processes < 1:
+        parser.error('--processes needs at least 1 process')
+
+    world_sizes = [parse_world_size_arg(arg) for arg in args.worldsizes]
+    sweep = [(world_size, generations) for world_size in world_sizes for generations in args.generations]
+    run_seeds = get_run_seeds(args.rng_seed, len(sweep) * args.runs)
+    tasks = [(run, run_seeds[run], *sweep[run // args.runs], args.engine, args.density)
+             for run in range(len(run_seeds))]
+
+    start_time = perf_counter()
+    with multiprocessing.Pool(args.processes or os.cpu_count() or 1) as pool:
+        count = write_results(output, pool.imap(run_soup, tasks, chunksize=max(1, len(tasks) // 64)))
+
+    elapsed = perf_counter() - start_time
+    print(f'{count} runs in {elapsed:.3f} s, {count / elapsed if elapsed else 0:.1f} runs per second -> {output}')
+
+
+if __name__ == "__main__":
+    main()
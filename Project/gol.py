@@ -26,30 +26,65 @@ You run this script as a module:
 
 import argparse
 import ast
+import functools
+import hashlib
 import pprint
 import random
 import json
 import logging
+import logging.handlers
 import itertools
+import importlib
+import math
+import sys
 from pathlib import Path
 from ast import literal_eval
-from time import sleep
+from time import perf_counter
 
+import Project.census as census
+import Project.checkpoint as checkpoint
 import Project.code_base as cb
+import Project.cycles as cycles
+import Project.grid as grid
+import Project.pattern_formats as pattern_formats
+import Project.patterns as patterns
+import Project.pipeline as pipeline
+import Project.profiling as profiling
+import Project.recording as recording
+import Project.render as render
+import Project.seed_format as seed_format
+import Project.stats as stats
 
 __version__ = '1.0'
 __desc__ = "A simplified implementation of Conway's Game of Life."
 
 RESOURCES = Path(__file__).parent / "../_Resources/"
+CHECKPOINTS = RESOURCES / "_Checkpoints"
+RECORDINGS = RESOURCES / "_Recordings"
+GENERATIONS_LOGGER = 'gol_logger.generations'
+DEFAULT_DENSITY = 4 / 21
+DEFAULT_WORLD_SIZE = '80x40'
+LOG_BUFFER_RECORDS = 4096
+POPULATE_BAND_CELLS = 1 << 22
+ENGINES = ('dict', 'numpy', 'sparse', 'hashlife', 'compact', 'bitboard', 'parallel', 'chunked', 'table', 'mapped')
+TRACKS_AGES = True
 
 
 # -----------------------------------------
 # IMPLEMENTATIONS FOR HIGHER GRADES, C - B
 # -----------------------------------------
 
-def load_seed_from_file(_file_name: str) -> tuple:
+def load_seed_from_file(_file_name: str, _world_size: tuple = None, _offset: tuple = None) -> tuple:
     """ Load population seed from file. Returns tuple: population (dict) and world_size (tuple). """
 
+    #  Files in the binary seed format, ending with seed_format.SEED_SUFFIX, are memory-mapped by
+    #  seed_format.load_seed() and returned as a (states, ages) grid instead of a population dictionary,
+    #  which every engine accepts.
+    #
+    #  Pattern files in the RLE, plaintext or Life 1.06 format carry no world size, so they are streamed by
+    #  pattern_formats.load_pattern() into a grid of _world_size, with the pattern origin at the (x, y) _offset, or
+    #  centered when no offset is given.
+    #
     #  Tests if an absolute path exists to the _Resources/_project_files directory, if false - creates the directory.
     #  Then it tests if '.json' file extension is included in _file_name, if false - appends it to the
     #  end of _file_name. Opens the file in a context manager in read mode and loads the json into
@@ -76,6 +111,12 @@ def load_seed_from_file(_file_name: str) -> tuple:
     if not seeds_path.exists():
         seeds_path.mkdir()
 
+    if _file_name.endswith(seed_format.SEED_SUFFIX):
+        return seed_format.load_seed(seeds_path / _file_name)
+
+    if Path(_file_name).suffix.lower() in pattern_formats.PATTERN_SUFFIXES:
+        return pattern_formats.load_pattern(seeds_path / _file_name, _world_size, _offset)
+
     if '.json' not in _file_name:
         _file_name = f'{_file_name}.json'
 
@@ -108,89 +149,356 @@ def load_seed_from_file(_file_name: str) -> tuple:
     return seed_dict['population'], seed_dict['world_size']
 
 
-def create_logger() -> logging.Logger:
+def save_world(_file_name: str, _grid: tuple, _world_size: tuple, _rule: str = pattern_formats.RLE_RULE):
+    """ Save a (states, ages) grid to _Resources/_Project_Files in the binary seed format. """
+
+    #  File names ending with a pattern suffix, like '.rle', are exported as a pattern file instead. Pattern files
+    #  only hold the living cells inside the rim, so elders are saved as alive and ages are lost. RLE files also hold
+    #  the _rule in B/S notation.
+
+    seeds_path = RESOURCES.absolute() / '_Project_Files'
+    if not seeds_path.exists():
+        seeds_path.mkdir()
+
+    if Path(_file_name).suffix.lower() in pattern_formats.PATTERN_SUFFIXES:
+        pattern_formats.save_pattern(seeds_path / _file_name, _grid[0], _world_size, _rule)
+        return
+
+    if not _file_name.endswith(seed_format.SEED_SUFFIX):
+        _file_name = f'{_file_name}{seed_format.SEED_SUFFIX}'
+
+    seed_format.save_seed(seeds_path / _file_name, *_grid, _world_size)
+
+
+def create_logger(_log_format: str = 'text', _census: bool = False) -> logging.Logger:
     """ Creates a logging object to be used for reports. """
 
-    # Gets a logger object with the name 'gol_logger' and sets the log level to INFO.
+    # Gets a logger object with the name 'gol_logger' and sets the log level to INFO. Handlers left from an earlier
+    # call are flushed, closed and removed first, so calling it again does not write every message twice.
     #
     # Sets an absolute path log_path to the log file _Resources/gol.log, then runs
-    # logging.FileHandler to set up a file handler to the specified log_path in write mode.
+    # logging.FileHandler to set up a file handler to the specified log_path in write mode. The file handler is
+    # wrapped in a logging.handlers.MemoryHandler, which buffers LOG_BUFFER_RECORDS records before writing them,
+    # and writes at once for errors.
+    #
+    # The records of every generation go to the child logger GENERATIONS_LOGGER. In the text format they pass on to
+    # gol.log, in the jsonl and csv formats they get a buffered handler of their own to _Resources/gol.jsonl or
+    # _Resources/gol.csv, which starts with the csv header line, with the objects column of a census when _census.
     #
     # Adds the file handler to the 'gol_logger' logger object and returns the logger object.
 
     logger_object = logging.getLogger('gol_logger')
     logger_object.setLevel("INFO")
+    generations_logger = logging.getLogger(GENERATIONS_LOGGER)
+
+    for logger in (logger_object, generations_logger):
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+            target = getattr(handler, 'target', None)
+            handler.close()
+            if target is not None:
+                target.close()
+
+    def create_handler(_log_path: Path) -> logging.Handler:
+        file_handler = logging.FileHandler(filename=_log_path, mode='w')
+        return logging.handlers.MemoryHandler(LOG_BUFFER_RECORDS, flushLevel=logging.ERROR, target=file_handler)
+
+    logger_object.addHandler(create_handler(RESOURCES.absolute() / 'gol.log'))
 
-    log_path = RESOURCES.absolute() / 'gol.log'
-    file_handler = logging.FileHandler(filename=log_path, mode='w')
+    generations_logger.propagate = _log_format == 'text'
+    if _log_format != 'text':
+        generations_logger.addHandler(create_handler(RESOURCES.absolute() / f'gol.{_log_format}'))
 
-    logger_object.addHandler(file_handler)
+    header = stats.get_header(_log_format, _census)
+    if header:
+        generations_logger.info(header)
 
     return logger_object
 
 
+def flush_logger(_logger: logging.Logger):
+    """ Write the buffered records of _logger and its generations logger to file. """
+
+    for handler in _logger.handlers + logging.getLogger(GENERATIONS_LOGGER).handlers:
+        handler.flush()
+
+
+def create_engine_world(_engine, _population, _world_size: tuple, _workers: int = None, _rule: dict = None):
+    """ Let _engine create its world from a population dictionary or grid, with workers or a rule if it uses them. """
+
+    if getattr(_engine, 'USES_WORKERS', False):
+        return _engine.create_world(_population, _world_size, _workers)
+    if getattr(_engine, 'USES_RULES', False):
+        return _engine.create_world(_population, _world_size, _rule)
+    return _engine.create_world(_population, _world_size)
+
+
+def fast_forward_cycle(_engine, _world, _world_size: tuple, _period: int, _generations: int, _workers: int = None,
+                       _rule: dict = None):
+    """ Advance a world that is in a cycle of _period by _generations. Returns the advanced world. """
+
+    #  Only the remainder of _generations modulo the period is ticked, which lands on the same point of the cycle.
+    #  Then one more period is ticked to see how the ages of prime elders grow per period. If they do, the world is
+    #  recreated from the landing point with those ages extrapolated over all skipped periods.
+
+    remainder = _generations % _period
+    for _ in range(remainder):
+        _world = _engine.update_world(_world, _world_size)
+
+    landed = _engine.get_grid(_world, _world_size)
+    for _ in range(_period):
+        _world = _engine.update_world(_world, _world_size)
+
+    ages = cycles.extrapolate_ages(landed, _engine.get_grid(_world, _world_size), _generations // _period)
+    if ages is None:
+        return _world
+
+    if hasattr(_engine, 'close_world'):
+        _engine.close_world(_world)
+    return create_engine_world(_engine, (landed[0], ages), _world_size, _workers, _rule)
+
+
 def simulation_decorator(func):
     """ Function decorator, used to run full extent of simulation. """
 
     # This function decorates run_simulation(). The simulation_decorator() function
     # takes the original function as parameter func. The inner wrapper() function
-    # takes the same parameters as original function run_simulation().
+    # takes the same parameters as original function run_simulation(). The original function stays reachable as
+    # run_simulation.__wrapped__ through functools.wraps(), for batch runs that step worlds without the wrapper.
     #
-    # Calls the create_logger() function to get the logger object, and calculates
-    # the number of populated cells. For this a list comprehension is used that makes a list of all the _population keys
-    # that is not None. The rim cells are excluded from list in this way. The length of this list is then extracted
-    # using len() - which gives the number of populated cells.
+    # Calls the create_logger() function to get the logger object, looks up the tick engine selected with -e using
+    # get_engine() and lets the engine create its own representation of the world from _population.
     #
-    # Loops through the range made from _generations and clears console for each generation, then loops through
-    # the keys in _population and increments the cells_living counter by 1 for each cell that is not a rim cell, and has
-    # an alive state of either cb.STATE_ALIVE, cb.STATE_ELDER or cb.STATE_PRIME_ELDER. It also increments the counter
-    # cells_state_elder by 1 for each cell with state cb.STATE_ELDER, and increments the counter cells_state_prime_elder
-    # by 1 for each cell with state cb.STATE_PRIME_ELDER.
+    # Loops until _generations have been run. The loop only computes generations, drawing and logging are done by the
+    # render and log stages of Project.pipeline, threads that get their work through bounded queues, so a slow console
+    # or disk does not hold up the ticks. A stage that fails ends the loop before the next generation with its error.
+    # Every _render_every generations a snapshot of the engine's get_states() is handed to the render stage, which is
+    # skipped entirely when _render_every is 0 and there is no delay. In 'clear' render mode it clears the console and
+    # prints the snapshot, in 'frame' and 'diff' mode the whole frame or the changed rows are written at once, see
+    # render.draw_states(). The number of cells in each state is asked from the engine with count_states() for the first
+    # generation only, after that it is kept up to date with the births, deaths and promotions that the engine reports
+    # for each tick, see Project.stats. Engines that report no changes are counted again. One record of the current
+    # generation is logged to GENERATIONS_LOGGER in _log_format by the log stage. This includes GENERATION counter with
+    # start 0, population number, number of living cells, number of elders, number of prime elders, number of dead
+    # cells, and in the jsonl and csv formats the changes.
     #
-    # Calculates the dead cells by subtracting cells_living from population_number.
+    # Calls the original run_simulation() function as func with the number of generations left to run, which
+    # returns the updated world, the number of generations it advanced and the changes. The number of generations
+    # is one for every engine except those that can jump ahead, such as hashlife. The updated world is stored in
+    # world and the generation counter is incremented. With a _delay, 200ms unless changed with --delay, every
+    # generation also goes to the render stage, which shows one generation per _delay seconds on a schedule that
+    # does not drift, while the loop computes ahead until the queue is full. Without a delay the render stage only
+    # draws the newest frame it has, and the loop runs at the speed of the engine. When all generations have been
+    # run and the stages have finished, the number of generations per second is printed and logged, and the
+    # buffered log records are written to file.
     #
-    # Logs information about current generation to _Resources/gol.log. This includes GENERATION counter with start 0,
-    # population number, number of living cells, number of elders, number of prime elders and number of dead cells.
+    # If a file name was given with --save, the final world is saved in the binary seed format with save_world().
     #
-    # Calls the original run_simulation() function as func with the original arguments
-    # which returns update_world(_population, _world_size). The updated population states
-    # are stored in _population and further execution is delayed 200ms between ticks.
-
-    def wrapper(_generations: int, _population: dict, _world_size: tuple):
+    # Engines that step the world in worker processes set USES_WORKERS and get the number of workers from --workers.
+    # Engines with a close_world() function hold resources such as processes or shared memory, which are released
+    # when the simulation ends, even if it ends with an exception.
+    #
+    # Every _checkpoint_every generations the grid is copied out of the engine with get_grid() and handed to a
+    # background thread that writes it to _Resources/_Checkpoints, see Project.checkpoint. A run resumed from a
+    # checkpoint with --resume starts counting at _start_generation and runs until _generations in total, and keeps
+    # the checkpoints that are there. Any other run removes them when it starts.
+    #
+    # With _record the grid of every generation, and of the world after the last one, is handed to the record stage,
+    # which writes it to _Resources/_Recordings as a key frame every _keyframe_every generations or as a delta
+    # against the previous generation, see Project.recording. Project.replay seeks to any generation of it.
+    #
+    # With _detect_cycles set to a mode of Project.cycles, the world of every generation is hashed before it is
+    # logged, from the states alone in 'states' mode. When a generation repeats one of the last cycles.CYCLE_WINDOW
+    # the world is in a still life or cycle: the statistics of the remaining generations are logged from the recorded
+    # cycle, the world is fast-forwarded by the few ticks needed to land on the same point of the cycle as the last
+    # generation, and the loop ends. Hashes are forgotten whenever an engine jumps more than one generation, since
+    # the skipped generations can not be extrapolated from.
+    #
+    # Engines that only track alive and dead cells set TRACKS_AGES to False. Unless ageing has been disabled with
+    # --no-ageing the simulation falls back to the engine named by FALLBACK_ENGINE, which is printed and logged.
+    #
+    # With _profile the loop switches the profiler between the phases of Project.profiling, and the engine's
+    # count_alive_neighbours() and cb.progress() are timed on their own, which gives a breakdown of the time per
+    # phase when the simulation ends. _cprofile records the run with cProfile to _Resources/gol.prof, and _metrics
+    # keeps _Resources/gol.prom up to date with the ticks and cells per second in the Prometheus text format.
+    #
+    # Engines that set USES_RULES, such as the table engine, get _rule from --rule, --elder-age and --prime-elder-age
+    # and compute generations with it, every other engine has Conway's rules with elders at age 5 and 10 built in.
+    #
+    # With _census the records pass through the census stage on their way to the log stage. Every _census
+    # generations a snapshot of the states goes with the record, and the stage adds the number of still lifes,
+    # oscillators, spaceships and known patterns to it, see Project.census. Messages take the same way to keep
+    # their place between the records.
+
+    @functools.wraps(func)
+    def wrapper(_generations: int, _population, _world_size: tuple, _engine: str = 'dict', _ageing: bool = True,
+                _workers: int = None, _render_every: int = 1, _delay: float = 0.2, _render_mode: str = 'frame',
+                _save: str = None, _checkpoint_every: int = 0, _start_generation: int = 0,
+                _detect_cycles: str = None, _log_format: str = 'text', _profile: bool = False,
+                _cprofile: bool = False, _metrics: bool = False, _rule: dict = None, _record: str = None,
+                _keyframe_every: int = recording.KEYFRAME_EVERY, _census: int = 0,
+                _resume: bool = False):
         """Controls generation ticks and logs generation info to _Resources/gol.log"""
 
-        logger = create_logger()
-        population_number = len([cell for cell in _population.keys() if _population[cell] is not None])
-
-        for gen in (range(_generations)):
-
-            cb.clear_console()
-
-            cells_living = 0
-            cells_state_elder = 0
-            cells_state_prime_elder = 0
-            for cell in _population:
-                if _population[cell] is not None:
-                    if _population[cell]['state'] == cb.STATE_ALIVE:
-                        cells_living += 1
-                    elif _population[cell]['state'] == cb.STATE_ELDER:
-                        cells_state_elder += 1
-                        cells_living += 1
-                    elif _population[cell]['state'] == cb.STATE_PRIME_ELDER:
-                        cells_state_prime_elder += 1
-                        cells_living += 1
-
-            cells_dead = population_number - cells_living
-
-            logger.info(f'GENERATION {gen}')
-            logger.info(f'Population: {population_number}')
-            logger.info(f'Alive: {cells_living}')
-            logger.info(f'Elders: {cells_state_elder}')
-            logger.info(f'Prime Elders: {cells_state_prime_elder}')
-            logger.info(f'Dead: {cells_dead}')
+        logger = create_logger(_log_format, bool(_census))
+        generations_logger = logging.getLogger(GENERATIONS_LOGGER)
+        engine = get_engine(_engine)
+
+        if _ageing and not engine.TRACKS_AGES:
+            message = f"The {_engine} engine does not track cell ages, falling back to the " \
+                      f"{engine.FALLBACK_ENGINE} engine. Use --no-ageing to run the {_engine} engine."
+            print(message)
+            logger.info(message)
+            _engine = engine.FALLBACK_ENGINE
+            engine = get_engine(_engine)
+
+        world = create_engine_world(engine, _population, _world_size, _workers, _rule)
+        renderer = render.create_renderer(_render_mode, _world_size)
+        gen = _start_generation
+        next_render = next_census = gen
+        next_checkpoint = gen + _checkpoint_every
+        writer = checkpoint.start_writer(CHECKPOINTS.absolute(), _resume) if _checkpoint_every else None
+        detector = cycles.create_detector(_detect_cycles) if _detect_cycles else None
+        state_counts = changes = None
+        completed = False
+        profiler = profiling.create_profiler(_profile, RESOURCES.resolve() / 'gol.prof' if _cprofile else None,
+                                             RESOURCES.resolve() / 'gol.prom' if _metrics else None,
+                                             {'engine': _engine, 'world_size': f'{_world_size[0]}x{_world_size[1]}'})
+        profiling.install_hooks(profiler, ((engine, 'count_alive_neighbours', 'neighbours'),
+                                           (cb, 'progress', 'output')))
+        render_stage = None
+        if _render_every or _delay:
+            render_stage = pipeline.create_stage('render', pipeline.create_render_handler(renderer, _delay, gen,
+                                                                                          profiler))
+        log_stage = pipeline.create_stage('log', pipeline.create_log_handler(logger, generations_logger, _log_format,
+                                                                            profiler))
+        census_stage = None
+        if _census:
+            census_state = census.create_census(_world_size)
+            census_stage = pipeline.create_stage('census', census.create_census_handler(census_state, log_stage,
+                                                                                        profiler))
+        recorder = record_stage = None
+        if _record:
+            recorder = recording.create_recorder(recording.get_recording_path(RECORDINGS.resolve(), _record),
+                                                 _world_size, _keyframe_every, gen)
+            record_stage = pipeline.create_stage('record', recording.create_record_handler(recorder, profiler))
+        start_time = perf_counter()
+        profiling.start(profiler, _world_size, gen)
+
+        def show(_message: str):
+            if render_stage:
+                pipeline.put(render_stage, ('text', _message))
+            else:
+                print(_message)
+            pipeline.put(census_stage or log_stage, ('message', _message))
 
-            _population = func(_generations, _population, _world_size)
-            sleep(0.2)
+        def log_record(_record: dict, _states: bytes = None):
+            if census_stage:
+                pipeline.put(census_stage, ('record', _record, _states))
+            else:
+                pipeline.put(log_stage, ('record', _record))
+
+        try:
+            while gen < _generations:
+                pipeline.check_stages(render_stage, census_stage, log_stage, record_stage)
+
+                if record_stage:
+                    profiling.switch_phase(profiler, 'checkpoint')
+                    grid_copy = engine.get_grid(world, _world_size)
+                    profiling.switch_phase(profiler, 'wait')
+                    pipeline.put(record_stage, (gen, grid_copy))
+
+                profiling.switch_phase(profiler, 'wait')
+                if render_stage:
+                    states = None
+                    if _render_every and gen >= next_render:
+                        states = bytes(engine.get_states(world, _world_size))
+                        next_render = gen - gen % _render_every + _render_every
+                    if states is not None or _delay:
+                        pipeline.put(render_stage, ('frame', gen, states))
+
+                profiling.switch_phase(profiler, 'stats')
+                if changes is None:
+                    state_counts = engine.count_states(world, _world_size)
+                else:
+                    state_counts = stats.apply_changes(state_counts, changes)
+                record = stats.create_record(gen, state_counts, changes)
+
+                if detector:
+                    cycle_grid = (engine.get_states(world, _world_size), None) if detector['mode'] == 'states' \
+                        else engine.get_grid(world, _world_size)
+                    first = cycles.find_cycle(detector, cycle_grid, gen, record)
+                    if first is not None:
+                        period = gen - first
+                        profiling.switch_phase(profiler, 'wait')
+                        show(f'Generation {gen} repeats generation {first}, a cycle of period {period}. '
+                             f'Extrapolating generations {gen} to {_generations - 1}.')
+                        for skipped in range(gen, _generations):
+                            log_record(cycles.get_cycle_record(detector, first, period, skipped))
+                        profiling.switch_phase(profiler, 'rules')
+                        world = fast_forward_cycle(engine, world, _world_size, period, _generations - gen, _workers,
+                                                   _rule)
+                        gen = _generations
+                        profiling.count_generations(profiler, gen)
+                        break
+
+                census_states = None
+                if census_stage and gen >= next_census:
+                    census_states = bytes(engine.get_states(world, _world_size))
+                    next_census = gen - gen % _census + _census
+
+                profiling.switch_phase(profiler, 'wait')
+                log_record(record, census_states)
+
+                profiling.switch_phase(profiler, 'rules')
+                world, ticks, changes = func(_generations - gen, world, _world_size, _engine)
+                gen += ticks
+                profiling.count_generations(profiler, gen)
+                if detector and ticks > 1:
+                    cycles.reset_detector(detector)
+                if writer and gen >= next_checkpoint:
+                    profiling.switch_phase(profiler, 'checkpoint')
+                    checkpoint.write_checkpoint(writer, engine.get_grid(world, _world_size), _world_size, gen)
+                    next_checkpoint = gen - gen % _checkpoint_every + _checkpoint_every
+
+            profiling.switch_phase(profiler)
+            if _save or record_stage:
+                grid_copy = engine.get_grid(world, _world_size)
+                if record_stage:
+                    pipeline.put(record_stage, (gen, grid_copy))
+                if _save:
+                    save_world(_save, grid_copy, _world_size, _rule['name'] if _rule else pattern_formats.RLE_RULE)
+            completed = True
+
+        finally:
+            try:
+                profiling.switch_phase(profiler, 'wait')
+                pipeline.stop_stages((render_stage, not completed), (census_stage, False), (log_stage, False),
+                                     (record_stage, False))
+            finally:
+                profiling.stop(profiler)
+                if recorder:
+                    recording.close_recorder(recorder)
+                if writer:
+                    checkpoint.stop_writer(writer)
+                if hasattr(engine, 'close_world'):
+                    engine.close_world(world)
+
+        elapsed = perf_counter() - start_time
+        generations_run = gen - _start_generation
+        message = f'{generations_run} generations in {elapsed:.3f} s, ' \
+                  f'{generations_run / elapsed if elapsed else 0:.1f} generations per second'
+        print(message)
+        logger.info(message)
+        if recorder:
+            message = f'Recording written to {recorder["path"]}, replay it with: python -m Project.replay {_record}'
+            print(message)
+            logger.info(message)
+        if profiler:
+            for line in profiling.get_report(profiler):
+                print(line)
+                logger.info(line)
+        flush_logger(logger)
 
         return None
 
@@ -241,8 +549,8 @@ def populate_world(_world_size: tuple, _seed_pattern: str = None) -> dict:
     #  Creates an empty dictionary for the population and lists of numbers in a range derived from _world_size
     #  width and height.
     #
-    #  Then tests if a seed has been stated in the -s argument, if True the pattern is loaded using cb.get_pattern for
-    #  for the actual seed and world size.
+    #  Then tests if a seed has been stated in the -s argument, if True the living cells of the pattern are built as a
+    #  set by Project.patterns for the actual seed and world size.
     #
     #  If False, sets pattern to None.
     #
@@ -250,10 +558,11 @@ def populate_world(_world_size: tuple, _seed_pattern: str = None) -> dict:
     #
     #  The product is made by world height, world_width (Y,X) instead of world_width, world_height (X,Y)
     #  in order to create each "X-coordinate" for every "Y-coordinate" instead of the opposite. This is also
-    #  to accommodate the format used for the coordinate patterns in cb.get_pattern.
+    #  to accommodate the (y, x) format used for the coordinate patterns in Project.patterns.
     #
     #  Iterating through the cells in the Cartesian product, it tests if the cell is a rim cell by testing
-    #  if the cell has max or min value for either width or height.
+    #  if the cell has max or min value for either width or height. These values are looked up once before the loop,
+    #  and the pattern is a set, so that each test takes constant time.
     #
     #  Tests if a seed pattern has been stated as argument. If true - determines cell state from pattern, if
     #  false - randomises cell state using the random.randint() function combined with an if/else clause.
@@ -265,18 +574,19 @@ def populate_world(_world_size: tuple, _seed_pattern: str = None) -> dict:
     population = {}
 
     world_width, world_height = list(range(_world_size[0])), list(range(_world_size[1]))
+    rim_x, rim_y = (min(world_width), max(world_width)), (min(world_height), max(world_height))
 
     if _seed_pattern is not None:
-        pattern = cb.get_pattern(_seed_pattern, _world_size)
+        pattern = patterns.get_cells(patterns.get_seed_placements(_seed_pattern, _world_size), _world_size)
     else:
         pattern = None
 
     for cell in itertools.product(world_height, world_width):
 
-        if cell[1] == min(world_width) or cell[1] == max(world_width):
+        if cell[1] in rim_x:
             population[cell] = None
             continue
-        elif cell[0] == min(world_height) or cell[0] == max(world_height):
+        elif cell[0] in rim_y:
             population[cell] = None
             continue
         elif _seed_pattern is not None:
@@ -299,6 +609,128 @@ def populate_world(_world_size: tuple, _seed_pattern: str = None) -> dict:
     return population
 
 
+def populate_grid(_world_size: tuple, _seed_pattern: str = None, _density: float = DEFAULT_DENSITY,
+                  _rng_seed: int = None, _stamps: list = None) -> tuple:
+    """ Populate a flat (states, ages) grid in bulk. Returns tuple: states (bytearray) and ages (None, all 0). """
+
+    #  Builds the same kind of world as populate_world() without a Python loop over the cells, which every engine
+    #  accepts in place of a population dictionary.
+    #
+    #  Without a seed pattern, one random byte is drawn per cell from the SHAKE-128 output of _rng_seed, which
+    #  produces the bytes of the whole world in C and always the same ones for the same seed. Without a seed a
+    #  random one is drawn. bytearray.translate() then maps every byte below _density * 256 to CODE_ALIVE and all
+    #  others to CODE_DEAD. With a seed pattern, the states start dead and only the cells of the pattern are set alive.
+    #  _stamps are placements of Project.patterns, stamped on top of the seed pattern, or on a dead world without one.
+    #
+    #  The rim is then written over the outermost rows with slice assignment, and over the outermost columns with a
+    #  step of width. Ages all start at 0, so no ages are built and the grid holds None in their place, which the
+    #  engines read as age 0 for every cell. This saves the 4 bytes per cell that zeroed ages would take, since
+    #  CPython clears every byte of a new bytearray or array and so touches all of their memory.
+
+    width, height = _world_size
+    size = width * height
+
+    if _seed_pattern is not None or _stamps:
+        states = bytearray(size)
+        if _seed_pattern is not None:
+            patterns.stamp(states, _world_size, patterns.get_seed_placements(_seed_pattern, _world_size))
+        patterns.stamp(states, _world_size, _stamps or ())
+    else:
+        threshold = round(_density * 256)
+        table = bytes(grid.CODE_ALIVE if value < threshold else grid.CODE_DEAD for value in range(256))
+        rng_seed = random.getrandbits(64) if _rng_seed is None else _rng_seed
+        states = bytearray(hashlib.shake_128(str(rng_seed).encode()).digest(size)).translate(table)
+
+    states[:width] = states[-width:] = bytes((grid.CODE_RIM,)) * width
+    states[::width] = states[width - 1::width] = bytes((grid.CODE_RIM,)) * height
+
+    return states, None
+
+
+def populate_living(_world_size: tuple, _seed_pattern: str = None, _density: float = DEFAULT_DENSITY,
+                    _rng_seed: int = None, _stamps: list = None) -> dict:
+    """ Populate a world with its living cells only. Returns dict: population of the living cells. """
+
+    #  Builds the same kind of world as populate_grid() for engines that set LIVING_CELLS, which keep only the living
+    #  cells, so memory follows the population instead of the area. The population dictionary holds a cell with its
+    #  'state' and 'age' for every living cell, and nothing for dead and rim cells.
+    #
+    #  With a seed pattern or _stamps, the cells come straight from their placements. Without, the inner cells are
+    #  numbered row by row and the gaps between living cells are drawn from a geometric distribution, which gives
+    #  every inner cell the chance _density of being alive without visiting the dead ones. The same seed always gives
+    #  the same world, but not the same one as populate_grid().
+
+    width, height = _world_size
+
+    if _seed_pattern is not None or _stamps:
+        placements = list(_stamps or ())
+        if _seed_pattern is not None:
+            placements += patterns.get_seed_placements(_seed_pattern, _world_size)
+        cells = patterns.get_cells(placements, _world_size)
+    else:
+        inner_width, size = width - 2, max(width - 2, 0) * max(height - 2, 0)
+        rng = random.Random(random.getrandbits(64) if _rng_seed is None else _rng_seed)
+
+        def get_gap() -> int:
+            if _density >= 1:
+                return 0
+            return int(math.log(1.0 - rng.random()) / math.log(1.0 - _density))
+
+        cells = []
+        index = get_gap() if _density > 0 else size
+        while index < size:
+            cells.append((1 + index // inner_width, 1 + index % inner_width))
+            index += 1 + get_gap()
+
+    return {cell: {'state': cb.STATE_ALIVE, 'age': 0} for cell in cells}
+
+
+def populate_bands(_world_size: tuple, _seed_pattern: str = None, _density: float = DEFAULT_DENSITY,
+                   _rng_seed: int = None, _stamps: list = None, _band_cells: int = POPULATE_BAND_CELLS):
+    """ Populate a world one band of rows at a time. Returns generator of (first row, states) tuples. """
+
+    #  Builds the same kind of world as populate_grid() for engines that set OUT_OF_CORE, which write every band
+    #  into their own storage, so the whole grid is never in memory. Ages all start at 0 and are not part of a band.
+    #
+    #  The random bytes of every band are drawn from the SHAKE-128 output of _rng_seed and the first row of the
+    #  band, so the same seed always gives the same world, but not the same one as populate_grid(). The placements of
+    #  the seed pattern and _stamps are sorted into the bands they overlap once, so every band only stamps its own.
+    #  The seed pattern is looked up before the first band is asked for, which raises a ValueError for unknown seeds.
+
+    width, height = _world_size
+    band_rows = max(1, _band_cells // max(width, 1))
+    placements = list(_stamps or ())
+    if _seed_pattern is not None:
+        placements += patterns.get_seed_placements(_seed_pattern, _world_size)
+    rng_seed = random.getrandbits(64) if _rng_seed is None else _rng_seed
+    threshold = round(_density * 256)
+    table = bytes(grid.CODE_ALIVE if value < threshold else grid.CODE_DEAD for value in range(256))
+
+    band_placements = {}
+    for placement in placements:
+        top, bottom = placement[1], placement[1] + patterns.get_size(placement[0], *placement[3:])[1] - 1
+        for band in range(max(top, 0) // band_rows, max(bottom, 0) // band_rows + 1):
+            band_placements.setdefault(band, []).append(placement)
+
+    def create_bands():
+        for first in range(0, height, band_rows):
+            rows = min(band_rows, height - first)
+            if placements:
+                states = bytearray(rows * width)
+                patterns.stamp(states, _world_size, band_placements.get(first // band_rows, ()), first)
+            else:
+                digest = hashlib.shake_128(f'{rng_seed}:{first}'.encode()).digest(rows * width)
+                states = bytearray(digest).translate(table)
+            if first == 0:
+                states[:width] = bytes((grid.CODE_RIM,)) * width
+            if first + rows == height:
+                states[-width:] = bytes((grid.CODE_RIM,)) * width
+            states[::width] = states[width - 1::width] = bytes((grid.CODE_RIM,)) * rows
+            yield first, states
+
+    return create_bands()
+
+
 def calc_neighbour_positions(_cell_coord: tuple) -> list:
     """ Calculate neighbouring cell coordinates in all directions (cardinal + diagonal).
     Returns list of tuples. """
@@ -328,32 +760,46 @@ def calc_neighbour_positions(_cell_coord: tuple) -> list:
 
 
 @simulation_decorator
-def run_simulation(_generations: int, _population: dict, _world_size: tuple):
+def run_simulation(_generations: int, _population, _world_size: tuple, _engine: str = 'dict') -> tuple:
     """ Runs simulation for specified amount of generations. """
 
-    # This function only returns a function call to update_world, which returns updated
-    # population states. The actual simulation ticks are handled in the simulation_decorator()
+    # This function only returns the selected engine's next world, the number of generations it advanced and the
+    # changes of the tick. Engines with an advance() function may jump up to _generations ahead, engines with a
+    # step_world() function are ticked once and report their births, deaths and promotions, and any other engine is
+    # ticked once with update_world(), without changes. The actual simulation ticks are handled in the
+    # simulation_decorator()
 
-    return update_world(_population, _world_size)
+    engine = get_engine(_engine)
+    if hasattr(engine, 'advance'):
+        return (*engine.advance(_population, _generations, _world_size), None)
+
+    if hasattr(engine, 'step_world'):
+        world, changes = engine.step_world(_population, _world_size)
+        return world, 1, changes
+
+    return engine.update_world(_population, _world_size), 1, None
 
 
 def update_world(_cur_gen: dict, _world_size: tuple) -> dict:
     """ Represents a tick in the simulation. """
 
-    #  Creates empty dictionary for next generation, then iterates through each cell
-    #  in the _cur_gen from run_simulation() with start = 1 to get actual numbers for cells iterated over.
+    return step_world(_cur_gen, _world_size)[0]
+
+
+def step_world(_cur_gen: dict, _world_size: tuple) -> tuple:
+    """ Represents a tick in the simulation. Returns tuple: population (dict) and changes (tuple). """
+
+    #  Creates empty dictionary for next generation, then iterates through each cell in the _cur_gen from
+    #  run_simulation(). Drawing the generation is left to the render stage, so that the rules run without a console.
     #
     #  Creates an empty nested dictionary for the cell, then checks if the cell is a
-    #  rim cell. If true, it prints the formatted value for rim cells using cb.progress together with cb.get_print_value
-    #  and copies the cell state from _cur_gen cell to the next_gen cell. Then tests if the index from enumerate is
-    #  evenly divisible with the world width. If True, this means the current cell being iterated over is
-    #  located at the maximum world width, and a line break is performed by printing a newline to console.
+    #  rim cell. If true, it copies the cell state from _cur_gen cell to the next_gen cell.
     #
-    #  If the cell is not a rim cell the generational update block is executed. It prints the _cur_gen cell state
-    #  and copies the _cur_gen cell neighbours to next_gen cell neighbours since the cell neighbours will always
-    #  have the same position. It then copies the _cur_gen cell age key/value pair to prepare it for modification
-    #  depending on the game rules. Then it determines the _cur_gen cell alive neighbours using count_alive_neighbours
-    #  which is important for determining the next cell state.
+    #  If the cell is not a rim cell the generational update block is executed. It copies the _cur_gen cell neighbours
+    #  to next_gen cell neighbours since the cell neighbours will always have the same position. It then copies the
+    #  _cur_gen cell age key/value pair to prepare it for modification depending on the game rules. Then it determines
+    #  the _cur_gen cell alive neighbours using count_alive_neighbours which is important for determining the next cell
+    #  state.
     #
     #  The cell states for the next generation are determined as follows.
     #
@@ -388,23 +834,21 @@ def update_world(_cur_gen: dict, _world_size: tuple) -> dict:
     #
     #
     #  Finally the next_gen cell state is set based on the above tests and the next_gen population dictionary is
-    #  returned to run_simulation().
+    #  returned to run_simulation(), together with the births, deaths per state and promotions of the tick in the
+    #  order of stats.CHANGE_FIELDS.
 
     next_gen = {}
+    births = elder_promotions = prime_elder_promotions = 0
+    deaths = dict.fromkeys((cb.STATE_ALIVE, cb.STATE_ELDER, cb.STATE_PRIME_ELDER), 0)
 
-    for num, cell in enumerate(_cur_gen, start=1):
+    for cell in _cur_gen:
 
         next_gen[cell] = {}
 
         if _cur_gen[cell] is None:
-            cb.progress(cb.get_print_value(cb.STATE_RIM))
             next_gen[cell] = _cur_gen[cell]
-            if num % _world_size[0] == 0:
-                cb.progress('\n')
 
         else:
-            cb.progress(cb.get_print_value(_cur_gen[cell]['state']))
-
             next_gen[cell]['neighbours'] = _cur_gen[cell]['neighbours']
             next_gen[cell]['age'] = _cur_gen[cell]['age']
             neighbours_alive = count_alive_neighbours(_cur_gen[cell]['neighbours'], _cur_gen)
@@ -414,11 +858,13 @@ def update_world(_cur_gen: dict, _world_size: tuple) -> dict:
                 if _cur_gen[cell]['state'] == cb.STATE_ALIVE:
                     if _cur_gen[cell]['age'] == 5:
                         cell_state = cb.STATE_ELDER
+                        elder_promotions += 1
                     else:
                         cell_state = cb.STATE_ALIVE
                 elif _cur_gen[cell]['state'] == cb.STATE_ELDER:
                     if _cur_gen[cell]['age'] == 10:
                         cell_state = cb.STATE_PRIME_ELDER
+                        prime_elder_promotions += 1
                     else:
                         cell_state = cb.STATE_ELDER
                 else:
@@ -429,17 +875,20 @@ def update_world(_cur_gen: dict, _world_size: tuple) -> dict:
             elif _cur_gen[cell]['state'] == cb.STATE_DEAD and neighbours_alive == 3:
                 cell_state = cb.STATE_ALIVE
                 next_gen[cell]['age'] = 0
+                births += 1
 
             elif _cur_gen[cell]['state'] in (cb.STATE_ALIVE, cb.STATE_ELDER, cb.STATE_PRIME_ELDER):
                 cell_state = cb.STATE_DEAD
                 next_gen[cell]['age'] = 0
+                deaths[_cur_gen[cell]['state']] += 1
 
             else:
                 cell_state = _cur_gen[cell]['state']
 
             next_gen[cell]['state'] = cell_state
 
-    return next_gen
+    return next_gen, (births, deaths[cb.STATE_ALIVE], deaths[cb.STATE_ELDER], deaths[cb.STATE_PRIME_ELDER],
+                      elder_promotions, prime_elder_promotions)
 
 
 def count_alive_neighbours(_neighbours: list, _cells: dict) -> int:
@@ -464,6 +913,80 @@ def count_alive_neighbours(_neighbours: list, _cells: dict) -> int:
     return neighbours_alive
 
 
+# -----------------------------------------
+# TICK ENGINES
+# -----------------------------------------
+
+def get_engine(_engine: str):
+    """ Look up the tick engine module for the -e argument. """
+
+    #  An engine is a module with the functions create_world(), update_world(), get_states(), count_states() and
+    #  get_grid(), and the TRACKS_AGES flag. Engines without ages also name a FALLBACK_ENGINE to use when ageing is
+    #  enabled. Engines whose world is not bounded by the world size set UNBOUNDED, and treat the world size as the
+    #  viewport. Engines that keep the world on disk set OUT_OF_CORE, and get new worlds from populate_bands() one band
+    #  at a time. Engines that keep only the living cells set LIVING_CELLS, and get new worlds from populate_living() as
+    #  a population dictionary of the living cells. The functions in this module make up the 'dict' engine, every other
+    #  engine lives in Project/<name>_engine.py and is imported on first use so that optional dependencies such as NumPy
+    #  are only needed when selected.
+
+    if _engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{_engine}', choose one of: {', '.join(ENGINES)}")
+
+    if _engine == 'dict':
+        return sys.modules[__name__]
+
+    return importlib.import_module(f'Project.{_engine}_engine')
+
+
+def create_world(_population, _world_size: tuple) -> dict:
+    """ Create the population dictionary used by the dict engine from a population dictionary or grid. """
+
+    if isinstance(_population, dict):
+        return _population
+
+    states, ages = _population
+    width = _world_size[0]
+    population = {}
+
+    for index, code in enumerate(states):
+        cell = divmod(index, width)
+        if code == grid.CODE_RIM:
+            population[cell] = None
+        else:
+            population[cell] = {
+                'state': grid.CODE_STATES[code],
+                'neighbours': calc_neighbour_positions(cell),
+                'age': 0 if ages is None else ages[index]
+            }
+
+    return population
+
+
+def get_states(_population: dict, _world_size: tuple) -> bytearray:
+    """ Return the state codes of the population as flat bytes. """
+
+    return bytearray(grid.STATE_CODES[cb.STATE_RIM] if cell is None else grid.STATE_CODES[cell['state']]
+                     for cell in _population.values())
+
+
+def count_states(_population: dict, _world_size: tuple) -> dict:
+    """ Count the cells of each state in the population. Returns dict of state: count, rim cells excluded. """
+
+    state_counts = dict.fromkeys((cb.STATE_DEAD, cb.STATE_ALIVE, cb.STATE_ELDER, cb.STATE_PRIME_ELDER), 0)
+
+    for cell in _population.values():
+        if cell is not None:
+            state_counts[cell['state']] += 1
+
+    return state_counts
+
+
+def get_grid(_population: dict, _world_size: tuple) -> tuple:
+    """ Return the population as a flat (states, ages) grid. """
+
+    return grid.population_to_grid(_population, _world_size)
+
+
 def main():
     """ The main program execution. YOU MAY NOT MODIFY ANYTHING IN THIS FUNCTION!! """
     epilog = "DT179G Project v" + __version__
@@ -472,22 +995,160 @@ def main():
                         help='Amount of generations the simulation should run. Defaults to 50.')
     parser.add_argument('-s', '--seed', dest='seed', type=str,
                         help='Starting seed. If omitted, a randomized seed will be used.')
-    parser.add_argument('-ws', '--worldsize', dest='worldsize', type=str, default='80x40',
+    parser.add_argument('-ws', '--worldsize', dest='worldsize', type=str,
                         help='Size of the world, in terms of width and height. Defaults to 80x40.')
     parser.add_argument('-f', '--file', dest='file', type=str,
                         help='Load starting seed from file.')
+    parser.add_argument('--density', dest='density', type=float, default=DEFAULT_DENSITY,
+                        help='Share of living cells in a randomized seed, from 0 to 1. Defaults to 4/21.')
+    parser.add_argument('--rng-seed', dest='rng_seed', type=int,
+                        help='Seed of the random generator for a randomized seed, to get the same world again.')
+    parser.add_argument('--save', dest='save', type=str,
+                        help='Save the final world to this file in _Resources/_Project_Files, in the binary seed '
+                             'format, or as a pattern when the name ends with .rle, .cells, .lif or .life. Load it '
+                             'again with -f.')
+    parser.add_argument('--offset', dest='offset', type=str,
+                        help='Position XxY in the world of the origin of a pattern file loaded with -f. '
+                             'Defaults to the pattern centered in the world.')
+    parser.add_argument('--stamp', dest='stamp', type=str, nargs='+',
+                        help='Stamp copies of a pattern over the whole world, on top of the seed or on an empty world '
+                             'without one, as NAME:STEP[:ROTATION[:FLIP[:XxY]]]: one copy every STEP cells, or XxY '
+                             f"cells, from the offset XxY. Patterns: {', '.join(patterns.PATTERNS)}.")
+    parser.add_argument('-e', '--engine', dest='engine', type=str, default='dict', choices=ENGINES,
+                        help='Tick engine used to compute generations. Defaults to dict.')
+    parser.add_argument('--rule', dest='rule', type=str,
+                        help='Rule in B/S notation for the table engine, like B36/S23. Defaults to B3/S23.')
+    parser.add_argument('--elder-age', dest='elder_age', type=int,
+                        help='Age at which an alive cell becomes an elder, for the table engine. Defaults to 5.')
+    parser.add_argument('--prime-elder-age', dest='prime_elder_age', type=int,
+                        help='Age at which an elder becomes a prime elder, for the table engine. Defaults to 10.')
+    parser.add_argument('--workers', dest='workers', type=int,
+                        help='Number of worker processes for the parallel engine. Defaults to one per CPU core.')
+    parser.add_argument('--no-render', dest='render', action='store_false',
+                        help='Do not print the world, only compute generations.')
+    parser.add_argument('--render-every', dest='render_every', type=int, default=1,
+                        help='Print the world every N generations. Defaults to 1.')
+    parser.add_argument('--render-mode', dest='render_mode', type=str, default='frame', choices=render.RENDER_MODES,
+                        help='How the world is drawn: clear and print every cell, write whole frames, or only '
+                             'redraw changed rows. Defaults to frame.')
+    parser.add_argument('--delay', dest='delay', type=float,
+                        help='Delay in seconds between generations. Defaults to 0.2, or 0 with --no-render.')
+    parser.add_argument('--no-ageing', dest='ageing', action='store_false',
+                        help='Only use alive and dead cells, without elders. Required by the hashlife engine.')
+    parser.add_argument('--checkpoint-every', dest='checkpoint_every', type=int, default=0,
+                        help='Write a compressed checkpoint to _Resources/_Checkpoints every N generations, in the '
+                             'background. Defaults to 0, no checkpoints.')
+    parser.add_argument('--resume', dest='resume', action='store_true',
+                        help='Continue from the latest checkpoint instead of a new seed, until -g generations '
+                             'in total have been run.')
+    parser.add_argument('--record', dest='record', type=str,
+                        help='Record every generation to this file in _Resources/_Recordings, as deltas with a key '
+                             'frame every --keyframe-every generations, to seek in with python -m Project.replay.')
+    parser.add_argument('--keyframe-every', dest='keyframe_every', type=int, default=recording.KEYFRAME_EVERY,
+                        help=f'Generations between key frames of --record. Defaults to {recording.KEYFRAME_EVERY}.')
+    parser.add_argument('--detect-cycles', dest='detect_cycles', nargs='?', const='ages', choices=cycles.CYCLE_MODES,
+                        help='Stop computing once the world is a still life or repeats a cycle, and extrapolate '
+                             'the log for the remaining generations. "ages" also compares the ages that can still '
+                             'promote a cell, "states" only the states. Defaults to ages.')
+    parser.add_argument('--log-format', dest='log_format', type=str, default='text', choices=stats.LOG_FORMATS,
+                        help='Format of the per-generation log: six text lines in _Resources/gol.log, or one record '
+                             'per line in _Resources/gol.jsonl or _Resources/gol.csv. Defaults to text.')
+    parser.add_argument('--census', dest='census', type=int, default=0,
+                        help='Count still lifes, oscillators and spaceships such as gliders every N generations, and '
+                             'log them with the statistics. Defaults to 0, no census.')
+    parser.add_argument('--profile', dest='profile', action='store_true',
+                        help='Time the phases of every generation: rules, neighbour counting, rendering, console '
+                             'output, stats, logging, checkpoints and delay, and print the breakdown at the end.')
+    parser.add_argument('--cprofile', dest='cprofile', action='store_true',
+                        help='Record the simulation with cProfile and save the statistics to _Resources/gol.prof.')
+    parser.add_argument('--metrics', dest='metrics', action='store_true',
+                        help='Keep _Resources/gol.prom up to date with ticks and cells per second, in the '
+                             'Prometheus text format.')
 
     args = parser.parse_args()
 
-    try:
-        if not args.file:
-            raise AssertionError
-        population, world_size = load_seed_from_file(args.file)
-    except (AssertionError, FileNotFoundError):
-        world_size = parse_world_size_arg(args.worldsize)
-        population = populate_world(world_size, args.seed)
-
-    run_simulation(args.generations, population, world_size)
+    if not args.ageing and get_engine(args.engine).TRACKS_AGES:
+        parser.error(f'--no-ageing is only supported by engines without cell ages, not {args.engine}')
+    if args.workers is not None and not getattr(get_engine(args.engine), 'USES_WORKERS', False):
+        parser.error(f'--workers is only supported by the parallel engine, not {args.engine}')
+    rule = None
+    if getattr(get_engine(args.engine), 'USES_RULES', False):
+        engine = get_engine(args.engine)
+        try:
+            rule = engine.parse_rule(args.rule or engine.DEFAULT_RULE,
+                                     engine.ELDER_AGE if args.elder_age is None else args.elder_age,
+                                     engine.PRIME_ELDER_AGE if args.prime_elder_age is None else args.prime_elder_age)
+        except ValueError as error:
+            parser.error(str(error))
+    elif (args.rule, args.elder_age, args.prime_elder_age) != (None, None, None):
+        parser.error(f'--rule, --elder-age and --prime-elder-age are only supported by the table engine, '
+                     f'not {args.engine}')
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers needs at least 1 worker')
+    if args.render_every < 1:
+        parser.error('--render-every needs to be at least 1')
+    if not 0 <= args.density <= 1:
+        parser.error('--density needs to be between 0 and 1')
+    if args.checkpoint_every < 0:
+        parser.error('--checkpoint-every needs to be at least 0')
+    if getattr(get_engine(args.engine), 'UNBOUNDED', False) and (args.checkpoint_every or args.detect_cycles):
+        parser.error(f'--checkpoint-every and --detect-cycles only see the viewport of the {args.engine} engine, '
+                     f'which does not hold the whole world')
+    if args.delay is None:
+        args.delay = 0.2 if args.render else 0.0
+    if args.offset is not None:
+        try:
+            x_offset, y_offset = args.offset.split('x')
+            args.offset = int(x_offset), int(y_offset)
+        except ValueError:
+            parser.error(f"--offset needs to be XxY, not '{args.offset}'")
+
+    if args.census < 0:
+        parser.error('--census needs to be at least 0')
+    if args.keyframe_every < 1:
+        parser.error('--keyframe-every needs to be at least 1')
+    if args.stamp and (args.file or args.resume):
+        parser.error('--stamp can not be combined with -f or --resume')
+
+    start_generation = 0
+
+    if args.resume:
+        try:
+            population, world_size, start_generation = checkpoint.load_latest_checkpoint(CHECKPOINTS.absolute())
+        except (ValueError, FileNotFoundError) as error:
+            parser.error(f'--resume failed: {error}')
+        if args.worldsize is not None and parse_world_size_arg(args.worldsize) != world_size:
+            parser.error(f'--resume failed: the checkpoint is of a {world_size[0]}x{world_size[1]} world, '
+                         f'not {args.worldsize}')
+    else:
+        try:
+            if not args.file:
+                raise AssertionError
+            #  Only pattern files need -ws, '.json' and '.seed' files carry their own world size.
+            pattern_world_size = None
+            if Path(args.file).suffix.lower() in pattern_formats.PATTERN_SUFFIXES:
+                pattern_world_size = parse_world_size_arg(args.worldsize or DEFAULT_WORLD_SIZE)
+            population, world_size = load_seed_from_file(args.file, pattern_world_size, args.offset)
+        except ValueError as error:
+            parser.error(str(error))
+        except (AssertionError, FileNotFoundError):
+            world_size = parse_world_size_arg(args.worldsize or DEFAULT_WORLD_SIZE)
+            try:
+                stamps = [placement for arg in args.stamp or () for placement in patterns.parse_stamp(arg, world_size)]
+                if getattr(get_engine(args.engine), 'OUT_OF_CORE', False):
+                    population = populate_bands(world_size, args.seed, args.density, args.rng_seed, stamps)
+                elif getattr(get_engine(args.engine), 'LIVING_CELLS', False):
+                    population = populate_living(world_size, args.seed, args.density, args.rng_seed, stamps)
+                else:
+                    population = populate_grid(world_size, args.seed, args.density, args.rng_seed, stamps)
+            except ValueError as error:
+                parser.error(str(error))
+
+    run_simulation(args.generations, population, world_size, args.engine, args.ageing, args.workers,
+                   args.render_every if args.render else 0, args.delay, args.render_mode,
+                   args.save, args.checkpoint_every, start_generation, args.detect_cycles,
+                   args.log_format, args.profile, args.cprofile, args.metrics, rule, args.record, args.keyframe_every,
+                   args.census, args.resume)
 
 
 if __name__ == "__main__":
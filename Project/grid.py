@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Flat grid representation of a Game of Life population, shared by the alternative tick engines.
+
+A grid is a pair (states, ages) laid out row by row, where states is a bytearray of the integer
+state codes below and ages is an array('I') holding the age of every cell, or None when every cell
+has age 0, as in the new worlds of gol.populate_grid(). Index i of a grid in a
+world of size (width, height) is the cell (i // width, i % width), which is the same (y, x) key
+used by the population dictionary in gol.py.
+"""
+
+from array import array
+
+import Project.code_base as cb
+
+CODE_DEAD, CODE_ALIVE, CODE_ELDER, CODE_PRIME_ELDER, CODE_RIM = 0, 1, 2, 3, 4
+LIVING_CODES = (CODE_ALIVE, CODE_ELDER, CODE_PRIME_ELDER)
+
+STATE_CODES = {
+    cb.STATE_DEAD: CODE_DEAD,
+    cb.STATE_ALIVE: CODE_ALIVE,
+    cb.STATE_ELDER: CODE_ELDER,
+    cb.STATE_PRIME_ELDER: CODE_PRIME_ELDER,
+    cb.STATE_RIM: CODE_RIM
+}
+CODE_STATES = (cb.STATE_DEAD, cb.STATE_ALIVE, cb.STATE_ELDER, cb.STATE_PRIME_ELDER, cb.STATE_RIM)
+
+
+def population_to_grid(_population: dict, _world_size: tuple) -> tuple:
+    """ Convert a population dictionary into a flat (states, ages) grid. """
+
+    #  Rim cells are stored as None in the population dictionary and get CODE_RIM in the grid. Every
+    #  other cell is placed at index y * width + x with its state code and age.
+
+    width, height = _world_size
+    states = bytearray(width * height)
+    ages = array('I', bytes(4 * width * height))
+
+    for (y, x), cell in _population.items():
+        index = y * width + x
+        if cell is None:
+            states[index] = CODE_RIM
+        else:
+            states[index] = STATE_CODES[cell['state']]
+            ages[index] = cell['age']
+
+    return states, ages
+
+
+def as_grid(_population, _world_size: tuple) -> tuple:
+    """ Return a (states, ages) grid for either a population dictionary or an existing grid. """
+
+    if isinstance(_population, dict):
+        return population_to_grid(_population, _world_size)
+    return _population
+
+
+def copy_ages(_ages, _size: int = 0) -> array:
+    """ Copy the ages of a grid, given as any buffer of unsigned ints, into an array('I'), or _size zeros for None. """
+
+    if _ages is None:
+        return array('I', bytes(4 * _size))
+
+    ages = array('I')
+    ages.frombytes(memoryview(_ages).cast('B'))
+    return ages
+
+
+def count_grid_states(_states) -> dict:
+    """ Count the cells of each state in a grid. Returns dict of state: count, rim cells excluded. """
+
+    #  bytearray.count() and numpy's bincount both run in C, so counting does not need a Python loop.
+
+    if hasattr(_states, 'tobytes'):
+        _states = _states.tobytes()
+    return {CODE_STATES[code]: _states.count(bytes((code,)))
+            for code in (CODE_DEAD, CODE_ALIVE, CODE_ELDER, CODE_PRIME_ELDER)}
+
+
+def print_grid(_states, _world_size: tuple):
+    """ Print a grid to console, one row per line. """
+
+    print_values = [cb.get_print_value(state) for state in CODE_STATES]
+    width, height = _world_size
+
+    for y in range(height):
+        row = _states[y * width:(y + 1) * width]
+        cb.progress(''.join(print_values[code] for code in row) + '\n')
@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+"""
+Hashlife tick engine for the Game of Life, selected with '-e hashlife --no-ageing'.
+
+The world is a quadtree where every node is hash-consed, so identical regions anywhere in the world
+and at any point in time are the same object. The future of a node, 2^j generations ahead, is
+memoized per (node, j), which lets long runs of repeating or settled patterns jump ahead by large
+powers of two instead of computing every tick.
+
+Cell ages depend on every single tick, so this engine only tracks the classic alive and dead states.
+When ageing is enabled the simulation falls back to the sparse engine.
+
+The rim of the world is kept exact: a jump of 2^j generations is only made when every living cell is
+more than 2^j cells away from the rim, since nothing can then reach the rim during the jump. Closer
+to the rim the engine steps one tick at a time, and reports it in the log.
+
+The caches of nodes and their futures are emptied when a world is created, and collected between
+jumps once they hold more than MAX_CACHE_ENTRIES entries: every cache is dropped and only the nodes
+of the current world are built again, so chaotic patterns can run for millions of generations.
+"""
+
+import logging
+from array import array
+
+import Project.code_base as cb
+import Project.sparse_engine as sparse_engine
+
+TRACKS_AGES = False
+FALLBACK_ENGINE = 'sparse'
+LIVING_CELLS = True
+MAX_CACHE_ENTRIES = 1 << 20
+
+_join_cache = {}
+_zero_cache = {}
+_successor_cache = {}
+_bounds_cache = {}
+
+
+class Node:
+    """ A square quadtree node of 2^k x 2^k cells, with quadrants a (NW), b (NE), c (SW) and d (SE). """
+
+    __slots__ = ('k', 'a', 'b', 'c', 'd', 'n')
+
+    def __init__(self, k: int, a, b, c, d, n: int):
+        self.k, self.a, self.b, self.c, self.d, self.n = k, a, b, c, d, n
+
+
+OFF = Node(0, None, None, None, None, 0)
+ON = Node(0, None, None, None, None, 1)
+
+
+def join(_a: Node, _b: Node, _c: Node, _d: Node) -> Node:
+    """ Return the canonical node with the given quadrants. """
+
+    #  Nodes are only created through this function, so two nodes with the same quadrants are always
+    #  the same object and can be compared and hashed by identity.
+
+    key = (_a, _b, _c, _d)
+    node = _join_cache.get(key)
+    if node is None:
+        node = Node(_a.k + 1, _a, _b, _c, _d, _a.n + _b.n + _c.n + _d.n)
+        _join_cache[key] = node
+    return node
+
+
+def get_zero(_k: int) -> Node:
+    """ Return the empty node of level _k. """
+
+    node = _zero_cache.get(_k)
+    if node is None:
+        node = OFF if _k == 0 else join(*(get_zero(_k - 1),) * 4)
+        _zero_cache[_k] = node
+    return node
+
+
+def centre(_node: Node) -> Node:
+    """ Return a node one level up with _node in its centre. """
+
+    zero = get_zero(_node.k - 1)
+    return join(join(zero, zero, zero, _node.a), join(zero, zero, _node.b, zero),
+                join(zero, _node.c, zero, zero), join(_node.d, zero, zero, zero))
+
+
+def is_padded(_node: Node) -> bool:
+    """ Test if all living cells of _node are within its central quarter. """
+
+    return _node.k >= 3 and _node.a.n == _node.a.d.d.n and _node.b.n == _node.b.c.c.n \
+        and _node.c.n == _node.c.b.b.n and _node.d.n == _node.d.a.a.n
+
+
+def life_4x4(_node: Node) -> Node:
+    """ Advance the centre 2x2 cells of a level 2 node by one generation. """
+
+    a, b, c, d = _node.a, _node.b, _node.c, _node.d
+    rows = (
+        (a.a.n, a.b.n, b.a.n, b.b.n),
+        (a.c.n, a.d.n, b.c.n, b.d.n),
+        (c.a.n, c.b.n, d.a.n, d.b.n),
+        (c.c.n, c.d.n, d.c.n, d.d.n)
+    )
+
+    def next_cell(y, x):
+        neighbours_alive = sum(rows[y + dy][x + dx] for dy in (-1, 0, 1) for dx in (-1, 0, 1)) - rows[y][x]
+        if neighbours_alive == 3 or (rows[y][x] and neighbours_alive == 2):
+            return ON
+        return OFF
+
+    return join(next_cell(1, 1), next_cell(1, 2), next_cell(2, 1), next_cell(2, 2))
+
+
+def successor(_node: Node, _j: int) -> Node:
+    """ Return the centre of _node, half its size, advanced 2^_j generations. _j may be at most _node.k - 2. """
+
+    #  The node is split into nine overlapping subnodes of half its size, each of which is advanced recursively.
+    #  For a full step of 2^(k-2) generations the centres of the nine results are joined into four nodes that are
+    #  advanced again, for a shorter step the centres are just joined together.
+
+    key = (_node, _j)
+    result = _successor_cache.get(key)
+    if result is not None:
+        return result
+
+    if _node.n == 0:
+        result = _node.a
+    elif _node.k == 2:
+        result = life_4x4(_node)
+    else:
+        a, b, c, d = _node.a, _node.b, _node.c, _node.d
+        step = min(_j, _node.k - 3)
+        c1 = successor(a, step)
+        c2 = successor(join(a.b, b.a, a.d, b.c), step)
+        c3 = successor(b, step)
+        c4 = successor(join(a.c, a.d, c.a, c.b), step)
+        c5 = successor(join(a.d, b.c, c.b, d.a), step)
+        c6 = successor(join(b.c, b.d, d.a, d.b), step)
+        c7 = successor(c, step)
+        c8 = successor(join(c.b, d.a, c.d, d.c), step)
+        c9 = successor(d, step)
+
+        if _j < _node.k - 2:
+            result = join(join(c1.d, c2.c, c4.b, c5.a), join(c2.d, c3.c, c5.b, c6.a),
+                          join(c4.d, c5.c, c7.b, c8.a), join(c5.d, c6.c, c8.b, c9.a))
+        else:
+            result = join(successor(join(c1, c2, c4, c5), step), successor(join(c2, c3, c5, c6), step),
+                          successor(join(c4, c5, c7, c8), step), successor(join(c5, c6, c8, c9), step))
+
+    _successor_cache[key] = result
+    return result
+
+
+def get_bounds(_node: Node):
+    """ Return the bounding box (y_min, x_min, y_max, x_max) of living cells relative to _node, or None. """
+
+    if _node.n == 0:
+        return None
+    if _node.k == 0:
+        return 0, 0, 0, 0
+
+    bounds = _bounds_cache.get(_node)
+    if bounds is None:
+        half = 1 << (_node.k - 1)
+        boxes = []
+        for child, dy, dx in ((_node.a, 0, 0), (_node.b, 0, half), (_node.c, half, 0), (_node.d, half, half)):
+            box = get_bounds(child)
+            if box is not None:
+                boxes.append((box[0] + dy, box[1] + dx, box[2] + dy, box[3] + dx))
+        bounds = (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                  max(box[2] for box in boxes), max(box[3] for box in boxes))
+        _bounds_cache[_node] = bounds
+
+    return bounds
+
+
+def clear_caches():
+    """ Empty the caches of nodes, futures and bounds. """
+
+    _join_cache.clear()
+    _zero_cache.clear()
+    _successor_cache.clear()
+    _bounds_cache.clear()
+
+
+def collect_garbage(_node: Node) -> Node:
+    """ Empty the caches and build _node again in them. Returns the canonical node for the new caches. """
+
+    #  Once the caches are emptied, nodes of the old tree are no longer canonical, so the tree is rebuilt from the
+    #  leaves up through join(). Shared subtrees are rebuilt once, looked up by identity in rebuilt.
+
+    clear_caches()
+    rebuilt = {}
+
+    def rebuild(_old: Node) -> Node:
+        if _old.k == 0:
+            return _old
+        node = rebuilt.get(_old)
+        if node is None:
+            node = join(rebuild(_old.a), rebuild(_old.b), rebuild(_old.c), rebuild(_old.d))
+            rebuilt[_old] = node
+        return node
+
+    return rebuild(_node)
+
+
+def build_node(_cells: list, _k: int, _y: int, _x: int) -> Node:
+    """ Build the node of level _k with top-left corner (_y, _x) from a list of living cells. """
+
+    if not _cells:
+        return get_zero(_k)
+    if _k == 0:
+        return ON
+
+    half = 1 << (_k - 1)
+    quadrants = ([], [], [], [])
+    for y, x in _cells:
+        quadrants[(y >= _y + half) * 2 + (x >= _x + half)].append((y, x))
+
+    return join(build_node(quadrants[0], _k - 1, _y, _x), build_node(quadrants[1], _k - 1, _y, _x + half),
+                build_node(quadrants[2], _k - 1, _y + half, _x), build_node(quadrants[3], _k - 1, _y + half, _x + half))
+
+
+def expand_node(_node: Node, _y: int, _x: int, _cells: list):
+    """ Append the coordinates of all living cells in _node, with top-left corner (_y, _x), to _cells. """
+
+    if _node.n == 0:
+        return
+    if _node.k == 0:
+        _cells.append((_y, _x))
+        return
+
+    half = 1 << (_node.k - 1)
+    expand_node(_node.a, _y, _x, _cells)
+    expand_node(_node.b, _y, _x + half, _cells)
+    expand_node(_node.c, _y + half, _x, _cells)
+    expand_node(_node.d, _y + half, _x + half, _cells)
+
+
+def create_world(_population, _world_size: tuple) -> dict:
+    """ Create the quadtree world from a population dictionary or grid. Elders count as alive. """
+
+    #  The world is a dictionary with the root node and the coordinate of its top-left corner. The root
+    #  is built large enough to cover the whole world. The caches of earlier worlds are emptied first.
+
+    clear_caches()
+    cells = list(sparse_engine.create_world(_population, _world_size))
+    k = max(3, (max(_world_size) - 1).bit_length())
+
+    return {'node': build_node(cells, k, 0, 0), 'origin': (0, 0), 'per_tick': False}
+
+
+def get_cells(_world: dict) -> list:
+    """ Return the coordinates of all living cells in the world. """
+
+    cells = []
+    expand_node(_world['node'], *_world['origin'], cells)
+    return cells
+
+
+def get_rim_margin(_world: dict, _world_size: tuple) -> int:
+    """ Return the number of generations that can pass before a living cell could reach the rim. """
+
+    bounds = get_bounds(_world['node'])
+    if bounds is None:
+        return 1 << 62
+
+    width, height = _world_size
+    y0, x0 = _world['origin']
+    return min(bounds[0] + y0 - 1, bounds[1] + x0 - 1, height - 2 - bounds[2] - y0, width - 2 - bounds[3] - x0)
+
+
+def step_next_to_rim(_world: dict, _world_size: tuple) -> dict:
+    """ Advance the world one generation with the rim taken into account. """
+
+    cells = get_cells(_world)
+    living = dict.fromkeys(cells)
+    next_cells = [cell for cell, neighbours_alive in
+                  sparse_engine.count_alive_neighbours(living, _world_size).items()
+                  if neighbours_alive == 3 or (neighbours_alive == 2 and cell in living)]
+
+    k = max(3, (max(_world_size) - 1).bit_length())
+    return {'node': build_node(next_cells, k, 0, 0), 'origin': (0, 0), 'per_tick': True}
+
+
+def advance(_world: dict, _generations: int, _world_size: tuple) -> tuple:
+    """ Jump ahead by up to _generations. Returns tuple: world and generations advanced. """
+
+    #  Finds how far the living cells are from the rim. If they are next to it, the world is advanced a single
+    #  generation by step_next_to_rim() and the fallback is logged once. Otherwise the largest power of two that
+    #  fits both the margin and _generations is used as step. The root is padded with empty space until the
+    #  pattern is in its central quarter and it is large enough for the step, then successor() computes the
+    #  future of the centre. Padding moves the origin up and left by a quarter of the new size, and the
+    #  successor is the centre of the padded root, a quarter of its size down and right. Before any of this the
+    #  caches are collected when they have grown past MAX_CACHE_ENTRIES.
+
+    if len(_join_cache) + len(_successor_cache) + len(_bounds_cache) > MAX_CACHE_ENTRIES:
+        _world = dict(_world, node=collect_garbage(_world['node']))
+
+    logger = logging.getLogger('gol_logger')
+    margin = get_rim_margin(_world, _world_size)
+
+    if margin < 1:
+        if not _world['per_tick']:
+            logger.info('Hashlife: living cells next to the rim, falling back to per-tick stepping')
+        return step_next_to_rim(_world, _world_size), 1
+
+    if _world['per_tick']:
+        logger.info('Hashlife: living cells clear of the rim, resuming hashlife jumps')
+
+    j = min(margin, _generations).bit_length() - 1
+    node = _world['node']
+    y0, x0 = _world['origin']
+
+    while node.k < j + 3 or not is_padded(node):
+        shift = 1 << (node.k - 1)
+        node = centre(node)
+        y0, x0 = y0 - shift, x0 - shift
+
+    shift = 1 << (node.k - 2)
+    node = successor(node, j)
+
+    return {'node': node, 'origin': (y0 + shift, x0 + shift), 'per_tick': False}, 1 << j
+
+
+def update_world(_cur_gen: dict, _world_size: tuple) -> dict:
+    """ Represents a tick in the simulation. """
+
+    return advance(_cur_gen, 1, _world_size)[0]
+
+
+def count_states(_world: dict, _world_size: tuple) -> dict:
+    """ Count the cells of each state. Returns dict of state: count, rim cells excluded. """
+
+    width, height = _world_size
+    living = _world['node'].n
+
+    return {cb.STATE_DEAD: max(width - 2, 0) * max(height - 2, 0) - living, cb.STATE_ALIVE: living,
+            cb.STATE_ELDER: 0, cb.STATE_PRIME_ELDER: 0}
+
+
+def get_states(_world: dict, _world_size: tuple) -> bytearray:
+    """ Return the state codes of the world as flat bytes. """
+
+    return sparse_engine.get_states(dict.fromkeys(get_cells(_world), (cb.STATE_ALIVE, 0)), _world_size)
+
+
+def get_grid(_world: dict, _world_size: tuple) -> tuple:
+    """ Return the world as a flat (states, ages) grid. Ages are always 0. """
+
+    width, height = _world_size
+    return get_states(_world, _world_size), array('I', bytes(4 * width * height))
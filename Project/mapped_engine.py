@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""
+Out-of-core tick engine for the Game of Life, selected with '-e mapped', for worlds larger than RAM.
+
+The state and age grids live in memory-mapped files in _Resources/_Mapped, twice each, so one pair
+holds the current generation while the other receives the next, like the buffers of the parallel
+engine. A tick steps the inner rows in bands of about BAND_CELLS cells: each band is read with the
+row above and below it, stepped with the rules of the numpy engine and written into the next files,
+after which the buffers swap roles. Once a band has been written, the pages of the rows before it
+are dropped from the process with madvise(), so only the band being stepped, its neighbour rows and
+the band just written are resident at a time. The operating system writes the dropped pages back to
+the files and reads them in again when they are needed.
+
+New worlds are never built in memory: gol.populate_bands() hands the engine the seed one band at a
+time, which is written straight into the mapped files. Drawing the world, --save, --checkpoint-every,
+--detect-cycles and --record copy the whole grid into memory, so they are only for worlds that fit.
+The files are removed when the world is closed.
+"""
+
+import mmap
+import shutil
+import tempfile
+from array import array
+from pathlib import Path
+
+import Project.grid as grid
+import Project.numpy_engine as numpy_engine
+from Project.numpy_engine import np
+
+TRACKS_AGES = True
+OUT_OF_CORE = True
+BAND_CELLS = 1 << 22
+MAPPED_DIRECTORY = Path(__file__).parent / '../_Resources/_Mapped'
+
+
+def map_grid(_path: Path, _world_size: tuple, _dtype) -> tuple:
+    """ Create a zero filled file for a grid of _dtype and map it. Returns tuple: the mapping and an array view. """
+
+    #  The file is extended with truncate(), so it starts as a sparse file that takes no disk space until written.
+
+    width, height = _world_size
+    size = width * height * np.dtype(_dtype).itemsize
+
+    with Path.open(_path, 'w+b') as f_hand:
+        f_hand.truncate(size)
+        mapping = mmap.mmap(f_hand.fileno(), size)
+
+    return mapping, np.frombuffer(mapping, dtype=_dtype).reshape(height, width)
+
+
+def get_band_rows(_world_size: tuple) -> int:
+    """ Return the number of rows in a band of about BAND_CELLS cells. """
+
+    return max(1, BAND_CELLS // max(_world_size[0], 1))
+
+
+def release_rows(_world: dict, _first: int, _last: int):
+    """ Drop the pages of rows _first to _last of every grid from the process, where the platform supports it. """
+
+    #  madvise() needs a page aligned start, so the range is shrunk to whole pages. Dirty pages of a shared file
+    #  mapping stay in the page cache of the operating system, which writes them back to the file.
+
+    if not hasattr(mmap, 'MADV_DONTNEED') or _last <= _first:
+        return
+
+    width = _world['world_size'][0]
+    for mapping, item_size in _world['mappings']:
+        start = -(-_first * width * item_size // mmap.PAGESIZE) * mmap.PAGESIZE
+        end = _last * width * item_size // mmap.PAGESIZE * mmap.PAGESIZE
+        if start < end:
+            mapping.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+
+def create_world(_population, _world_size: tuple) -> dict:
+    """ Create the mapped world from a population dictionary, a grid or the (first row, states) bands of a seed. """
+
+    #  Dictionaries and grids are already in memory and are copied in one band at a time. Bands come from
+    #  gol.populate_bands(), with the rim already written, and start with age 0. The rows on top and at the bottom of
+    #  the next buffer are rim rows, which the ticks never write.
+
+    numpy_engine.require_numpy()
+
+    width, height = _world_size
+    if not MAPPED_DIRECTORY.exists():
+        MAPPED_DIRECTORY.mkdir(parents=True)
+    directory = Path(tempfile.mkdtemp(prefix='world_', dir=MAPPED_DIRECTORY))
+
+    world = {'world_size': _world_size, 'directory': directory, 'current': 0, 'mappings': [], 'states': [],
+             'ages': []}
+    try:
+        for buffer in (0, 1):
+            for name, dtype in (('states', np.uint8), ('ages', np.uint32)):
+                mapping, view = map_grid(directory / f'{name}_{buffer}.bin', _world_size, dtype)
+                world['mappings'].append((mapping, np.dtype(dtype).itemsize))
+                world[name].append(view)
+
+        states, ages = world['states'][0], world['ages'][0]
+        if isinstance(_population, (dict, tuple)):
+            flat_states, flat_ages = grid.as_grid(_population, _world_size)
+            flat_states = np.frombuffer(flat_states, dtype=np.uint8).reshape(height, width)
+            if flat_ages is not None:
+                flat_ages = np.frombuffer(flat_ages, dtype=np.uint32).reshape(height, width)
+            bands = ((first, flat_states[first:first + get_band_rows(_world_size)])
+                     for first in range(0, height, get_band_rows(_world_size)))
+        else:
+            flat_ages = None
+            bands = _population
+
+        for first, band in bands:
+            band = np.frombuffer(band, dtype=np.uint8).reshape(-1, width)
+            states[first:first + len(band)] = band
+            if flat_ages is not None:
+                ages[first:first + len(band)] = flat_ages[first:first + len(band)]
+            release_rows(world, first, first + len(band))
+
+        world['states'][1][0] = world['states'][1][height - 1] = grid.CODE_RIM
+    except BaseException:
+        close_world(world)
+        raise
+
+    return world
+
+
+def update_world(_cur_gen: dict, _world_size: tuple) -> dict:
+    """ Represents a tick in the simulation. """
+
+    return step_world(_cur_gen, _world_size)[0]
+
+
+def step_world(_cur_gen: dict, _world_size: tuple) -> tuple:
+    """ Represents a tick in the simulation. Returns tuple: world and changes in the order of stats.CHANGE_FIELDS. """
+
+    #  Each band is stepped with one extra row on either side, which numpy_engine.next_generation() leaves out of the
+    #  changes, and only its own rows are written. The rows before the previous band are released once the band after
+    #  them has been read.
+
+    height = _world_size[1]
+    band_rows = get_band_rows(_world_size)
+    current = _cur_gen['current']
+    states, ages = _cur_gen['states'][current], _cur_gen['ages'][current]
+    next_states, next_ages = _cur_gen['states'][1 - current], _cur_gen['ages'][1 - current]
+    changes = [0] * 6
+    released = 0
+
+    for first in range(1, height - 1, band_rows):
+        last = min(first + band_rows, height - 1)
+        band_states, band_ages, band_changes = numpy_engine.next_generation(states[first - 1:last + 1],
+                                                                            ages[first - 1:last + 1])
+        next_states[first:last] = band_states[1:-1]
+        next_ages[first:last] = band_ages[1:-1]
+        changes = [total + change for total, change in zip(changes, band_changes)]
+        release_rows(_cur_gen, released, first - 1)
+        released = max(released, first - 1)
+
+    release_rows(_cur_gen, released, height)
+    _cur_gen['current'] = 1 - current
+
+    return _cur_gen, tuple(changes)
+
+
+def get_states(_world: dict, _world_size: tuple) -> bytes:
+    """ Return the state codes of the world as flat bytes, copied into memory. """
+
+    return _world['states'][_world['current']].tobytes()
+
+
+def count_states(_world: dict, _world_size: tuple) -> dict:
+    """ Count the cells of each state one band at a time. Returns dict of state: count, rim cells excluded. """
+
+    states = _world['states'][_world['current']]
+    band_rows = get_band_rows(_world_size)
+    counts = np.zeros(len(grid.CODE_STATES), dtype=np.int64)
+
+    for first in range(0, _world_size[1], band_rows):
+        counts += np.bincount(states[first:first + band_rows].ravel(), minlength=len(grid.CODE_STATES))
+        release_rows(_world, first, first + band_rows)
+
+    return {grid.CODE_STATES[code]: int(counts[code])
+            for code in (grid.CODE_DEAD, grid.CODE_ALIVE, grid.CODE_ELDER, grid.CODE_PRIME_ELDER)}
+
+
+def get_grid(_world: dict, _world_size: tuple) -> tuple:
+    """ Return the world as a flat (states, ages) grid, copied into memory. """
+
+    current = _world['current']
+    return bytearray(_world['states'][current].tobytes()), array('I', _world['ages'][current].tobytes())
+
+
+def close_world(_world: dict):
+    """ Unmap the grids and remove their files. """
+
+    #  The array views hold exports of the mappings, which can not be closed while they exist.
+
+    _world['states'].clear()
+    _world['ages'].clear()
+    for mapping, _ in _world['mappings']:
+        mapping.close()
+    _world['mappings'].clear()
+    shutil.rmtree(_world['directory'], ignore_errors=True)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+Vectorized tick engine for the Game of Life, selected with '-e numpy'.
+
+The world is stored as two NumPy arrays of shape (height, width): a uint8 grid of state codes from
+Project.grid and a uint32 grid of cell ages. Neighbour counts for the whole world are computed at
+once by summing eight shifted views of the living cells, and the alive / elder / prime elder rules
+of gol.update_world() are applied with boolean masks instead of one cell at a time.
+"""
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+
+import Project.grid as grid
+
+TRACKS_AGES = True
+
+
+def require_numpy():
+    """ Raise a readable error if NumPy is not installed. """
+
+    if np is None:
+        raise ImportError("The numpy engine requires NumPy, install it with 'pip install numpy'.")
+
+
+def create_world(_population, _world_size: tuple) -> tuple:
+    """ Create the (states, ages) arrays from a population dictionary or grid. """
+
+    require_numpy()
+
+    width, height = _world_size
+    states, ages = grid.as_grid(_population, _world_size)
+
+    states = np.frombuffer(states, dtype=np.uint8).reshape(height, width).copy()
+    if ages is None:
+        ages = np.zeros((height, width), dtype=np.uint32)
+    else:
+        ages = np.frombuffer(ages, dtype=np.uint32).reshape(height, width).copy()
+
+    return states, ages
+
+
+def count_alive_neighbours(_states) -> 'np.ndarray':
+    """ Count the living neighbours of every cell. Returns a uint8 array shaped like _states. """
+
+    #  Makes a 0/1 array of living cells, rim cells count as dead since their code is above
+    #  CODE_PRIME_ELDER. The eight neighbour offsets are then added up as shifted slices of the living
+    #  array over the inner part of the world. Rim cells are left with a count of 0, which is fine since
+    #  they are never updated.
+
+    living = ((_states >= grid.CODE_ALIVE) & (_states <= grid.CODE_PRIME_ELDER)).view(np.uint8)
+    counts = np.zeros_like(living)
+
+    inner = counts[1:-1, 1:-1]
+    for dy in (0, 1, 2):
+        for dx in (0, 1, 2):
+            if dy == 1 and dx == 1:
+                continue
+            inner += living[dy:dy + inner.shape[0], dx:dx + inner.shape[1]]
+
+    return counts
+
+
+def update_world(_cur_gen: tuple, _world_size: tuple) -> tuple:
+    """ Represents a tick in the simulation. """
+
+    return step_world(_cur_gen, _world_size)[0]
+
+
+def step_world(_cur_gen: tuple, _world_size: tuple) -> tuple:
+    """ Represents a tick in the simulation. Returns tuple: world and changes in the order of stats.CHANGE_FIELDS. """
+
+    next_states, next_ages, changes = next_generation(*_cur_gen)
+    return (next_states, next_ages), changes
+
+
+def next_generation(_states, _ages) -> tuple:
+    """ Compute the next generation of a block of cells. Returns tuple: states and ages arrays, and changes. """
+
+    #  Mirrors the rules in gol.update_world() as masks over the whole block:
+    #
+    #  A living cell with 2 or 3 living neighbours survives and ages by 1. Alive cells that survive with age 5
+    #  become elders, and elders that survive with age 10 become prime elders.
+    #
+    #  A dead cell with exactly 3 living neighbours is born as an alive cell with age 0.
+    #
+    #  Any other living cell dies and gets age 0. Dead cells without 3 neighbours and rim cells are unchanged.
+    #
+    #  The outermost rows and columns of the block have no neighbour counts, so they are only correct for a block
+    #  surrounded by rim cells. Callers stepping part of a world pass one extra row on each side and discard them,
+    #  which is why the changes are only counted in the inner rows of the block.
+
+    neighbours_alive = count_alive_neighbours(_states)
+    living = (_states >= grid.CODE_ALIVE) & (_states <= grid.CODE_PRIME_ELDER)
+
+    survives = living & ((neighbours_alive == 2) | (neighbours_alive == 3))
+    dies = living & ~survives
+    born = (_states == grid.CODE_DEAD) & (neighbours_alive == 3)
+
+    next_states = _states.copy()
+    next_ages = _ages.copy()
+
+    to_elder = survives & (_states == grid.CODE_ALIVE) & (_ages == 5)
+    to_prime_elder = survives & (_states == grid.CODE_ELDER) & (_ages == 10)
+    next_states[to_elder] = grid.CODE_ELDER
+    next_states[to_prime_elder] = grid.CODE_PRIME_ELDER
+    next_ages[survives] += 1
+
+    next_states[born] = grid.CODE_ALIVE
+    next_ages[born] = 0
+
+    next_states[dies] = grid.CODE_DEAD
+    next_ages[dies] = 0
+
+    deaths = np.bincount(_states[1:-1][dies[1:-1]], minlength=len(grid.CODE_STATES))
+    changes = (int(np.count_nonzero(born[1:-1])), int(deaths[grid.CODE_ALIVE]), int(deaths[grid.CODE_ELDER]),
+               int(deaths[grid.CODE_PRIME_ELDER]), int(np.count_nonzero(to_elder[1:-1])),
+               int(np.count_nonzero(to_prime_elder[1:-1])))
+
+    return next_states, next_ages, changes
+
+
+def get_states(_world: tuple, _world_size: tuple) -> bytes:
+    """ Return the state codes of the world as flat bytes. """
+
+    return _world[0].tobytes()
+
+
+def count_states(_world: tuple, _world_size: tuple) -> dict:
+    """ Count the cells of each state. Returns dict of state: count, rim cells excluded. """
+
+    counts = np.bincount(_world[0].ravel(), minlength=len(grid.CODE_STATES))
+    return {grid.CODE_STATES[code]: int(counts[code])
+            for code in (grid.CODE_DEAD, grid.CODE_ALIVE, grid.CODE_ELDER, grid.CODE_PRIME_ELDER)}
+
+
+def get_grid(_world: tuple, _world_size: tuple) -> tuple:
+    """ Return the world as a flat (states, ages) grid. """
+
+    states, ages = _world
+    return bytearray(states.tobytes()), array('I', ages.astype(np.uint32).tobytes())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""
+Multi-core tick engine for the Game of Life, selected with '-e parallel --workers N'.
+
+The state and age grids live in shared memory, twice each, so one pair holds the current generation
+while the other receives the next. The inner rows of the world are split into one horizontal band per
+worker process. On every tick each worker reads its band plus the one-row halo above and below it
+from the current grids, steps it with the rules of the numpy engine and writes the band into the next
+grids. Halo rows are read straight from the neighbouring bands in shared memory, so the exchange costs
+no copying between processes, and the main process only waits for every band to finish before the
+buffers swap roles.
+"""
+
+import multiprocessing
+import os
+import queue
+from multiprocessing import shared_memory
+
+import Project.numpy_engine as numpy_engine
+import Project.stats as stats
+from Project.numpy_engine import np
+
+TRACKS_AGES = True
+USES_WORKERS = True
+WORKER_POLL_SECONDS = 1.0
+
+
+def split_rows(_height: int, _workers: int) -> list:
+    """ Split the inner rows of the world into bands. Returns list of (first row, row after last) tuples. """
+
+    inner_rows = max(_height - 2, 0)
+    workers = max(1, min(_workers, inner_rows))
+    bounds = [1 + inner_rows * band // workers for band in range(workers + 1)]
+
+    return [(bounds[band], bounds[band + 1]) for band in range(workers) if bounds[band] < bounds[band + 1]]
+
+
+def attach_arrays(_names: list, _world_size: tuple) -> tuple:
+    """ Attach to the shared memory blocks. Returns tuple: list of blocks, list of states and ages arrays. """
+
+    width, height = _world_size
+    blocks = [shared_memory.SharedMemory(name=name) for name in _names]
+    arrays = [np.ndarray((height, width), dtype=np.uint8 if index < 2 else np.uint32, buffer=block.buf)
+              for index, block in enumerate(blocks)]
+
+    return blocks, arrays
+
+
+def run_worker(_names: list, _world_size: tuple, _rows: tuple, _tasks, _done):
+    """ Step one band of rows every time a source buffer index arrives on _tasks, until None arrives. """
+
+    #  The changes of the band are put on _done when it has been written.
+
+    blocks, (states_a, states_b, ages_a, ages_b) = attach_arrays(_names, _world_size)
+    states, ages = (states_a, states_b), (ages_a, ages_b)
+    first, last = _rows
+
+    while True:
+        source = _tasks.get()
+        if source is None:
+            break
+
+        next_states, next_ages, changes = numpy_engine.next_generation(states[source][first - 1:last + 1],
+                                                                       ages[source][first - 1:last + 1])
+        states[1 - source][first:last] = next_states[1:-1]
+        ages[1 - source][first:last] = next_ages[1:-1]
+        _done.put(changes)
+
+    del states, ages, states_a, states_b, ages_a, ages_b
+    for block in blocks:
+        block.close()
+
+
+def create_world(_population, _world_size: tuple, _workers: int = None) -> dict:
+    """ Create the shared grids from a population dictionary or grid and start the worker processes. """
+
+    #  Four shared memory blocks are created: the states and ages of buffer 0 and buffer 1. Both buffers start as a
+    #  copy of the seed, so the rim rows that no worker writes are correct in both of them. One worker process is
+    #  started per band, defaulting to one per CPU core, with its own task queue and a shared queue for reporting
+    #  finished bands.
+
+    numpy_engine.require_numpy()
+
+    width, height = _world_size
+    states, ages = numpy_engine.create_world(_population, _world_size)
+
+    blocks = [shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+              for array in (states, states, ages, ages)]
+    arrays = [np.ndarray((height, width), dtype=array.dtype, buffer=block.buf)
+              for block, array in zip(blocks, (states, states, ages, ages))]
+    for shared, array in zip(arrays, (states, states, ages, ages)):
+        shared[:] = array
+
+    done = multiprocessing.Queue()
+    workers = []
+    for rows in split_rows(height, _workers or os.cpu_count() or 1):
+        tasks = multiprocessing.Queue()
+        process = multiprocessing.Process(target=run_worker, daemon=True,
+                                          args=([block.name for block in blocks], _world_size, rows, tasks, done))
+        process.start()
+        workers.append((process, tasks))
+
+    return {'blocks': blocks, 'arrays': arrays, 'source': 0, 'workers': workers, 'done': done}
+
+
+def get_arrays(_world: dict) -> tuple:
+    """ Return the states and ages arrays of the current generation. """
+
+    source = _world['source']
+    return _world['arrays'][source], _world['arrays'][2 + source]
+
+
+def update_world(_cur_gen: dict, _world_size: tuple) -> dict:
+    """ Represents a tick in the simulation. """
+
+    return step_world(_cur_gen, _world_size)[0]
+
+
+def step_world(_cur_gen: dict, _world_size: tuple) -> tuple:
+    """ Represents a tick in the simulation. Returns tuple: world and changes in the order of stats.CHANGE_FIELDS. """
+
+    #  Sends the index of the current buffer to every worker and waits until all bands have been written to the
+    #  other buffer, which then becomes the current one. The changes of the bands are added up. While waiting, the
+    #  workers are checked every WORKER_POLL_SECONDS, so a worker that died does not block the tick forever.
+
+    for _, tasks in _cur_gen['workers']:
+        tasks.put(_cur_gen['source'])
+
+    changes = stats.NO_CHANGES
+    pending = len(_cur_gen['workers'])
+    while pending:
+        try:
+            band_changes = _cur_gen['done'].get(timeout=WORKER_POLL_SECONDS)
+        except queue.Empty:
+            check_workers(_cur_gen)
+            continue
+        changes = stats.add_changes(changes, band_changes)
+        pending -= 1
+
+    _cur_gen['source'] = 1 - _cur_gen['source']
+
+    return _cur_gen, changes
+
+
+def check_workers(_world: dict):
+    """ Raise RuntimeError naming the first worker process that died, after stopping the others. """
+
+    for band, (process, _) in enumerate(_world['workers']):
+        if not process.is_alive():
+            stop_workers(_world)
+            raise RuntimeError(f'Worker {process.name} (pid {process.pid}) of band {band} died with exit code '
+                               f'{process.exitcode}')
+
+
+def stop_workers(_world: dict):
+    """ Terminate the worker processes that are still running and wait for them to end. """
+
+    for process, _ in _world['workers']:
+        if process.is_alive():
+            process.terminate()
+    for process, _ in _world['workers']:
+        process.join()
+
+
+def close_world(_world: dict):
+    """ Stop the worker processes and release the shared memory. """
+
+    for _, tasks in _world['workers']:
+        tasks.put(None)
+    for process, _ in _world['workers']:
+        process.join()
+
+    _world['arrays'].clear()
+    for block in _world['blocks']:
+        block.close()
+        block.unlink()
+
+
+def get_states(_world: dict, _world_size: tuple) -> bytes:
+    """ Return the state codes of the world as flat bytes. """
+
+    return get_arrays(_world)[0].tobytes()
+
+
+def count_states(_world: dict, _world_size: tuple) -> dict:
+    """ Count the cells of each state. Returns dict of state: count, rim cells excluded. """
+
+    return numpy_engine.count_states(get_arrays(_world), _world_size)
+
+
+def get_grid(_world: dict, _world_size: tuple) -> tuple:
+    """ Return the world as a flat (states, ages) grid. """
+
+    return numpy_engine.get_grid(get_arrays(_world), _world_size)
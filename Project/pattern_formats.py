@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+"""
+Import and export of standard Game of Life pattern files.
+
+Three formats are supported, chosen by file suffix:
+
+    .rle            Run Length Encoded, with an 'x = m, y = n' header and runs of b (dead) and o (alive)
+    .cells          Plaintext, one line per row of '.' (dead) and 'O' (alive), '!' starts a comment
+    .lif / .life    Life 1.06, a '#Life 1.06' header followed by one 'x y' coordinate per living cell
+
+Files are read one line at a time, and every reader yields runs of living cells as (y, x, length)
+tuples, which are written straight into a flat grid of the chosen world size. No per-cell dictionary
+is built, so published patterns of millions of cells load with memory proportional to the world.
+"""
+
+import re
+from array import array
+from pathlib import Path
+
+import Project.grid as grid
+
+RLE_SUFFIXES = ('.rle',)
+PLAINTEXT_SUFFIXES = ('.cells',)
+LIFE_106_SUFFIXES = ('.lif', '.life')
+PATTERN_SUFFIXES = RLE_SUFFIXES + PLAINTEXT_SUFFIXES + LIFE_106_SUFFIXES
+
+RLE_TOKEN = re.compile(r'(\d*)([p-y][A-X]|[^\d\s])')
+RLE_RULE = 'B3/S23'
+RLE_LINE_LENGTH = 70
+RLE_DEAD_TAGS = ('b', '.')
+PLAINTEXT_RUN = re.compile(r'[^.]+')
+LIVING_RUN = re.compile(b'[\x01-\x03]+')
+
+
+def read_rle_runs(_lines):
+    """ Yield runs of living cells as (y, x, length) from the lines of an RLE file. """
+
+    #  Comment lines start with '#' and the header line with 'x'. In the pattern data every tag can be preceded
+    #  by a run count: 'b' is a run of dead cells, '$' ends one or more rows and '!' ends the pattern. Multi-state
+    #  RLE files write dead cells as '.' and states above 24 as two letters, like 'pA', which are one tag. Any other
+    #  tag is a living cell. A run count may be split from its tag by a line break, so trailing digits are carried
+    #  over to the next line.
+
+    y = x = 0
+    pending = ''
+
+    for line in _lines:
+        line = line.strip()
+        if not pending and (not line or line[0] in '#x'):
+            continue
+
+        line = pending + line
+        digits = re.search(r'\d+$', line)
+        pending = digits.group() if digits else ''
+        if digits:
+            line = line[:digits.start()]
+
+        for count, tag in RLE_TOKEN.findall(line):
+            count = int(count) if count else 1
+            if tag == '!':
+                return
+            if tag == '$':
+                y, x = y + count, 0
+            elif tag in RLE_DEAD_TAGS:
+                x += count
+            else:
+                yield y, x, count
+                x += count
+
+
+def read_plaintext_runs(_lines):
+    """ Yield runs of living cells as (y, x, length) from the lines of a plaintext .cells file. """
+
+    #  Trailing whitespace is stripped, so it is not read as living cells.
+
+    y = 0
+    for line in _lines:
+        line = line.rstrip()
+        if line.startswith('!'):
+            continue
+        for match in PLAINTEXT_RUN.finditer(line):
+            yield y, match.start(), len(match.group())
+        y += 1
+
+
+def read_life_106_runs(_lines):
+    """ Yield living cells as runs (y, x, 1) from the lines of a Life 1.06 file. """
+
+    for line in _lines:
+        line = line.strip()
+        if line.startswith('#'):
+            if line.startswith('#Life') and line != '#Life 1.06':
+                raise ValueError(f"Unsupported Life format '{line}', only '#Life 1.06' can be read")
+            continue
+        if line:
+            x, y = line.split()
+            yield int(y), int(x), 1
+
+
+def read_runs(_path: Path):
+    """ Yield runs of living cells as (y, x, length) from a pattern file, using the reader for its suffix. """
+
+    suffix = _path.suffix.lower()
+    if suffix in RLE_SUFFIXES:
+        reader = read_rle_runs
+    elif suffix in PLAINTEXT_SUFFIXES:
+        reader = read_plaintext_runs
+    elif suffix in LIFE_106_SUFFIXES:
+        reader = read_life_106_runs
+    else:
+        raise ValueError(f"Unknown pattern format '{suffix}', use one of: {', '.join(PATTERN_SUFFIXES)}")
+
+    with Path.open(_path, 'r', encoding='UTF-8') as f_hand:
+        yield from reader(f_hand)
+
+
+def get_pattern_bounds(_path: Path) -> tuple:
+    """ Read a pattern file once to find its bounding box. Returns tuple: y_min, x_min, height, width. """
+
+    y_min = x_min = y_max = x_max = None
+
+    for y, x, length in read_runs(_path):
+        if y_min is None:
+            y_min, x_min, y_max, x_max = y, x, y, x + length - 1
+        else:
+            y_min, x_min = min(y_min, y), min(x_min, x)
+            y_max, x_max = max(y_max, y), max(x_max, x + length - 1)
+
+    if y_min is None:
+        return 0, 0, 0, 0
+
+    return y_min, x_min, y_max - y_min + 1, x_max - x_min + 1
+
+
+def load_pattern(_path: Path, _world_size: tuple, _offset: tuple = None) -> tuple:
+    """ Load a pattern file into a world of size _world_size. Returns tuple: grid (states, ages) and world_size. """
+
+    #  The file is read twice: once to find the bounding box of the living cells, and once to write the runs into the
+    #  grid. _offset is the (x, y) position in the world of the pattern's own origin, cell (0, 0) of the file. When no
+    #  offset is given, the bounding box is centered in the world instead. The pattern has to fit inside the rim,
+    #  otherwise a ValueError is raised.
+
+    width, height = _world_size
+    y_min, x_min, pattern_height, pattern_width = get_pattern_bounds(_path)
+
+    if _offset is None:
+        _offset = ((width - pattern_width) // 2 - x_min, (height - pattern_height) // 2 - y_min)
+    x_offset, y_offset = _offset
+
+    if x_min + x_offset < 1 or y_min + y_offset < 1 or x_min + x_offset + pattern_width > width - 1 \
+            or y_min + y_offset + pattern_height > height - 1:
+        raise ValueError(f'The {pattern_width}x{pattern_height} pattern in {_path.name} does not fit inside the rim '
+                         f'of a {width}x{height} world at offset {x_offset}x{y_offset}')
+
+    states = bytearray(width * height)
+    states[:width] = states[-width:] = bytes((grid.CODE_RIM,)) * width
+    states[::width] = states[width - 1::width] = bytes((grid.CODE_RIM,)) * height
+
+    for y, x, length in read_runs(_path):
+        index = (y + y_offset) * width + x + x_offset
+        states[index:index + length] = bytes((grid.CODE_ALIVE,)) * length
+
+    return (states, array('I', bytes(4 * width * height))), _world_size
+
+
+def get_living_runs(_row: bytes) -> list:
+    """ Return the (start, length) runs of living cells in a row of state codes. """
+
+    return [(match.start(), len(match.group())) for match in LIVING_RUN.finditer(_row)]
+
+
+def write_rle(_f_hand, _rows, _width: int, _height: int, _rule: str = RLE_RULE):
+    """ Write the rows of state codes as RLE under the _rule in B/S notation, wrapping lines at RLE_LINE_LENGTH. """
+
+    #  Each row becomes tokens for dead and living runs, trailing dead cells are left out. Empty rows are not written
+    #  one by one, instead the count of the next '$' covers all of them.
+
+    def get_token(_count, _tag):
+        return f'{_count}{_tag}' if _count > 1 else _tag
+
+    _f_hand.write(f'x = {_width}, y = {_height}, rule = {_rule}\n')
+    line = ''
+    row_ends = 0
+
+    def write_token(_token):
+        nonlocal line
+        if len(line) + len(_token) > RLE_LINE_LENGTH:
+            _f_hand.write(line + '\n')
+            line = ''
+        line += _token
+
+    for row in _rows:
+        runs = get_living_runs(row)
+        if runs:
+            if row_ends:
+                write_token(get_token(row_ends, '$'))
+            row_ends = 0
+            x = 0
+            for start, length in runs:
+                if start > x:
+                    write_token(get_token(start - x, 'b'))
+                write_token(get_token(length, 'o'))
+                x = start + length
+        row_ends += 1
+
+    write_token('!')
+    _f_hand.write(line + '\n')
+
+
+def write_plaintext(_f_hand, _rows, _name: str):
+    """ Write the rows of state codes as a plaintext .cells pattern. """
+
+    _f_hand.write(f'!Name: {_name}\n')
+    for row in _rows:
+        line = bytearray(b'.' * len(row))
+        for start, length in get_living_runs(row):
+            line[start:start + length] = b'O' * length
+        _f_hand.write(line.rstrip(b'.').decode() + '\n')
+
+
+def write_life_106(_f_hand, _rows):
+    """ Write the living cells of the rows as Life 1.06 coordinates. """
+
+    _f_hand.write('#Life 1.06\n')
+    for y, row in enumerate(_rows):
+        for start, length in get_living_runs(row):
+            for x in range(start, start + length):
+                _f_hand.write(f'{x} {y}\n')
+
+
+def save_pattern(_path: Path, _states, _world_size: tuple, _rule: str = RLE_RULE):
+    """ Save the living cells inside the rim of a world as a pattern file, in the format of the file suffix. """
+
+    #  The pattern covers the whole inner area of the world, so loading it again into a world of the same size at
+    #  offset 1x1 restores the positions of all cells. Rows are produced one at a time while writing. Only RLE files
+    #  hold the _rule the world was run with.
+
+    width, height = _world_size
+    states = bytes(_states)
+    rows = (states[y * width + 1:(y + 1) * width - 1] for y in range(1, height - 1))
+    suffix = _path.suffix.lower()
+
+    with Path.open(_path, 'w', encoding='UTF-8') as f_hand:
+        if suffix in RLE_SUFFIXES:
+            write_rle(f_hand, rows, max(width - 2, 0), max(height - 2, 0), _rule)
+        elif suffix in PLAINTEXT_SUFFIXES:
+            write_plaintext(f_hand, rows, _path.stem)
+        elif suffix in LIFE_106_SUFFIXES:
+            write_life_106(f_hand, rows)
+        else:
+            raise ValueError(f"Unknown pattern format '{suffix}', use one of: {', '.join(PATTERN_SUFFIXES)}")
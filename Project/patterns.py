@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+"""
+Registry of named Game of Life patterns, and stamping of many copies of them into a world.
+
+A pattern is registered by name with a builder, a function that returns its living cells as
+(y, x) tuples. Nothing is built until a pattern is first used, and every orientation of it is
+built once and cached: rotations by quarter turns clockwise, after an optional mirror image
+left to right. Pattern files in the formats of Project.pattern_formats are registered with
+register_pattern_file().
+
+A placement is a (name, y, x, rotation, flip) tuple, with (y, x) the top left corner of the
+oriented pattern in the world. stamp() writes a list of placements into a flat grid, as one slice
+assignment per run of living cells in a row, and get_cells() returns the living cells of a list
+of placements as a set, for populations where each cell looks itself up. Cells that land on the
+rim or outside the world are left out, so patterns can be placed across the edges.
+
+The seeds of -s are lists of placements built from the world size, which place the same cells as
+code_base.get_pattern() without building the other seeds. --stamp places a pattern repeatedly over
+the whole world, on top of the seed:
+    python -m Project.gol -e compact -ws 1000x1000 --stamp glider:10 pulsar:40:0:0:20x20
+"""
+
+from functools import lru_cache, partial
+from pathlib import Path
+
+import Project.grid as grid
+import Project.pattern_formats as pattern_formats
+
+ROTATIONS = 4
+ALIVE_BYTES = bytes((grid.CODE_ALIVE,))
+
+
+def create_glider() -> list:
+    """ Return the cells of a glider travelling south east. """
+
+    return [(0, 2), (1, 0), (1, 2), (2, 1), (2, 2)]
+
+
+def create_pulsar() -> list:
+    """ Return the cells of a pulsar, a period 3 oscillator. """
+
+    #  One quarter of the pulsar is mirrored around the center cell (6, 6), in the same way as code_base.get_pattern().
+
+    quarter = {1: (2, 3, 4), 2: (1, 6), 3: (1, 6), 4: (1, 6), 6: (2, 3, 4)}
+
+    return [(6 + y_sign * row, 6 + x_sign * col) for row, cols in quarter.items() for col in cols
+            for y_sign in (-1, 1) for x_sign in (-1, 1)]
+
+
+def create_from_rows(*_rows: str) -> list:
+    """ Return the cells marked with 'X' in rows of text. """
+
+    return [(y, x) for y, row in enumerate(_rows) for x, cell in enumerate(row) if cell == 'X']
+
+
+def create_penta_decathlon() -> list:
+    """ Return the cells of a penta-decathlon, a period 15 oscillator. """
+
+    return create_from_rows('XXX', '.X.', '.X.', 'XXX', '...', 'XXX', 'XXX', '...', 'XXX', '.X.', '.X.', 'XXX')
+
+
+PATTERNS = {
+    'glider': create_glider,
+    'pulsar': create_pulsar,
+    'penta': create_penta_decathlon,
+    'block': partial(create_from_rows, 'XX', 'XX'),
+    'beehive': partial(create_from_rows, '.XX.', 'X..X', '.XX.'),
+    'loaf': partial(create_from_rows, '.XX.', 'X..X', '.X.X', '..X.'),
+    'boat': partial(create_from_rows, 'XX.', 'X.X', '.X.'),
+    'tub': partial(create_from_rows, '.X.', 'X.X', '.X.'),
+    'blinker': partial(create_from_rows, 'XXX'),
+    'toad': partial(create_from_rows, '.XXX', 'XXX.'),
+    'beacon': partial(create_from_rows, 'XX..', 'XX..', '..XX', '..XX')
+}
+
+
+def register_pattern(_name: str, _builder):
+    """ Register a pattern by name with a function that returns its living cells as (y, x) tuples. """
+
+    PATTERNS[_name] = _builder
+    get_pattern.cache_clear()
+    get_runs.cache_clear()
+
+
+def register_pattern_file(_name: str, _path: Path):
+    """ Register the pattern of a .rle, .cells, .lif or .life file by name, to be read on first use. """
+
+    def read_cells() -> list:
+        return [(y, x + offset) for y, x, length in pattern_formats.read_runs(_path) for offset in range(length)]
+
+    register_pattern(_name, read_cells)
+
+
+def orient_cells(_cells, _rotation: int = 0, _flip: bool = False) -> frozenset:
+    """ Rotate and mirror cells, and move them to have their top left corner at (0, 0). Returns frozenset of cells. """
+
+    cells = [(y, -x) if _flip else (y, x) for y, x in _cells]
+    for _ in range(_rotation % ROTATIONS):
+        cells = [(x, -y) for y, x in cells]
+    if not cells:
+        return frozenset()
+
+    y_min, x_min = min(y for y, _ in cells), min(x for _, x in cells)
+
+    return frozenset((y - y_min, x - x_min) for y, x in cells)
+
+
+@lru_cache(maxsize=None)
+def get_pattern(_name: str, _rotation: int = 0, _flip: bool = False) -> frozenset:
+    """ Build a pattern in one orientation, moved to have its top left corner at (0, 0). Returns frozenset of cells. """
+
+    if _name not in PATTERNS:
+        raise ValueError(f"Unknown pattern '{_name}', use one of: {', '.join(sorted(PATTERNS))}")
+
+    return orient_cells(PATTERNS[_name](), _rotation, _flip)
+
+
+@lru_cache(maxsize=None)
+def get_runs(_name: str, _rotation: int = 0, _flip: bool = False) -> tuple:
+    """ Return the living cells of a pattern orientation as runs of (y, x, length), row by row. """
+
+    runs = []
+
+    for y, x in sorted(get_pattern(_name, _rotation, _flip)):
+        if runs and runs[-1][0] == y and runs[-1][1] + runs[-1][2] == x:
+            runs[-1][2] += 1
+        else:
+            runs.append([y, x, 1])
+
+    return tuple(tuple(run) for run in runs)
+
+
+def get_size(_name: str, _rotation: int = 0, _flip: bool = False) -> tuple:
+    """ Return the (width, height) of the bounding box of a pattern orientation. """
+
+    cells = get_pattern(_name, _rotation, _flip)
+    if not cells:
+        return 0, 0
+
+    return max(x for _, x in cells) + 1, max(y for y, _ in cells) + 1
+
+
+def repeat(_name: str, _world_size: tuple, _step: tuple, _offset: tuple = (1, 1), _rotation: int = 0,
+           _flip: bool = False) -> list:
+    """ Return placements of a pattern every _step (x, y) cells from _offset (x, y), as far as they fit in the rim. """
+
+    width, height = get_size(_name, _rotation, _flip)
+    x_step, y_step = _step
+    x_offset, y_offset = _offset
+
+    return [(_name, y, x, _rotation, _flip) for y in range(y_offset, _world_size[1] - height, y_step)
+            for x in range(x_offset, _world_size[0] - width, x_step)]
+
+
+def stamp(_states: bytearray, _world_size: tuple, _placements, _first_row: int = 0) -> bytearray:
+    """ Write the living cells of every placement into a flat grid of state codes, inside the rim. """
+
+    #  _states holds the rows of the world from _first_row on, which is all of them by default, or one band of rows.
+    #  Each run is cut to the inner columns before its slice is assigned, so a run never wraps into the next row.
+
+    width, height = _world_size
+    first_row, end_row = max(_first_row, 1), min(_first_row + len(_states) // width, height - 1)
+
+    for name, y, x, rotation, flip in _placements:
+        for run_y, run_x, length in get_runs(name, rotation, flip):
+            row = y + run_y
+            if not first_row <= row < end_row:
+                continue
+            start, end = max(x + run_x, 1), min(x + run_x + length, width - 1)
+            if start < end:
+                index = (row - _first_row) * width
+                _states[index + start:index + end] = ALIVE_BYTES * (end - start)
+
+    return _states
+
+
+def get_cells(_placements, _world_size: tuple) -> set:
+    """ Return the living cells of every placement inside the rim as a set of (y, x). """
+
+    width, height = _world_size
+
+    return {(y + cell_y, x + cell_x) for name, y, x, rotation, flip in _placements
+            for cell_y, cell_x in get_pattern(name, rotation, flip)
+            if 0 < y + cell_y < height - 1 and 0 < x + cell_x < width - 1}
+
+
+def place_gliders(_world_size: tuple) -> list:
+    """ Place a glider in every corner of the world, each heading for the center. """
+
+    right, bottom = _world_size[0] - 4, _world_size[1] - 4
+
+    return [('glider', 1, 1, 0, False), ('glider', 1, right, 0, True),
+            ('glider', bottom, 1, 2, True), ('glider', bottom, right, 2, False)]
+
+
+def place_pulsar(_world_size: tuple) -> list:
+    """ Place a pulsar in the center of the world. """
+
+    return [('pulsar', int(_world_size[1] * .5) - 6, int(_world_size[0] * .5) - 6, 0, False)]
+
+
+def place_penta_decathlon(_world_size: tuple) -> list:
+    """ Place a penta-decathlon in the center of the world. """
+
+    return [('penta', int(_world_size[1] * .5 - 1) - 5, int(_world_size[0] * .5) - 1, 0, False)]
+
+
+SEEDS = {
+    'gliders': place_gliders,
+    'pulsar': place_pulsar,
+    'penta': place_penta_decathlon
+}
+
+
+def get_seed_placements(_seed: str, _world_size: tuple) -> list:
+    """ Return the placements of a seed of -s for a world of _world_size. """
+
+    if _seed not in SEEDS:
+        raise ValueError(f"Unknown seed '{_seed}', use one of: {', '.join(SEEDS)}")
+
+    return SEEDS[_seed](_world_size)
+
+
+def parse_stamp(_arg: str, _world_size: tuple) -> list:
+    """ Parse a --stamp argument NAME:STEP[:ROTATION[:FLIP[:XxY]]] into placements over the whole world. """
+
+    #  STEP is one number for both directions or XxY, FLIP is 0 or 1 and XxY is the offset of the first copy.
+
+    fields = _arg.split(':')
+    try:
+        if not 2 <= len(fields) <= 5:
+            raise ValueError
+        name = fields[0]
+        step = tuple(int(value) for value in fields[1].split('x'))
+        step = step * 2 if len(step) == 1 else step
+        rotation = int(fields[2]) if len(fields) > 2 else 0
+        flip = bool(int(fields[3])) if len(fields) > 3 else False
+        offset = tuple(int(value) for value in fields[4].split('x')) if len(fields) > 4 else (1, 1)
+        if len(step) != 2 or min(step) < 1 or len(offset) != 2:
+            raise ValueError
+    except ValueError as error:
+        raise ValueError(f"--stamp needs NAME:STEP[:ROTATION[:FLIP[:XxY]]] with a STEP of at least 1, "
+                         f"not '{_arg}'") from error
+
+    return repeat(name, _world_size, step, offset, rotation, flip)
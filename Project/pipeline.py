@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+"""
+Output stages of the Game of Life tick loop, which run in their own threads.
+
+The tick loop in the simulation decorator of Project.gol is the producer: it computes generations
+and hands what has to be shown or written to two stages, each a thread with a queue bounded to
+PIPELINE_DEPTH items and PIPELINE_BYTES bytes of state snapshots and grids, so a large world never
+has more than a few copies waiting:
+
+    render      Draws frames from state snapshots and prints messages to the console, paced by a
+                frame scheduler when there is a delay between generations.
+    log         Formats the record of every generation and writes it, with the other messages of
+                the run, to the loggers.
+
+Slow console or disk writes only stall the tick loop when a queue is full. Without a delay the
+render stage never falls behind: it skips every frame that already has a newer one waiting and
+draws the newest, so ticking runs at the speed of the engine. With a delay the frame scheduler
+gives every generation a due time counted from the start of the run, instead of sleeping a fixed
+time after each one, so time spent drawing does not add up to drift. A frame whose due time passed
+more than one interval ago is skipped when a newer frame is waiting, which lets a slow terminal catch
+up with the schedule. Log records are never skipped.
+
+A stage that fails stops at once. The next item handed to it, or the next check_stages() of the
+tick loop, raises its error, so the run ends instead of computing generations nobody sees.
+"""
+
+import logging
+import queue
+import threading
+from array import array
+from time import perf_counter, sleep
+
+import Project.profiling as profiling
+import Project.render as render
+import Project.stats as stats
+
+PIPELINE_DEPTH = 256
+PIPELINE_BYTES = 64 << 20
+
+
+def create_stage(_name: str, _handler) -> dict:
+    """ Start a stage thread that calls _handler with every batch of items waiting in its queue. """
+
+    #  A batch is every item in the queue when the thread wakes up, at least one, so a handler can skip items that
+    #  are already outdated. None in the queue ends the thread after the batch that holds it. An exception of the
+    #  handler ends the thread too, and is raised again in the producer by put(), check_stages() or stop_stage().
+    #  The queue holds (item, size) pairs, and the bytes of a batch are given back once it has been handled.
+
+    stage = {'name': _name, 'queue': queue.Queue(PIPELINE_DEPTH), 'error': None, 'raised': False, 'bytes': 0,
+             'space': threading.Condition()}
+
+    def run():
+        items = stage['queue']
+        done = False
+        while not done:
+            batch = [items.get()]
+            while True:
+                try:
+                    batch.append(items.get_nowait())
+                except queue.Empty:
+                    break
+            done = any(item is None for item, _ in batch)
+            try:
+                _handler([item for item, _ in batch if item is not None])
+            except BaseException as error:  # pylint: disable=broad-except - raised again in the producer
+                stage['error'] = error
+                done = True
+            with stage['space']:
+                stage['bytes'] -= sum(size for _, size in batch)
+                stage['space'].notify()
+        stage['closed'] = True
+        with stage['space']:
+            stage['space'].notify()
+
+    stage['closed'] = False
+    stage['thread'] = threading.Thread(target=run, name=f'gol-{_name}', daemon=True)
+    stage['thread'].start()
+
+    return stage
+
+
+def get_size(_item) -> int:
+    """ Return the number of bytes of the state snapshots and grids in an item, counting nothing else. """
+
+    if isinstance(_item, tuple):
+        return sum(get_size(part) for part in _item)
+    if isinstance(_item, (bytes, bytearray, memoryview, array)):
+        return memoryview(_item).nbytes
+
+    return 0
+
+
+def raise_error(_stage: dict):
+    """ Raise the error a stage stopped on, the first time it is asked for. """
+
+    if _stage['error'] is not None and not _stage['raised']:
+        _stage['raised'] = True
+        raise _stage['error']
+
+
+def check_stages(*_stages):
+    """ Raise the error of the first stage that stopped on one. Stages that are None are left out. """
+
+    for stage in _stages:
+        if stage is not None:
+            raise_error(stage)
+
+
+def put(_stage: dict, _item):
+    """ Hand an item to a stage, waiting while its queue is full or holds PIPELINE_BYTES. """
+
+    #  An item larger than PIPELINE_BYTES is let through when the queue holds no bytes, so it never waits forever.
+    #  Once the stage has stopped on an error, the error is raised instead of queueing the item.
+
+    size = get_size(_item)
+    with _stage['space']:
+        while _stage['bytes'] and _stage['bytes'] + size > PIPELINE_BYTES and not _stage['closed']:
+            _stage['space'].wait(0.1)
+        _stage['bytes'] += size
+
+    while not _stage['closed']:
+        try:
+            _stage['queue'].put((_item, size), timeout=0.1)
+            return
+        except queue.Full:
+            pass
+
+    raise_error(_stage)
+
+
+def stop_stage(_stage: dict):
+    """ Let a stage finish the items in its queue, stop its thread and raise the error it stopped on, if any. """
+
+    while not _stage['closed']:
+        try:
+            _stage['queue'].put((None, 0), timeout=0.1)
+            break
+        except queue.Full:
+            pass
+    _stage['thread'].join()
+
+    raise_error(_stage)
+
+
+def create_render_handler(_renderer: dict, _delay: float, _start_generation: int, _profiler: dict = None):
+    """ Return the handler of the render stage. """
+
+    #  Items are ('frame', generation, states) and ('text', message). A frame without states only paces the run, for
+    #  generations that are not drawn. The first generation is due as soon as it arrives, every later generation
+    #  _delay seconds per generation after it.
+
+    schedule = {'start': None}
+
+    def handle(_batch: list):
+        last_frame = max((index for index, item in enumerate(_batch) if item[0] == 'frame'), default=-1)
+
+        for index, item in enumerate(_batch):
+            if item[0] == 'text':
+                profiling.time_call(_profiler, 'output', print, item[1])
+                continue
+
+            _, generation, states = item
+            if _delay:
+                if schedule['start'] is None:
+                    schedule['start'] = perf_counter() - (generation - _start_generation) * _delay
+                due = schedule['start'] + (generation - _start_generation) * _delay
+                now = perf_counter()
+                if now < due:
+                    profiling.time_call(_profiler, 'delay', sleep, due - now)
+                elif now - due > _delay and index < last_frame:
+                    continue
+            elif index < last_frame:
+                continue
+
+            if states is not None:
+                profiling.time_call(_profiler, 'render', render.draw_states, _renderer, states)
+
+    return handle
+
+
+def create_log_handler(_logger: logging.Logger, _generations_logger: logging.Logger, _log_format: str,
+                       _profiler: dict = None):
+    """ Return the handler of the log stage. """
+
+    #  Items are ('record', record) for the generations logger and ('message', text) for the main logger, written in
+    #  the order they were queued.
+
+    def write(_batch: list):
+        for kind, content in _batch:
+            if kind == 'record':
+                _generations_logger.info(stats.format_record(content, _log_format))
+            else:
+                _logger.info(content)
+
+    def handle(_batch: list):
+        profiling.time_call(_profiler, 'logging', write, _batch)
+
+    return handle
+
+
+def stop_stages(*_stages):
+    """ Stop every (stage, discard) pair that has a stage, dropping its queued items first when discard is set. """
+
+    #  All stages are stopped before the first error any of them stopped on is raised. Queued frames are discarded
+    #  when the tick loop ends early, so an interrupted run does not keep drawing paced frames for a while.
+
+    error = None
+
+    for stage, discard in _stages:
+        if stage is None:
+            continue
+        while discard:
+            try:
+                _, size = stage['queue'].get_nowait()
+            except queue.Empty:
+                break
+            with stage['space']:
+                stage['bytes'] -= size
+                stage['space'].notify()
+        try:
+            stop_stage(stage)
+        except BaseException as stage_error:  # pylint: disable=broad-except - raised after stopping every stage
+            error = error or stage_error
+
+    if error is not None:
+        raise error
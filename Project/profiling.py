@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+"""
+Profiling and runtime metrics of the Game of Life tick loop, enabled with '--profile', '--cprofile'
+and '--metrics'.
+
+With --profile the time of every generation is split over the phases of PHASES. The first five
+are phases of the tick loop:
+
+    rules       Ticking the world with the engine, apart from counting neighbours.
+    neighbours  The count_alive_neighbours() function of the engine, where it has one.
+    stats       Counting states, applying changes and cycle detection.
+    checkpoint  Copying the grid for a checkpoint or the recording.
+    wait        Handing frames and records to the output stages, waiting while their queues are full
+                and for the stages to finish at the end.
+
+The others are phases of the output stages of Project.pipeline, which run in their own threads:
+
+    render      Drawing the world, apart from writing it to the console.
+    output      Console writes through cb.progress() and printed messages.
+    logging     Formatting and logging the record of every generation.
+    delay       Waiting for the due time of a generation.
+    recording   Encoding, compressing and writing the frames of a recording.
+    census      Grouping and classifying the objects of the world.
+
+The tick loop switches from one phase to the next, and the functions that run inside a phase,
+count_alive_neighbours() and cb.progress(), are replaced with timed versions for the duration of
+the run. Their time is taken out of the phase they ran in, so the phases of the tick loop add up to
+the loop time. The output stages run at the same time as the tick loop, so their share comes on top.
+Timing functions that are called once per cell, like those of the dict engine, slows them down,
+which shows in their phase. Work done in worker processes is counted in the phase that waits for it.
+cProfile only records the thread of the tick loop.
+
+With --cprofile the whole run is recorded with cProfile and saved to _Resources/gol.prof, to be
+read with 'python -m pstats'. With --metrics the file _Resources/gol.prom is rewritten about every
+METRICS_INTERVAL seconds in the Prometheus text format, with the generations and phase seconds so far
+and the ticks and cells per second since the previous write, for a node exporter textfile collector
+or anything else that polls it.
+"""
+
+import cProfile
+import functools
+import os
+import threading
+from pathlib import Path
+from time import perf_counter
+
+LOOP_PHASES = ('rules', 'neighbours', 'stats', 'checkpoint', 'wait')
+PHASES = LOOP_PHASES + ('render', 'output', 'logging', 'delay', 'recording', 'census')
+METRICS_INTERVAL = 1.0
+
+
+def create_profiler(_phases: bool, _cprofile_path: Path = None, _metrics_path: Path = None, _labels: dict = None):
+    """ Create the profiler state. Returns None when nothing is profiled or measured. """
+
+    if not (_phases or _cprofile_path or _metrics_path):
+        return None
+
+    return {'phases': _phases, 'totals': dict.fromkeys(PHASES, 0.0), 'calls': dict.fromkeys(PHASES, 0),
+            'phase': None, 'phase_start': 0.0, 'nested': threading.local(), 'lock': threading.Lock(), 'hooks': [],
+            'cprofile': cProfile.Profile() if _cprofile_path else None, 'cprofile_path': _cprofile_path,
+            'metrics_path': _metrics_path, 'labels': _labels or {}, 'cells': 0, 'generations': 0,
+            'start': perf_counter(), 'elapsed': 0.0, 'start_generation': 0, 'last_write': None,
+            'last_generations': 0}
+
+
+def get_nested(_profiler: dict) -> float:
+    """ Return the time of timed functions that ran inside the current phase of this thread. """
+
+    return getattr(_profiler['nested'], 'seconds', 0.0)
+
+
+def add_time(_profiler: dict, _phase: str, _seconds: float):
+    """ Add _seconds and one call to _phase, from any thread. """
+
+    with _profiler['lock']:
+        _profiler['totals'][_phase] += _seconds
+        _profiler['calls'][_phase] += 1
+
+
+def time_function(_profiler: dict, _phase: str, _function):
+    """ Return a version of _function whose time is added to _phase and taken out of the phase it runs in. """
+
+    #  The time is taken out of the phase of the thread the function runs in, kept in a thread local.
+
+    nested = _profiler['nested']
+
+    @functools.wraps(_function)
+    def timed(*args, **kwargs):
+        start_time = perf_counter()
+        try:
+            return _function(*args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start_time
+            add_time(_profiler, _phase, elapsed)
+            nested.seconds = getattr(nested, 'seconds', 0.0) + elapsed
+
+    return timed
+
+
+def time_call(_profiler: dict, _phase: str, _function, *args):
+    """ Call _function in an output stage, adding its time to _phase apart from the timed functions it calls. """
+
+    if _profiler is None or not _profiler['phases']:
+        return _function(*args)
+
+    nested = get_nested(_profiler)
+    start_time = perf_counter()
+    try:
+        return _function(*args)
+    finally:
+        elapsed = perf_counter() - start_time
+        add_time(_profiler, _phase, elapsed - (get_nested(_profiler) - nested))
+        _profiler['nested'].seconds = nested + elapsed
+
+
+def install_hooks(_profiler: dict, _targets):
+    """ Replace every (module, name, phase) of _targets that exists with a timed version, when phases are timed. """
+
+    if _profiler is None or not _profiler['phases']:
+        return
+
+    for module, name, phase in _targets:
+        function = getattr(module, name, None)
+        if function is not None:
+            _profiler['hooks'].append((module, name, function))
+            setattr(module, name, time_function(_profiler, phase, function))
+
+
+def remove_hooks(_profiler: dict):
+    """ Put back the functions replaced by install_hooks(). """
+
+    if _profiler is None:
+        return
+
+    for module, name, function in reversed(_profiler['hooks']):
+        setattr(module, name, function)
+    _profiler['hooks'].clear()
+
+
+def start(_profiler: dict, _world_size: tuple, _generation: int):
+    """ Start profiling the tick loop of a world of _world_size, which starts at _generation. """
+
+    if _profiler is None:
+        return
+
+    _profiler['cells'] = max(_world_size[0] - 2, 0) * max(_world_size[1] - 2, 0)
+    _profiler['start'] = perf_counter()
+    _profiler['last_write'] = _profiler['start']
+    _profiler['generations'] = _profiler['last_generations'] = _profiler['start_generation'] = _generation
+    if _profiler['cprofile']:
+        _profiler['cprofile'].enable()
+
+
+def switch_phase(_profiler: dict, _phase: str = None):
+    """ End the current phase of the tick loop and start _phase, or no phase when _phase is None. """
+
+    if _profiler is None or not _profiler['phases']:
+        return
+
+    now = perf_counter()
+    if _profiler['phase'] is not None:
+        add_time(_profiler, _profiler['phase'], now - _profiler['phase_start'] - get_nested(_profiler))
+
+    _profiler['phase'] = _phase
+    _profiler['phase_start'] = now
+    _profiler['nested'].seconds = 0.0
+
+
+def count_generations(_profiler: dict, _generation: int):
+    """ Record that the loop reached _generation, and rewrite the metrics file when it is due. """
+
+    if _profiler is None:
+        return
+
+    _profiler['generations'] = _generation
+    if _profiler['metrics_path'] and perf_counter() - _profiler['last_write'] >= METRICS_INTERVAL:
+        write_metrics(_profiler)
+
+
+def get_metrics(_profiler: dict) -> str:
+    """ Return the metrics of the run so far in the Prometheus text format, and start a new rate interval. """
+
+    now = perf_counter()
+    interval = now - _profiler['last_write']
+    ticks_per_second = (_profiler['generations'] - _profiler['last_generations']) / interval if interval else 0.0
+    _profiler['last_write'] = now
+    _profiler['last_generations'] = _profiler['generations']
+
+    labels = ','.join(f'{name}="{value}"' for name, value in _profiler['labels'].items())
+    lines = [
+        '# HELP gol_info Settings of the simulation.',
+        '# TYPE gol_info gauge',
+        f'gol_info{{{labels}}} 1',
+        '# HELP gol_generation Generation the simulation has reached.',
+        '# TYPE gol_generation gauge',
+        f'gol_generation {_profiler["generations"]}',
+        '# HELP gol_ticks_per_second Generations per second since the previous write.',
+        '# TYPE gol_ticks_per_second gauge',
+        f'gol_ticks_per_second {ticks_per_second:.6g}',
+        '# HELP gol_cells_per_second Inner cells updated per second since the previous write.',
+        '# TYPE gol_cells_per_second gauge',
+        f'gol_cells_per_second {ticks_per_second * _profiler["cells"]:.6g}',
+        '# HELP gol_run_seconds Seconds since the tick loop started.',
+        '# TYPE gol_run_seconds gauge',
+        f'gol_run_seconds {now - _profiler["start"]:.6g}'
+    ]
+
+    if _profiler['phases']:
+        lines += ['# HELP gol_phase_seconds_total Seconds spent in each phase of the tick loop.',
+                  '# TYPE gol_phase_seconds_total counter']
+        lines += [f'gol_phase_seconds_total{{phase="{phase}"}} {seconds:.6g}'
+                  for phase, seconds in _profiler['totals'].items()]
+
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics(_profiler: dict):
+    """ Rewrite the metrics file, under a temporary name first so that readers never see half a file. """
+
+    path = _profiler['metrics_path']
+    temporary_path = path.with_suffix('.tmp')
+    temporary_path.write_text(get_metrics(_profiler), encoding='UTF-8')
+    os.replace(temporary_path, path)
+
+
+def stop(_profiler: dict):
+    """ Stop profiling: end the current phase, put back hooked functions, save cProfile data and metrics. """
+
+    if _profiler is None:
+        return
+
+    _profiler['elapsed'] = perf_counter() - _profiler['start']
+    if _profiler['cprofile']:
+        _profiler['cprofile'].disable()
+        _profiler['cprofile'].dump_stats(str(_profiler['cprofile_path']))
+    switch_phase(_profiler)
+    remove_hooks(_profiler)
+    if _profiler['metrics_path']:
+        write_metrics(_profiler)
+
+
+def get_report(_profiler: dict) -> list:
+    """ Return the lines of the phase breakdown of a stopped profiler and the files it wrote, to print and log. """
+
+    lines = []
+
+    if _profiler['phases']:
+        elapsed = _profiler['elapsed']
+        generations = max(_profiler['generations'] - _profiler['start_generation'], 1)
+        total = sum(_profiler['totals'][phase] for phase in LOOP_PHASES)
+        lines.append(f'{"Phase":<12}{"Seconds":>12}{"Share":>9}{"ms/gen":>10}{"Calls":>12}')
+        for phases in (LOOP_PHASES, PHASES[len(LOOP_PHASES):]):
+            if phases is not LOOP_PHASES:
+                lines.append(f'{"other":<12}{max(elapsed - total, 0):>12.4f}')
+                lines.append('Output stages, in their own threads:')
+            for phase in sorted(phases, key=lambda name: -_profiler['totals'][name]):
+                seconds = _profiler['totals'][phase]
+                lines.append(f'{phase:<12}{seconds:>12.4f}{seconds / elapsed if elapsed else 0:>9.1%}'
+                             f'{seconds * 1000 / generations:>10.3f}{_profiler["calls"][phase]:>12}')
+
+    if _profiler['cprofile_path']:
+        lines.append(f'cProfile data written to {_profiler["cprofile_path"]}, '
+                     f'view it with: python -m pstats {_profiler["cprofile_path"]}')
+    if _profiler['metrics_path']:
+        lines.append(f'Metrics written to {_profiler["metrics_path"]}')
+
+    return lines
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+"""
+Seekable recordings of Game of Life runs, written with '--record NAME' and read by Project.replay.
+
+A recording file starts with a 28 byte header: the magic bytes b'GOLR', a format version and a
+reserved field as unsigned shorts, the world width and height and the keyframe interval as
+unsigned ints and the first generation as an unsigned long long, all little-endian. Then follows
+one frame per recorded generation, each a 13 byte frame header, the kind of frame as an unsigned
+char, the generation as an unsigned long long and the payload length as an unsigned int, and the
+payload, compressed with zlib:
+
+    key     The state code bytes and the little-endian unsigned int ages of the world, both in the
+            row order of Project.grid, like a checkpoint.
+    delta   The same bytes XORed with those of the previous frame, which are zero for every cell
+            that did not change and compress to almost nothing.
+
+A key frame is written for the first generation and every KEYFRAME_EVERY generations after that,
+so any generation is at most one key frame and KEYFRAME_EVERY - 1 deltas away. When the recording
+is closed, an index of the generation and file offset of every key frame is appended, followed by a
+16 byte trailer: the offset of the index as an unsigned long long, the number of key frames as an
+unsigned int and the magic bytes b'GOLI'. Seeking looks up the nearest key frame at or before a
+generation in the index and applies the deltas up to it. A recording without an index, from a run
+that was killed, is scanned frame by frame once when it is opened.
+
+The frames are computed and compressed by a stage of Project.pipeline, in its own thread. zlib
+releases the GIL while it compresses, so the next generations are computed in the meantime.
+"""
+
+import bisect
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+
+import Project.profiling as profiling
+
+RECORDING_SUFFIX = '.golr'
+RECORDING_MAGIC = b'GOLR'
+RECORDING_VERSION = 1
+INDEX_MAGIC = b'GOLI'
+KEYFRAME_EVERY = 100
+COMPRESSION_LEVEL = 1
+HEADER = struct.Struct('<4sHHIIIQ')
+FRAME_HEADER = struct.Struct('<BQI')
+INDEX_ENTRY = struct.Struct('<QQ')
+TRAILER = struct.Struct('<QI4s')
+FRAME_KEY, FRAME_DELTA = 0, 1
+
+
+def get_recording_path(_directory: Path, _name: str) -> Path:
+    """ Return the path of the recording _name in _directory, with the recording suffix added when it is missing. """
+
+    if not _name.endswith(RECORDING_SUFFIX):
+        _name = f'{_name}{RECORDING_SUFFIX}'
+
+    return _directory / _name
+
+
+def get_cells(_grid: tuple) -> bytes:
+    """ Return the state codes and little-endian ages of a (states, ages) grid as one run of bytes. """
+
+    states, ages = _grid
+    if sys.byteorder == 'big':
+        ages = array('I', ages)
+        ages.byteswap()
+
+    return bytes(memoryview(states).cast('B')) + bytes(memoryview(ages).cast('B'))
+
+
+def xor_bytes(_first: bytes, _second: bytes) -> bytes:
+    """ XOR two runs of bytes of the same length, as big integers. """
+
+    return (int.from_bytes(_first, 'little') ^ int.from_bytes(_second, 'little')).to_bytes(len(_first), 'little')
+
+
+def create_recorder(_path: Path, _world_size: tuple, _keyframe_every: int = KEYFRAME_EVERY,
+                    _start_generation: int = 0) -> dict:
+    """ Create a recording file and the recorder state that writes frames to it. """
+
+    if not _path.parent.exists():
+        _path.parent.mkdir(parents=True)
+
+    f_hand = Path.open(_path, 'wb')
+    f_hand.write(HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, 0, _world_size[0], _world_size[1], _keyframe_every,
+                             _start_generation))
+
+    return {'path': _path, 'file': f_hand, 'keyframe_every': _keyframe_every, 'next_keyframe': _start_generation,
+            'previous': None, 'generation': None, 'keyframes': []}
+
+
+def record_frame(_recorder: dict, _generation: int, _grid: tuple):
+    """ Write the (states, ages) grid of _generation as a key frame when one is due, or else as a delta. """
+
+    #  Generations that an engine jumped over are not recorded, so the next key frame is due at the first recorded
+    #  generation at or after the next multiple of the interval.
+
+    cells = get_cells(_grid)
+    f_hand = _recorder['file']
+
+    if _recorder['previous'] is None or _generation >= _recorder['next_keyframe']:
+        kind, payload = FRAME_KEY, cells
+        _recorder['keyframes'].append((_generation, f_hand.tell()))
+        every = _recorder['keyframe_every']
+        _recorder['next_keyframe'] = _generation - _generation % every + every
+    else:
+        kind, payload = FRAME_DELTA, xor_bytes(cells, _recorder['previous'])
+
+    payload = zlib.compress(payload, COMPRESSION_LEVEL)
+    f_hand.write(FRAME_HEADER.pack(kind, _generation, len(payload)))
+    f_hand.write(payload)
+    _recorder['previous'] = cells
+    _recorder['generation'] = _generation
+
+
+def close_recorder(_recorder: dict):
+    """ Append the key frame index and the trailer, and close the recording file. """
+
+    f_hand = _recorder['file']
+    index_offset = f_hand.tell()
+
+    for generation, offset in _recorder['keyframes']:
+        f_hand.write(INDEX_ENTRY.pack(generation, offset))
+    f_hand.write(TRAILER.pack(index_offset, len(_recorder['keyframes']), INDEX_MAGIC))
+    f_hand.close()
+
+
+def create_record_handler(_recorder: dict, _profiler: dict = None):
+    """ Return the handler of the record stage, whose items are (generation, grid) tuples. """
+
+    def handle(_batch: list):
+        for generation, grid_copy in _batch:
+            profiling.time_call(_profiler, 'recording', record_frame, _recorder, generation, grid_copy)
+
+    return handle
+
+
+def read_frame_header(_recording: dict, _offset: int) -> tuple:
+    """ Read the frame header at _offset. Returns tuple: kind, generation, payload offset and payload length. """
+
+    if _offset + FRAME_HEADER.size > _recording['frames_end']:
+        raise ValueError(f'{_recording["path"]} is truncated')
+
+    kind, generation, length = FRAME_HEADER.unpack_from(_recording['data'], _offset)
+    if _offset + FRAME_HEADER.size + length > _recording['frames_end'] or kind not in (FRAME_KEY, FRAME_DELTA):
+        raise ValueError(f'{_recording["path"]} is truncated')
+
+    return kind, generation, _offset + FRAME_HEADER.size, length
+
+
+def scan_keyframes(_recording: dict) -> list:
+    """ Find the key frames of a recording without an index by reading every frame header. """
+
+    #  A frame cut off by a killed run ends the scan, and the frames before it stay readable.
+
+    keyframes = []
+    offset = HEADER.size
+    data = _recording['data']
+
+    while offset + FRAME_HEADER.size <= len(data):
+        kind, generation, length = FRAME_HEADER.unpack_from(data, offset)
+        if offset + FRAME_HEADER.size + length > len(data) or kind not in (FRAME_KEY, FRAME_DELTA):
+            break
+        if kind == FRAME_KEY:
+            keyframes.append((generation, offset))
+        offset += FRAME_HEADER.size + length
+
+    _recording['frames_end'] = offset
+
+    return keyframes
+
+
+def open_recording(_path: Path) -> dict:
+    """ Open a recording file for reading. Returns dict: the recording. """
+
+    #  The file is memory-mapped read-only, so only the frames that are decoded are read from disk.
+
+    with Path.open(_path, 'rb') as f_hand:
+        data = mmap.mmap(f_hand.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(data) < HEADER.size:
+        raise ValueError(f'{_path} is not a version {RECORDING_VERSION} recording file')
+    magic, version, _, width, height, keyframe_every, start_generation = HEADER.unpack_from(data)
+    if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+        raise ValueError(f'{_path} is not a version {RECORDING_VERSION} recording file')
+
+    recording = {'path': _path, 'data': data, 'world_size': (width, height), 'keyframe_every': keyframe_every,
+                 'start_generation': start_generation, 'indexed': False}
+
+    index_offset, count, index_magic = TRAILER.unpack_from(data, len(data) - TRAILER.size) \
+        if len(data) >= HEADER.size + TRAILER.size else (0, 0, b'')
+    if index_magic == INDEX_MAGIC and index_offset + count * INDEX_ENTRY.size == len(data) - TRAILER.size:
+        recording['frames_end'] = index_offset
+        recording['keyframes'] = [INDEX_ENTRY.unpack_from(data, index_offset + entry * INDEX_ENTRY.size)
+                                  for entry in range(count)]
+        recording['indexed'] = True
+    else:
+        recording['keyframes'] = scan_keyframes(recording)
+
+    recording['generations'] = [generation for generation, _ in recording['keyframes']]
+
+    return recording
+
+
+def close_recording(_recording: dict):
+    """ Release the memory map of a recording. """
+
+    _recording['data'].close()
+
+
+def get_last_generation(_recording: dict):
+    """ Return the last recorded generation, or None when nothing was recorded. """
+
+    #  Only the frames after the last key frame are read.
+
+    if not _recording['keyframes']:
+        return None
+
+    offset = _recording['keyframes'][-1][1]
+    generation = None
+    while offset < _recording['frames_end']:
+        _, generation, payload_offset, length = read_frame_header(_recording, offset)
+        offset = payload_offset + length
+
+    return generation
+
+
+def iterate_frames(_recording: dict, _generation: int = None):
+    """ Yield (generation, grid) for every recorded generation, starting at _generation or the first one. """
+
+    #  Decoding starts at the last key frame at or before _generation, and the deltas before _generation are applied
+    #  without being yielded, so the first grid costs at most one key frame and KEYFRAME_EVERY - 1 deltas.
+
+    if not _recording['keyframes']:
+        return
+
+    start = 0 if _generation is None else max(bisect.bisect_right(_recording['generations'], _generation) - 1, 0)
+    offset = _recording['keyframes'][start][1]
+    size = _recording['world_size'][0] * _recording['world_size'][1]
+    cells = None
+
+    while offset < _recording['frames_end']:
+        kind, generation, payload_offset, length = read_frame_header(_recording, offset)
+        payload = zlib.decompress(_recording['data'][payload_offset:payload_offset + length])
+        if len(payload) != 5 * size:
+            raise ValueError(f'{_recording["path"]} has a broken frame at generation {generation}')
+        cells = payload if kind == FRAME_KEY else xor_bytes(payload, cells)
+        offset = payload_offset + length
+
+        if _generation is None or generation >= _generation:
+            ages = array('I')
+            ages.frombytes(cells[size:])
+            if sys.byteorder == 'big':
+                ages.byteswap()
+            yield generation, (bytearray(cells[:size]), ages)
+
+
+def seek(_recording: dict, _generation: int) -> tuple:
+    """ Return the (states, ages) grid of a recorded generation. """
+
+    for generation, grid_copy in iterate_frames(_recording, _generation):
+        if generation == _generation:
+            return grid_copy
+        break
+
+    raise ValueError(f'Generation {_generation} is not in {_recording["path"].name}')
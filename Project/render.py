@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Frame renderer for the Game of Life, selected with '--render-mode frame' or '--render-mode diff'.
+
+A whole frame is assembled from the flat state bytes of a world into one string and written with a
+single call. The ANSI colour codes of every state are looked up once, runs of cells with the same
+state share one pair of colour codes, and the cursor is moved home instead of clearing the console
+through a shell. In diff mode only the rows that changed since the previous frame are redrawn,
+starting at the first changed column of each row.
+"""
+
+import re
+
+import Project.code_base as cb
+import Project.grid as grid
+
+RENDER_MODES = ('clear', 'frame', 'diff')
+
+CURSOR_HOME = '\033[H'
+CLEAR_SCREEN = '\033[2J'
+STATE_CHARS = grid.CODE_STATES
+STATE_COLOURS, STATE_COLOUR_ENDS = zip(*(cb.get_print_value(state).split(state) for state in STATE_CHARS))
+RUN_PATTERN = re.compile(rb'(.)\1*', re.DOTALL)
+
+
+def create_renderer(_mode: str, _world_size: tuple) -> dict:
+    """ Create the renderer state for the given mode. """
+
+    if _mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode '{_mode}', choose one of: {', '.join(RENDER_MODES)}")
+
+    return {'mode': _mode, 'world_size': _world_size, 'previous': None}
+
+
+def render_row(_row: bytes) -> str:
+    """ Return the coloured text of a row of state codes. """
+
+    #  The colour is reset after every run, since the rim colour is a background colour that would otherwise carry
+    #  over to the next run.
+
+    return ''.join(STATE_COLOURS[code] + STATE_CHARS[code] * len(match.group()) + STATE_COLOUR_ENDS[code]
+                   for match in RUN_PATTERN.finditer(_row) for code in (match.group()[0],))
+
+
+def render_frame(_states: bytes, _world_size: tuple) -> str:
+    """ Return the text of a full frame, starting with the cursor home. """
+
+    width, height = _world_size
+    return CURSOR_HOME + '\n'.join(render_row(_states[y * width:(y + 1) * width]) for y in range(height)) + '\n'
+
+
+def render_diff(_states: bytes, _previous: bytes, _world_size: tuple) -> str:
+    """ Return the text that redraws the cells that changed since the _previous frame. """
+
+    #  Rows are compared as byte strings, which is done in C. For a changed row the cursor is moved to the first
+    #  changed column, ANSI rows and columns count from 1, and the rest of the row up to the last change is redrawn.
+
+    width, height = _world_size
+    parts = []
+
+    for y in range(height):
+        row, previous_row = _states[y * width:(y + 1) * width], _previous[y * width:(y + 1) * width]
+        if row == previous_row:
+            continue
+
+        first = next(x for x in range(width) if row[x] != previous_row[x])
+        last = next(x for x in range(width - 1, -1, -1) if row[x] != previous_row[x])
+        parts.append(f'\033[{y + 1};{first + 1}H' + render_row(row[first:last + 1]))
+
+    parts.append(f'\033[{height + 1};1H')
+
+    return ''.join(parts)
+
+
+def draw_states(_renderer: dict, _states: bytes):
+    """ Draw a snapshot of the state codes of a world to console with one write. """
+
+    #  In clear mode the console is cleared and the snapshot printed with grid.print_grid(). The first frame of frame
+    #  and diff mode clears the screen with an ANSI code, later frames overwrite it in place.
+
+    world_size = _renderer['world_size']
+
+    if _renderer['mode'] == 'clear':
+        cb.clear_console()
+        grid.print_grid(_states, world_size)
+        return
+
+    previous = _renderer['previous']
+
+    if previous is None:
+        text = CLEAR_SCREEN + render_frame(_states, world_size)
+    elif _renderer['mode'] == 'diff':
+        text = render_diff(_states, previous, world_size)
+    else:
+        text = render_frame(_states, world_size)
+
+    cb.progress(text)
+    _renderer['previous'] = _states
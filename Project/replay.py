@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Replay tool for recordings of Game of Life runs, made with '--record NAME'.
+
+Any generation of a recording is reached from the nearest key frame before it, without running the
+simulation again, so generation 90000 of a long run takes as long to show as generation 10. From
+there the generations are drawn one after another like the simulation draws them, and the grid of
+the last one shown can be saved as a seed to continue the run from with -f. Run it as a module:
+    python -m Project.replay long_run --info
+    python -m Project.replay long_run -g 90000 -n 50 --delay 0.1
+    python -m Project.replay long_run -g 90000 --save generation_90000
+"""
+
+import argparse
+from pathlib import Path
+from time import perf_counter, sleep
+
+import Project.code_base as cb
+import Project.recording as recording
+import Project.render as render
+from Project.gol import RECORDINGS, save_world
+
+
+def print_info(_recording: dict):
+    """ Print the world size, recorded generations and key frames of a recording. """
+
+    width, height = _recording['world_size']
+    keyframes = _recording['keyframes']
+    print(f'Recording:     {_recording["path"]}')
+    print(f'World size:    {width}x{height}')
+    if keyframes:
+        print(f'Generations:   {keyframes[0][0]} to {recording.get_last_generation(_recording)}')
+    else:
+        print('Generations:   none')
+    print(f'Key frames:    {len(keyframes)}, every {_recording["keyframe_every"]} generations')
+    print(f'Index:         {"yes" if _recording["indexed"] else "no, rebuilt from the frames"}')
+    print(f'File size:     {len(_recording["data"])} bytes')
+
+
+def replay(_recording: dict, _generation: int, _count: int, _delay: float, _render_mode: str, _render: bool) -> tuple:
+    """ Draw _count generations from _generation on. Returns tuple: the last generation shown and its grid. """
+
+    #  Every generation is due _delay seconds after the previous one was due, so drawing time does not add up.
+
+    renderer = render.create_renderer(_render_mode, _recording['world_size'])
+    last = None
+    due = perf_counter()
+
+    for shown, (generation, grid_copy) in enumerate(recording.iterate_frames(_recording, _generation)):
+        if shown == 0 and _generation is not None and generation != _generation:
+            raise ValueError(f'Generation {_generation} is not in {_recording["path"].name}, the next recorded '
+                             f'generation is {generation}')
+        if shown:
+            due += _delay
+            sleep(max(due - perf_counter(), 0))
+        if _render:
+            render.draw_states(renderer, grid_copy[0])
+            cb.progress(f'Generation {generation}\n')
+        last = generation, grid_copy
+        if _count and shown + 1 >= _count:
+            break
+
+    if last is None:
+        raise ValueError(f'{_recording["path"].name} holds no generations from {_generation} on')
+
+    return last
+
+
+def main():
+    """ Replay the recording described by the command line arguments. """
+
+    parser = argparse.ArgumentParser(description='Seek to and replay generations of a recorded simulation.')
+    parser.add_argument('name', type=str,
+                        help='Name of the recording in _Resources/_Recordings, or a path to a recording file.')
+    parser.add_argument('-g', '--generation', dest='generation', type=int,
+                        help='Generation to start at. Defaults to the first recorded generation.')
+    parser.add_argument('-n', '--count', dest='count', type=int, default=1,
+                        help='Number of generations to show, 0 for all until the end. Defaults to 1.')
+    parser.add_argument('--delay', dest='delay', type=float, default=0.2,
+                        help='Delay in seconds between generations. Defaults to 0.2.')
+    parser.add_argument('--render-mode', dest='render_mode', type=str, default='frame', choices=render.RENDER_MODES,
+                        help='How the world is drawn. Defaults to frame.')
+    parser.add_argument('--no-render', dest='render', action='store_false',
+                        help='Do not print the world, for example with --save.')
+    parser.add_argument('--save', dest='save', type=str,
+                        help='Save the last generation shown to this file in _Resources/_Project_Files, like --save '
+                             'of the simulation. Load it again with -f.')
+    parser.add_argument('--info', dest='info', action='store_true',
+                        help='Only print what the recording holds.')
+    args = parser.parse_args()
+
+    if args.count < 0:
+        parser.error('--count needs to be at least 0')
+    if args.delay < 0:
+        parser.error('--delay needs to be at least 0')
+
+    path = recording.get_recording_path(RECORDINGS.resolve(), args.name)
+    if not path.exists() and Path(args.name).exists():
+        path = Path(args.name)
+
+    try:
+        recorded = recording.open_recording(path)
+    except (ValueError, FileNotFoundError) as error:
+        parser.error(str(error))
+
+    try:
+        if args.info:
+            print_info(recorded)
+            return
+
+        start_time = perf_counter()
+        generation, grid_copy = replay(recorded, args.generation, args.count, args.delay if args.render else 0,
+                                       args.render_mode, args.render)
+        if not args.render:
+            print(f'Generation {generation} decoded in {perf_counter() - start_time:.3f} s')
+        if args.save:
+            save_world(args.save, grid_copy, recorded['world_size'])
+            print(f'Generation {generation} saved to {args.save}')
+    except ValueError as error:
+        parser.error(str(error))
+    finally:
+        recording.close_recording(recorded)
+
+
+if __name__ == "__main__":
+    main()
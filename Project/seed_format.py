@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Compact binary seed format for the Game of Life.
+
+A seed file starts with a 16 byte header: the magic bytes b'GOLS', a format version and a reserved
+field as unsigned shorts, and the world width and height as unsigned ints, all little-endian. The
+header is followed by one state code byte per cell, padding up to a multiple of 4 bytes, and one
+little-endian unsigned int age per cell, both in the row order of Project.grid.
+
+Loading maps the file into memory and returns views of the state and age sections as a grid, so no
+Python code runs per cell. Seeds in the JSON format can be converted by running this script as a
+module:
+    python -m Project.seed_format seed_random1 seed_pulsar
+    python -m Project.seed_format --all
+"""
+
+import argparse
+import mmap
+import re
+import struct
+import sys
+from pathlib import Path
+
+import Project.grid as grid
+
+SEED_SUFFIX = '.seed'
+SEED_MAGIC = b'GOLS'
+SEED_VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+INVALID_STATE = re.compile(b'[^\x00-\x04]')
+
+
+def get_ages_offset(_world_size: tuple) -> int:
+    """ Return the byte offset of the ages section, which is aligned to 4 bytes. """
+
+    width, height = _world_size
+    return HEADER.size + (width * height + 3) // 4 * 4
+
+
+def save_seed(_path: Path, _states, _ages, _world_size: tuple):
+    """ Save a (states, ages) grid to a seed file. """
+
+    width, height = _world_size
+    ages = memoryview(_ages).cast('B')
+    if sys.byteorder == 'big':
+        ages = grid.copy_ages(_ages)
+        ages.byteswap()
+
+    with Path.open(_path, 'wb') as f_hand:
+        f_hand.write(HEADER.pack(SEED_MAGIC, SEED_VERSION, 0, width, height))
+        f_hand.write(memoryview(_states).cast('B'))
+        f_hand.write(bytes(get_ages_offset(_world_size) - HEADER.size - width * height))
+        f_hand.write(ages)
+
+
+def load_seed(_path: Path) -> tuple:
+    """ Load a seed file. Returns tuple: grid (states, ages) and world_size (tuple). """
+
+    #  The file is memory-mapped read-only, and the grid is made of memoryviews into the mapping, so the operating
+    #  system only reads the pages that are used. The engines copy the grid into their own representation when the
+    #  world is created. On big-endian machines the ages are copied and byte-swapped.
+    #
+    #  A file that is too short for the header, does not have exactly the length of its world size or holds state
+    #  codes that no engine knows raises a ValueError naming the file.
+
+    with Path.open(_path, 'rb') as f_hand:
+        if Path.stat(_path).st_size < HEADER.size:
+            raise ValueError(f'{_path} is not a version {SEED_VERSION} seed file')
+        mapped = mmap.mmap(f_hand.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, _, width, height = HEADER.unpack_from(mapped)
+    size = width * height
+    offset = get_ages_offset((width, height))
+    error = None
+    if magic != SEED_MAGIC or version != SEED_VERSION:
+        error = f'{_path} is not a version {SEED_VERSION} seed file'
+    elif len(mapped) != offset + 4 * size:
+        error = f'{_path} holds {len(mapped)} bytes, a {width}x{height} seed file holds {offset + 4 * size}'
+    else:
+        invalid = INVALID_STATE.search(mapped, HEADER.size, HEADER.size + size)
+        if invalid:
+            error = f'{_path} holds the unknown state code {mapped[invalid.start()]} at cell ' \
+                    f'{invalid.start() - HEADER.size}'
+    if error:
+        mapped.close()
+        raise ValueError(error)
+
+    states = memoryview(mapped)[HEADER.size:HEADER.size + size]
+    ages = memoryview(mapped)[offset:offset + 4 * size].cast('I')
+
+    if sys.byteorder == 'big':
+        ages = grid.copy_ages(ages)
+        ages.byteswap()
+
+    return (states, ages), (width, height)
+
+
+def main():
+    """ Convert JSON seeds in _Resources/_Project_Files to seed files next to them. """
+
+    from Project.gol import RESOURCES, load_seed_from_file
+
+    parser = argparse.ArgumentParser(description='Convert JSON seeds to the binary seed format.')
+    parser.add_argument('seeds', nargs='*', help='Names of JSON seeds in _Resources/_Project_Files.')
+    parser.add_argument('--all', dest='all', action='store_true', help='Convert every JSON seed.')
+    args = parser.parse_args()
+
+    seeds_path = RESOURCES.absolute() / '_Project_Files'
+    names = [path.name for path in sorted(seeds_path.glob('*.json'))] if args.all else args.seeds
+    if not names:
+        parser.error('name at least one seed, or use --all')
+
+    for name in names:
+        population, world_size = load_seed_from_file(name)
+        states, ages = grid.population_to_grid(population, world_size)
+        seed_path = seeds_path / f'{Path(name).stem}{SEED_SUFFIX}'
+        save_seed(seed_path, states, ages, world_size)
+        print(f'{name} -> {seed_path.name}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+"""
+Streaming server for the Game of Life: one simulation, watched by many viewers.
+
+A single simulation runs in the server and every generation is streamed to all connected clients
+over Server-Sent Events, using only the standard library, so it works offline. Open the address it
+prints in a browser to get the bundled viewer page, or read the stream from /events with any SSE
+client.
+
+Frames are delta-encoded. A client gets a 'key' event with every row of the world, followed by
+'delta' events with only the rows that changed since the previous generation. Each event is
+encoded once per generation and the same bytes are written to every client, so the cost of an
+extra viewer is a socket write.
+
+Every client has its own queue of CLIENT_QUEUE_FRAMES frames. A client that reads slower than the
+simulation runs fills its queue, after which the oldest frame is dropped for each new one, and the
+simulation never waits for it. When a client has missed a generation, its next frame is sent as a
+key frame, so it always shows a correct world. Run it as a module:
+    python -m Project.server -f seed_pulsar --fps 10 --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+
+import Project.code_base as cb
+import Project.grid as grid
+import Project.stats as stats
+from Project.gol import DEFAULT_DENSITY, ENGINES, create_engine_world, get_engine, load_seed_from_file, \
+    parse_world_size_arg, populate_grid, run_simulation
+
+CLIENT_QUEUE_FRAMES = 8
+CLOSE_TIMEOUT = 5.0
+STATE_CHARACTERS = bytes.maketrans(b'\x00\x01\x02\x03\x04', ''.join(grid.CODE_STATES).encode())
+EVENTS_HEADER = b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n' \
+                b'Connection: keep-alive\r\nAccess-Control-Allow-Origin: *\r\n\r\n'
+NOT_FOUND = b'HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\nContent-Length: 9\r\nConnection: close\r\n\r\n' \
+            b'Not found'
+
+CLIENT_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Game of Life</title>
+<style>
+body { background: #111; color: #ddd; font-family: monospace; }
+pre { line-height: 1; font-size: 10px; }
+</style>
+</head>
+<body>
+<div id="stats">Connecting...</div>
+<pre id="world"></pre>
+<script>
+const rows = [];
+const world = document.getElementById('world');
+const status = document.getElementById('stats');
+const events = new EventSource('/events');
+let keyFrames = 0;
+
+function show(frame) {
+    const s = frame.stats;
+    status.textContent = `Generation ${s.generation}  Alive ${s.alive}  Elders ${s.elders}  ` +
+        `Prime elders ${s.prime_elders}  Dead ${s.dead}  Key frames ${keyFrames}`;
+    world.textContent = rows.join('\\n');
+}
+
+events.addEventListener('key', (event) => {
+    const frame = JSON.parse(event.data);
+    rows.length = 0;
+    rows.push(...frame.rows);
+    keyFrames += 1;
+    show(frame);
+});
+
+events.addEventListener('delta', (event) => {
+    const frame = JSON.parse(event.data);
+    for (const [y, row] of Object.entries(frame.rows)) {
+        rows[Number(y)] = row;
+    }
+    show(frame);
+});
+
+events.addEventListener('end', () => {
+    status.textContent += '  Finished';
+    events.close();
+});
+</script>
+</body>
+</html>
+"""
+
+
+def encode_event(_event: str, _data: dict) -> bytes:
+    """ Encode one Server-Sent Event with a JSON data line. """
+
+    return f'event: {_event}\ndata: {json.dumps(_data, separators=(",", ":"))}\n\n'.encode()
+
+
+def get_rows(_states: bytes, _world_size: tuple) -> list:
+    """ Return the rows of a world as strings of state characters. """
+
+    width, height = _world_size
+    text = _states.translate(STATE_CHARACTERS).decode()
+    return [text[y * width:(y + 1) * width] for y in range(height)]
+
+
+def create_frame(_generation: int, _states: bytes, _previous: dict, _record: dict, _world_size: tuple) -> dict:
+    """ Create the frame of a generation, with its delta event against the _previous frame already encoded. """
+
+    #  The key event is only encoded when a client needs it, see get_key_event(). Without a previous frame the delta
+    #  event is left out, and every client gets the key event.
+
+    width = _world_size[0]
+    frame = {'generation': _generation, 'states': _states, 'record': _record, 'world_size': _world_size,
+             'key': None, 'delta': None}
+
+    if _previous is not None:
+        previous = _previous['states']
+        rows = {y: row for y, row in enumerate(get_rows(_states, _world_size))
+                if _states[y * width:(y + 1) * width] != previous[y * width:(y + 1) * width]}
+        frame['delta'] = encode_event('delta', {'generation': _generation, 'rows': rows, 'stats': _record})
+
+    return frame
+
+
+def get_key_event(_frame: dict) -> bytes:
+    """ Return the key event of a frame, encoding it on first use. """
+
+    if _frame['key'] is None:
+        width, height = _frame['world_size']
+        _frame['key'] = encode_event('key', {'generation': _frame['generation'], 'width': width, 'height': height,
+                                             'rows': get_rows(_frame['states'], _frame['world_size']),
+                                             'stats': _frame['record']})
+    return _frame['key']
+
+
+def broadcast(_server: dict, _frame):
+    """ Queue a frame, or None for the end of the stream, for every client, dropping the oldest frame when full. """
+
+    _server['latest'] = _frame or _server['latest']
+
+    for client in _server['clients']:
+        frames = client['frames']
+        if frames.full():
+            frames.get_nowait()
+            client['dropped'] += 1
+        frames.put_nowait(_frame)
+
+
+async def stream_frames(_server: dict, _writer: asyncio.StreamWriter):
+    """ Send the frames of the simulation to one client until the stream ends or the client goes away. """
+
+    #  A client starts with a key frame of the latest generation. After that it gets the delta event of every frame
+    #  that follows the generation it was sent last, and the key event of any other frame. Waiting for drain() is the
+    #  backpressure of a slow client: while it waits, its queue fills and frames are dropped.
+
+    client = {'frames': asyncio.Queue(CLIENT_QUEUE_FRAMES), 'generation': None, 'dropped': 0}
+    _server['clients'].append(client)
+
+    try:
+        _writer.write(EVENTS_HEADER)
+        if _server['latest'] is not None:
+            client['frames'].put_nowait(_server['latest'])
+        if _server['finished']:
+            client['frames'].put_nowait(None)
+
+        while True:
+            frame = await client['frames'].get()
+            if frame is None:
+                _writer.write(b'event: end\ndata: {}\n\n')
+                await _writer.drain()
+                break
+
+            if frame['delta'] is not None and client['generation'] == frame['generation'] - 1:
+                _writer.write(frame['delta'])
+            elif client['generation'] != frame['generation']:
+                _writer.write(get_key_event(frame))
+            client['generation'] = frame['generation']
+            await _writer.drain()
+    finally:
+        _server['clients'].remove(client)
+
+
+async def handle_client(_server: dict, _reader: asyncio.StreamReader, _writer: asyncio.StreamWriter):
+    """ Answer one HTTP request: the viewer page on /, the event stream on /events. """
+
+    try:
+        request = await _reader.readuntil(b'\r\n\r\n')
+        path = request.split(b' ', 2)[1] if request.count(b' ') >= 2 else b''
+
+        if path == b'/':
+            page = CLIENT_PAGE.encode()
+            _writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n'
+                          b'Content-Length: %d\r\nConnection: close\r\n\r\n' % len(page) + page)
+            await _writer.drain()
+        elif path == b'/events':
+            await stream_frames(_server, _writer)
+        else:
+            _writer.write(NOT_FOUND)
+            await _writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        _writer.close()
+
+
+async def run_producer(_server: dict, _population, _world_size: tuple, _engine_name: str, _generations: int,
+                       _fps: float):
+    """ Run the simulation and broadcast a frame for every generation, at most _fps generations per second. """
+
+    #  Ticks run in the default executor, so the event loop keeps serving clients while the engine computes. The
+    #  next tick is due one interval after the previous one was due, not after it finished, so the rate does not
+    #  drift with the time spent ticking and sending. State counts are kept up to date from the changes of every
+    #  tick, like in the simulation decorator of Project.gol.
+
+    loop = asyncio.get_running_loop()
+    engine = get_engine(_engine_name)
+    world = await loop.run_in_executor(None, create_engine_world, engine, _population, _world_size)
+    step = run_simulation.__wrapped__
+    interval = 1 / _fps if _fps else 0.0
+    state_counts = engine.count_states(world, _world_size)
+    changes = frame = None
+    gen = 0
+    due = loop.time()
+
+    try:
+        while True:
+            if changes is not None:
+                state_counts = stats.apply_changes(state_counts, changes)
+            record = stats.create_record(gen, state_counts, changes)
+            frame = create_frame(gen, bytes(engine.get_states(world, _world_size)), frame, record, _world_size)
+            broadcast(_server, frame)
+
+            if _generations and gen >= _generations:
+                break
+
+            world, ticks, changes = await loop.run_in_executor(None, step, 1, world, _world_size, _engine_name)
+            gen += ticks
+            if changes is None:
+                state_counts = engine.count_states(world, _world_size)
+
+            due += interval
+            await asyncio.sleep(max(due - loop.time(), 0))
+            due = max(due, loop.time() - interval)
+    finally:
+        if hasattr(engine, 'close_world'):
+            engine.close_world(world)
+
+    _server['finished'] = True
+    broadcast(_server, None)
+
+
+async def serve(_population, _world_size: tuple, _engine_name: str, _generations: int, _fps: float, _host: str,
+                _port: int):
+    """ Start the server and the simulation, and serve until the simulation ends and the clients are done. """
+
+    #  Clients that are still reading the end of the stream CLOSE_TIMEOUT seconds after the last generation are cut
+    #  off, so a stalled client can not keep the server running.
+
+    server_state = {'clients': [], 'latest': None, 'finished': False}
+    server = await asyncio.start_server(lambda reader, writer: handle_client(server_state, reader, writer),
+                                        _host, _port)
+    print(f'Serving generations on http://{_host}:{server.sockets[0].getsockname()[1]}/')
+
+    async with server:
+        await run_producer(server_state, _population, _world_size, _engine_name, _generations, _fps)
+        for _ in range(int(CLOSE_TIMEOUT / 0.1)):
+            if not server_state['clients']:
+                break
+            await asyncio.sleep(0.1)
+
+
+def main():
+    """ Serve the simulation described by the command line arguments. """
+
+    parser = argparse.ArgumentParser(description='Run one simulation and stream it to many viewers.')
+    parser.add_argument('-g', '--generations', dest='generations', type=int, default=0,
+                        help='Amount of generations to run. Defaults to 0, until the server is stopped.')
+    parser.add_argument('-s', '--seed', dest='seed', type=str,
+                        help='Starting seed. If omitted, a randomized seed will be used.')
+    parser.add_argument('-ws', '--worldsize', dest='worldsize', type=str, default='80x40',
+                        help='Size of the world, in terms of width and height. Defaults to 80x40.')
+    parser.add_argument('-f', '--file', dest='file', type=str,
+                        help='Load starting seed from file.')
+    parser.add_argument('--density', dest='density', type=float, default=DEFAULT_DENSITY,
+                        help='Share of living cells in a randomized seed, from 0 to 1. Defaults to 4/21.')
+    parser.add_argument('--rng-seed', dest='rng_seed', type=int,
+                        help='Seed of the random generator for a randomized seed, to get the same world again.')
+    parser.add_argument('-e', '--engine', dest='engine', type=str, default='compact',
+                        choices=[name for name in ENGINES if get_engine(name).TRACKS_AGES],
+                        help='Tick engine used to compute generations. Defaults to compact.')
+    parser.add_argument('--fps', dest='fps', type=float, default=5.0,
+                        help='Generations per second. Defaults to 5, 0 runs as fast as the engine can.')
+    parser.add_argument('--host', dest='host', type=str, default='127.0.0.1',
+                        help='Address to listen on. Defaults to 127.0.0.1.')
+    parser.add_argument('--port', dest='port', type=int, default=8765,
+                        help='Port to listen on. Defaults to 8765, 0 picks a free port.')
+    args = parser.parse_args()
+
+    if args.fps < 0:
+        parser.error('--fps needs to be at least 0')
+    if not 0 <= args.density <= 1:
+        parser.error('--density needs to be between 0 and 1')
+
+    world_size = parse_world_size_arg(args.worldsize)
+    if args.file:
+        try:
+            population, world_size = load_seed_from_file(args.file, world_size)
+        except (ValueError, FileNotFoundError) as error:
+            parser.error(str(error))
+    else:
+        try:
+            population = populate_grid(world_size, args.seed, args.density, args.rng_seed)
+        except ValueError as error:
+            parser.error(str(error))
+
+    try:
+        asyncio.run(serve(population, world_size, args.engine, args.generations, args.fps, args.host, args.port))
+    except KeyboardInterrupt:
+        cb.progress('\n')
+
+
+if __name__ == "__main__":
+    main()
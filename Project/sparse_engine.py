@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+Sparse tick engine for the Game of Life, selected with '-e sparse'.
+
+Only living cells are stored, in a dictionary of (y, x): (state, age). Dead cells and rim cells are
+implied by the world size, where the outermost rows and columns make up the rim. Each tick visits
+the living cells and their neighbours only, so memory and tick time follow the population instead
+of the area of the world.
+"""
+
+import re
+from array import array
+from collections import Counter
+
+import Project.code_base as cb
+import Project.grid as grid
+
+TRACKS_AGES = True
+LIVING_CELLS = True
+NEIGHBOUR_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+LIVING_PATTERN = re.compile(b'[\x01-\x03]')
+
+
+def create_world(_population, _world_size: tuple) -> dict:
+    """ Create the dictionary of living cells from a population dictionary or grid. """
+
+    #  A population dictionary is scanned directly to avoid building a full grid. For a grid, the living
+    #  cells are found with a regular expression over the state bytes, which runs in C instead of testing
+    #  every cell in a Python loop.
+
+    living = {}
+
+    if isinstance(_population, dict):
+        for cell, cell_dict in _population.items():
+            if cell_dict is not None and cell_dict['state'] != cb.STATE_DEAD:
+                living[cell] = (cell_dict['state'], cell_dict['age'])
+        return living
+
+    states, ages = _population
+    width = _world_size[0]
+    for match in LIVING_PATTERN.finditer(states):
+        index = match.start()
+        living[divmod(index, width)] = (grid.CODE_STATES[states[index]], 0 if ages is None else ages[index])
+
+    return living
+
+
+def count_alive_neighbours(_living: dict, _world_size: tuple) -> Counter:
+    """ Count living neighbours for every cell next to a living cell. Returns Counter of cell: count. """
+
+    #  Instead of every cell looking up its eight neighbours like gol.count_alive_neighbours(), every living
+    #  cell adds one to each of its eight neighbours. Only living cells are in _living and rim cells are never
+    #  alive, so the counts are the same. Neighbours on the rim are skipped since they can never be born.
+
+    width, height = _world_size
+    neighbours_alive = Counter()
+
+    for y, x in _living:
+        for dy, dx in NEIGHBOUR_OFFSETS:
+            n_y, n_x = y + dy, x + dx
+            if 0 < n_y < height - 1 and 0 < n_x < width - 1:
+                neighbours_alive[(n_y, n_x)] += 1
+
+    return neighbours_alive
+
+
+def update_world(_cur_gen: dict, _world_size: tuple) -> dict:
+    """ Represents a tick in the simulation. """
+
+    return step_world(_cur_gen, _world_size)[0]
+
+
+def step_world(_cur_gen: dict, _world_size: tuple) -> tuple:
+    """ Represents a tick in the simulation. Returns tuple: world and changes in the order of stats.CHANGE_FIELDS. """
+
+    #  Applies the same rules as gol.update_world(), but only to living cells and cells with living neighbours.
+    #  Every other cell is dead with no living neighbours and stays dead.
+    #
+    #  A living cell with 2 or 3 living neighbours survives and ages by 1. Alive cells that survive with age 5
+    #  become elders, and elders that survive with age 10 become prime elders. A dead cell with exactly 3
+    #  living neighbours is born as an alive cell with age 0. Any cell not added to next_gen is dead.
+    #
+    #  The living cells are visited first, so that cells without any living neighbours are counted when they die,
+    #  and then the cells with living neighbours are checked for births.
+
+    next_gen = {}
+    neighbours = count_alive_neighbours(_cur_gen, _world_size)
+    births = elder_promotions = prime_elder_promotions = 0
+    deaths = dict.fromkeys((cb.STATE_ALIVE, cb.STATE_ELDER, cb.STATE_PRIME_ELDER), 0)
+
+    for cell, (state, age) in _cur_gen.items():
+        if neighbours.get(cell, 0) in (2, 3):
+            if state == cb.STATE_ALIVE and age == 5:
+                state = cb.STATE_ELDER
+                elder_promotions += 1
+            elif state == cb.STATE_ELDER and age == 10:
+                state = cb.STATE_PRIME_ELDER
+                prime_elder_promotions += 1
+            next_gen[cell] = (state, age + 1)
+        else:
+            deaths[state] += 1
+
+    for cell, neighbours_alive in neighbours.items():
+        if neighbours_alive == 3 and cell not in _cur_gen:
+            next_gen[cell] = (cb.STATE_ALIVE, 0)
+            births += 1
+
+    return next_gen, (births, deaths[cb.STATE_ALIVE], deaths[cb.STATE_ELDER], deaths[cb.STATE_PRIME_ELDER],
+                      elder_promotions, prime_elder_promotions)
+
+
+def count_states(_world: dict, _world_size: tuple) -> dict:
+    """ Count the cells of each state. Returns dict of state: count, rim cells excluded. """
+
+    width, height = _world_size
+    state_counts = dict.fromkeys((cb.STATE_ALIVE, cb.STATE_ELDER, cb.STATE_PRIME_ELDER), 0)
+
+    for state, _ in _world.values():
+        state_counts[state] += 1
+
+    state_counts[cb.STATE_DEAD] = max(width - 2, 0) * max(height - 2, 0) - len(_world)
+
+    return state_counts
+
+
+def get_states(_world: dict, _world_size: tuple) -> bytearray:
+    """ Return the state codes of the world as flat bytes. """
+
+    #  The rim is written as whole rows with slice assignment, and as columns with a step of width.
+
+    width, height = _world_size
+    states = bytearray(width * height)
+
+    states[:width] = states[-width:] = bytes((grid.CODE_RIM,)) * width
+    states[::width] = states[width - 1::width] = bytes((grid.CODE_RIM,)) * height
+
+    for (y, x), (state, _) in _world.items():
+        states[y * width + x] = grid.STATE_CODES[state]
+
+    return states
+
+
+def get_grid(_world: dict, _world_size: tuple) -> tuple:
+    """ Return the world as a flat (states, ages) grid. """
+
+    width, height = _world_size
+    ages = array('I', bytes(4 * width * height))
+
+    for (y, x), (_, age) in _world.items():
+        ages[y * width + x] = age
+
+    return get_states(_world, _world_size), ages
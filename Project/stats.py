@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Per-generation statistics of a Game of Life simulation, and their log records.
+
+Engines with a step_world() function report what changed during a tick as a tuple in the order of
+CHANGE_FIELDS: births, deaths of alive, elder and prime elder cells, and promotions to elder and
+prime elder. Applying the changes to the state counts of the previous generation gives the counts
+of the next one, so the world only has to be counted once, when the simulation starts.
+
+Every generation is logged as one record with the fields of RECORD_FIELDS, in one of the formats
+of LOG_FORMATS:
+
+    text    The six lines per generation of _Resources/gol.log.
+    jsonl   One JSON object per line, in _Resources/gol.jsonl.
+    csv     A header line followed by one comma-separated line per generation, in _Resources/gol.csv.
+
+Births, deaths and promotions are the changes that produced the generation, and are empty for the
+first generation and after ticks whose changes are not known, such as hashlife jumps. With --census
+every record also has an 'objects' field with the counts of Project.census, which is empty for the
+generations between two censuses.
+"""
+
+import json
+
+import Project.code_base as cb
+
+LOG_FORMATS = ('text', 'jsonl', 'csv')
+CHANGE_FIELDS = ('births', 'alive_deaths', 'elder_deaths', 'prime_elder_deaths', 'elder_promotions',
+                 'prime_elder_promotions')
+RECORD_FIELDS = ('generation', 'population', 'alive', 'elders', 'prime_elders', 'dead', 'births', 'deaths',
+                 'promotions')
+CENSUS_FIELD = 'objects'
+NO_CHANGES = (0,) * len(CHANGE_FIELDS)
+
+
+def add_changes(_changes: tuple, _other: tuple) -> tuple:
+    """ Return the sum of two change tuples, such as those of two parts of the same world. """
+
+    return tuple(count + other for count, other in zip(_changes, _other))
+
+
+def apply_changes(_state_counts: dict, _changes: tuple) -> dict:
+    """ Return the state counts of the next generation, from the counts of this one and the changes of a tick. """
+
+    births, alive_deaths, elder_deaths, prime_elder_deaths, elder_promotions, prime_elder_promotions = _changes
+
+    return {
+        cb.STATE_DEAD: _state_counts[cb.STATE_DEAD] - births + alive_deaths + elder_deaths + prime_elder_deaths,
+        cb.STATE_ALIVE: _state_counts[cb.STATE_ALIVE] + births - alive_deaths - elder_promotions,
+        cb.STATE_ELDER: _state_counts[cb.STATE_ELDER] + elder_promotions - elder_deaths - prime_elder_promotions,
+        cb.STATE_PRIME_ELDER: _state_counts[cb.STATE_PRIME_ELDER] + prime_elder_promotions - prime_elder_deaths
+    }
+
+
+def create_record(_gen: int, _state_counts: dict, _changes: tuple = None) -> dict:
+    """ Create the log record of a generation from its state counts and the changes that produced it. """
+
+    elders = _state_counts[cb.STATE_ELDER]
+    prime_elders = _state_counts[cb.STATE_PRIME_ELDER]
+    alive = _state_counts[cb.STATE_ALIVE] + elders + prime_elders
+    population = alive + _state_counts[cb.STATE_DEAD]
+
+    if _changes is None:
+        births = deaths = promotions = None
+    else:
+        births = _changes[0]
+        deaths = _changes[1] + _changes[2] + _changes[3]
+        promotions = _changes[4] + _changes[5]
+
+    return {'generation': _gen, 'population': population, 'alive': alive, 'elders': elders,
+            'prime_elders': prime_elders, 'dead': population - alive, 'births': births, 'deaths': deaths,
+            'promotions': promotions}
+
+
+def get_header(_log_format: str, _census: bool = False):
+    """ Return the line written before the first record in _log_format, or None. """
+
+    if _log_format != 'csv':
+        return None
+
+    return ','.join(RECORD_FIELDS + (CENSUS_FIELD,) if _census else RECORD_FIELDS)
+
+
+def format_objects(_objects: dict, _separator: str, _assignment: str) -> str:
+    """ Return the object counts of a census as text, or an empty string for records without a census. """
+
+    if _objects is None:
+        return ''
+
+    return _separator.join(f'{name}{_assignment}{count}' for name, count in _objects.items())
+
+
+def format_record(_record: dict, _log_format: str) -> str:
+    """ Return a record as text in _log_format. """
+
+    if _log_format == 'jsonl':
+        return json.dumps(_record, separators=(',', ':'))
+
+    if _log_format == 'csv':
+        line = ','.join('' if _record[field] is None else str(_record[field]) for field in RECORD_FIELDS)
+        if CENSUS_FIELD in _record:
+            line += ',' + format_objects(_record[CENSUS_FIELD], ';', '=')
+        return line
+
+    text = f'GENERATION {_record["generation"]}\n' \
+           f'Population: {_record["population"]}\n' \
+           f'Alive: {_record["alive"]}\n' \
+           f'Elders: {_record["elders"]}\n' \
+           f'Prime Elders: {_record["prime_elders"]}\n' \
+           f'Dead: {_record["dead"]}'
+    if _record.get(CENSUS_FIELD) is not None:
+        text += f'\nObjects: {format_objects(_record[CENSUS_FIELD], ", ", ": ")}'
+
+    return text
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+"""
+Lookup table tick engine for the Game of Life, selected with '-e table'.
+
+The rules are not written as code but held in lookup tables, built once from a rule string in the
+B/S notation, such as 'B3/S23' for Conway's rules or 'B36/S23' for HighLife: a dead cell is born
+with any of the neighbour counts after B, and a living cell survives with any of the counts after S.
+The ages at which an alive cell becomes an elder and an elder becomes a prime elder are part of the
+rule, 5 and 10 unless set with --elder-age and --prime-elder-age.
+
+Rules in B/S notation only depend on the state of a cell and the number of its living neighbours,
+so the 512 entries of a full 3x3 neighbourhood table collapse to one entry per state and count. Each
+entry also knows whether the age of the cell has reached a threshold, which gives fewer than 256
+entries, so every cell of the world is looked up at once with bytes.translate().
+
+The index of every cell is computed for the whole world at once with big integer arithmetic on the
+state bytes, where no byte ever carries into the next: the eight neighbour counts are the living
+cells shifted by one cell, one row and one row and cell, added up. Ages are updated the same way, with
+one 32-bit lane per cell.
+"""
+
+import re
+import sys
+from array import array
+
+import Project.grid as grid
+
+TRACKS_AGES = True
+USES_RULES = True
+DEFAULT_RULE = 'B3/S23'
+ELDER_AGE = 5
+PRIME_ELDER_AGE = 10
+RULE_PATTERN = re.compile(r'B([0-8]*)/S([0-8]*)', re.IGNORECASE)
+
+LIVING_BYTES = bytes.maketrans(b'\x00\x01\x02\x03\x04', b'\x00\x01\x01\x01\x00')
+NONZERO_BYTES = bytes([0] + [0xff] * 255)
+ONE_BYTES = bytes.maketrans(b'\x01', b'\xff')
+AGE_LOW_BYTE = 0 if sys.byteorder == 'little' else 3
+
+#  Index of a cell in the tables: threshold key * KEY_STEP + state code * STATE_STEP + living neighbours.
+STATE_STEP = 9
+KEY_STEP = 5 * STATE_STEP
+KEY_ELDER, KEY_PRIME_ELDER = 1, 2
+
+#  Change codes of the change table, in the order of stats.CHANGE_FIELDS.
+CHANGE_CODES = tuple(bytes((code,)) for code in range(1, 7))
+
+
+def parse_rule(_rule: str = DEFAULT_RULE, _elder_age: int = ELDER_AGE,
+               _prime_elder_age: int = PRIME_ELDER_AGE) -> dict:
+    """ Parse a rule string in B/S notation and the age thresholds. Returns dict: the rule. """
+
+    #  The age thresholds have to fit in one byte, since only the lowest byte of every age is looked up.
+
+    match = RULE_PATTERN.fullmatch(_rule.strip())
+    if not match:
+        raise ValueError(f"Rule '{_rule}' is not in B/S notation, like B3/S23")
+    if not 0 <= _elder_age <= 255 or not 0 <= _prime_elder_age <= 255:
+        raise ValueError('Elder and prime elder ages need to be between 0 and 255')
+
+    birth, survival = (frozenset(int(count) for count in counts) for counts in match.groups())
+
+    return {'name': f"B{''.join(map(str, sorted(birth)))}/S{''.join(map(str, sorted(survival)))}",
+            'birth': birth, 'survival': survival, 'elder_age': _elder_age, 'prime_elder_age': _prime_elder_age}
+
+
+def build_tables(_rule: dict) -> tuple:
+    """ Build the lookup tables of a rule. Returns tuple of 256 byte tables: next state, change and survival. """
+
+    #  The threshold key is a bit field: KEY_ELDER when the age of the cell is the elder age and KEY_PRIME_ELDER when
+    #  it is the prime elder age, both when the two ages are the same. Rim cells stay rim cells.
+
+    next_states, changes, survives = bytearray(256), bytearray(256), bytearray(256)
+
+    for key in range(4):
+        for code in range(len(grid.CODE_STATES)):
+            for count in range(9):
+                index = key * KEY_STEP + code * STATE_STEP + count
+                if code == grid.CODE_RIM:
+                    next_states[index] = grid.CODE_RIM
+                elif code == grid.CODE_DEAD:
+                    if count in _rule['birth']:
+                        next_states[index], changes[index] = grid.CODE_ALIVE, 1
+                elif count not in _rule['survival']:
+                    changes[index] = 1 + code
+                elif code == grid.CODE_ALIVE and key & KEY_ELDER:
+                    next_states[index], changes[index], survives[index] = grid.CODE_ELDER, 5, 1
+                elif code == grid.CODE_ELDER and key & KEY_PRIME_ELDER:
+                    next_states[index], changes[index], survives[index] = grid.CODE_PRIME_ELDER, 6, 1
+                else:
+                    next_states[index], survives[index] = code, 1
+
+    return bytes(next_states), bytes(changes), bytes(survives)
+
+
+def create_world(_population, _world_size: tuple, _rule: dict = None) -> dict:
+    """ Create the table world from a population dictionary or grid, with the rule or Conway's rules. """
+
+    states, ages = grid.as_grid(_population, _world_size)
+    rule = _rule or parse_rule()
+    key_table = bytearray(256)
+    key_table[rule['elder_age']] |= KEY_ELDER
+    key_table[rule['prime_elder_age']] |= KEY_PRIME_ELDER
+
+    return {'states': bytearray(states), 'ages': grid.copy_ages(ages, len(states)), 'rule': rule,
+            'tables': build_tables(rule), 'key_table': bytes(key_table)}
+
+
+def count_alive_neighbours(_states: bytearray, _width: int) -> int:
+    """ Count the living neighbours of every cell. Returns int with one byte per cell, the first cell highest. """
+
+    #  Shifting the living cells by 8 bits moves every cell one place, by 8 * _width bits one row. Cells shifted past
+    #  either end of the world are masked off, and rim cells are never alive, so no inner cell sees the far side.
+
+    size = len(_states)
+    living = int.from_bytes(_states.translate(LIVING_BYTES), 'big')
+    neighbours = 0
+    for shift in (8, 8 * (_width - 1), 8 * _width, 8 * (_width + 1)):
+        neighbours += (living << shift) + (living >> shift)
+
+    return neighbours & ((1 << 8 * size) - 1)
+
+
+def get_threshold_keys(_world: dict) -> int:
+    """ Return the threshold key of every cell as an int with one byte per cell, the first cell highest. """
+
+    #  The key is looked up from the lowest byte of every age, and cleared for ages that have a higher byte set.
+
+    ages = memoryview(_world['ages']).cast('B')
+    size = len(_world['states'])
+    keys = int.from_bytes(ages[AGE_LOW_BYTE::4].tobytes().translate(_world['key_table']), 'big')
+    if not keys:
+        return 0
+
+    high = 0
+    for offset in range(4):
+        if offset != AGE_LOW_BYTE:
+            high |= int.from_bytes(ages[offset::4].tobytes(), 'big')
+
+    return keys & ~int.from_bytes(high.to_bytes(size, 'big').translate(NONZERO_BYTES), 'big')
+
+
+def update_world(_cur_gen: dict, _world_size: tuple) -> dict:
+    """ Represents a tick in the simulation. """
+
+    return step_world(_cur_gen, _world_size)[0]
+
+
+def step_world(_cur_gen: dict, _world_size: tuple) -> tuple:
+    """ Represents a tick in the simulation. Returns tuple: world and changes in the order of stats.CHANGE_FIELDS. """
+
+    #  The table index of every cell is added up from the threshold keys, the state codes and the neighbour counts,
+    #  and translated through the tables to the next states, the change of every cell and whether it survives. The
+    #  changes are counted per change code.
+    #
+    #  Surviving cells age by one and every other cell gets age 0: the survivors are spread out to one byte per
+    #  32-bit lane, added to the ages and used as a mask, all as big integers in the byte order of the ages array.
+
+    states, ages = _cur_gen['states'], _cur_gen['ages']
+    next_table, change_table, survive_table = _cur_gen['tables']
+    size = len(states)
+
+    index = get_threshold_keys(_cur_gen) * KEY_STEP + int.from_bytes(states, 'big') * STATE_STEP + \
+        count_alive_neighbours(states, _world_size[0])
+    index = index.to_bytes(size, 'big')
+
+    changes_bytes = index.translate(change_table)
+    changes = tuple(changes_bytes.count(code) for code in CHANGE_CODES)
+    survives = index.translate(survive_table)
+
+    added = bytearray(4 * size)
+    added[AGE_LOW_BYTE::4] = survives
+    mask = bytearray(4 * size)
+    mask_bytes = survives.translate(ONE_BYTES)
+    for offset in range(4):
+        mask[offset::4] = mask_bytes
+
+    next_ages = (int.from_bytes(memoryview(ages).cast('B'), sys.byteorder) + int.from_bytes(added, sys.byteorder)) & \
+        int.from_bytes(mask, sys.byteorder)
+    ages_array = array('I')
+    ages_array.frombytes(next_ages.to_bytes(4 * size, sys.byteorder))
+
+    _cur_gen['states'] = bytearray(index.translate(next_table))
+    _cur_gen['ages'] = ages_array
+
+    return _cur_gen, changes
+
+
+def get_states(_world: dict, _world_size: tuple) -> bytearray:
+    """ Return the state codes of the world as flat bytes. """
+
+    return _world['states']
+
+
+def count_states(_world: dict, _world_size: tuple) -> dict:
+    """ Count the cells of each state. Returns dict of state: count, rim cells excluded. """
+
+    return grid.count_grid_states(_world['states'])
+
+
+def get_grid(_world: dict, _world_size: tuple) -> tuple:
+    """ Return the world as a flat (states, ages) grid. """
+
+    return bytearray(_world['states']), array('I', _world['ages'])